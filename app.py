@@ -1,20 +1,24 @@
 """Flask application entry point for GeoEntry Edge API."""
 
-from flask import Flask
+import logging
+import time
+
+from flask import Blueprint, Flask, current_app
 from flask_cors import CORS
-from flasgger import Swagger
-from devices.interfaces.services import device_api
-from locations.interfaces.services import location_api
+from devices.interfaces.services import device_api, get_device_service
+from locations.interfaces.services import location_api, get_location_service
 from proximity_events.interfaces.services import proximity_event_api
 from sensors.interfaces.services import sensor_api
+from automations.interfaces.services import automation_api, get_action_scheduler, get_automation_service
 from shared.infrastructure.database import init_db
-from config import get_config
-
-# Get configuration
-config = get_config()
+from shared.infrastructure.warmup import Warmup
+from shared.infrastructure.openapi import FrozenSpec
+from shared.infrastructure.timing import init_request_timing
+from shared.infrastructure.structured_logging import configure_logging
+from shared.infrastructure.lazy import reset_singletons
+from config import check_config, get_config, use_config
 
-app = Flask(__name__)
-CORS(app)
+logger = logging.getLogger(__name__)
 
 # Swagger configuration
 swagger_config = {
@@ -56,10 +60,17 @@ swagger_template = {
             "name": "X-API-Key",
             "in": "header",
             "description": "Clave API del dispositivo"
+        },
+        "BearerAuth": {
+            "type": "apiKey",
+            "name": "Authorization",
+            "in": "header",
+            "description": "Token firmado del dispositivo: Bearer <token> (POST /devices/token)"
         }
     },
     "security": [
-        {"DeviceAuth": [], "ApiKeyAuth": []}
+        {"DeviceAuth": [], "ApiKeyAuth": []},
+        {"DeviceAuth": [], "BearerAuth": []}
     ],
     "tags": [
         {
@@ -81,17 +92,9 @@ swagger_template = {
     ]
 }
 
-swagger = Swagger(app, config=swagger_config, template=swagger_template)
-
-app.register_blueprint(device_api)
-app.register_blueprint(location_api)
-app.register_blueprint(proximity_event_api)
-app.register_blueprint(sensor_api)
-
-# Test Supabase connection at startup
-init_db()
+health_api = Blueprint("health_api", __name__)
 
-@app.route('/')
+@health_api.route('/')
 def health_check():
     """Health check endpoint para Render y monitoreo del servicio.
     ---
@@ -119,5 +122,119 @@ def health_check():
         "version": "1.0.0"
     }, 200
 
+@health_api.route('/ready')
+def readiness_check():
+    """Readiness probe: sólo responde 200 cuando el calentamiento de cachés terminó.
+    ---
+    tags:
+      - Health
+    responses:
+      200:
+        description: Cachés calentadas, el worker puede recibir tráfico
+      503:
+        description: Calentamiento en curso o fallido (se reintenta automáticamente)
+    """
+    warmup = current_app.extensions.get('warmup')
+    if warmup is None:
+        return {"status": "ready", "warmup": None}, 200
+    if not warmup.ready:
+        # Retry a failed warm-up; no-op while one is running
+        warmup.start()
+        return {"status": "warming", "warmup": warmup.status()}, 503
+    return {"status": "ready", "warmup": warmup.status()}, 200
+
+def check_database():
+    """Test the Supabase connection."""
+    if not init_db():
+        raise RuntimeError("Supabase connection failed")
+
+def create_app(config=None) -> Flask:
+    """Create the Flask application.
+
+    Application services and the Supabase client are built on first use, so
+    creating the app makes no network calls besides the background warm-up
+    and the action scheduler, whose runner thread starts here.
+    Services built for a previous app are dropped and rebuilt from this
+    app's configuration, so there is one app per process.
+    """
+    started = time.perf_counter()
+    if config is not None:
+        use_config(config)
+    config = get_config()
+    check_config(config)
+    reset_singletons()
+    configure_logging(config.LOG_LEVEL, config.LOG_QUEUE_SIZE)
+
+    app = Flask(__name__)
+    app.config.from_object(config)
+    CORS(app)
+    if config.REQUEST_TIMING_ENABLED:
+        init_request_timing(app, config.PROFILE_SAMPLE_RATE, config.PROFILE_DIRECTORY)
+
+    # Development regenerates the spec on first request instead of reusing the file
+    spec = FrozenSpec(config.OPENAPI_SPEC_PATH, max_age_seconds=config.OPENAPI_SPEC_MAX_AGE_SECONDS,
+                      persist=not config.DEBUG)
+    if config.SWAGGER_UI_ENABLED:
+        # Deferred: flasgger pulls in the YAML parser and Swagger UI assets
+        from flasgger import Swagger
+        Swagger(app, config=swagger_config, template=swagger_template)
+
+        # Flasgger's view parses every docstring; only use it to produce the frozen spec
+        live_spec_view = app.view_functions['flasgger.apispec_1']
+        def generate_spec() -> bytes:
+            with app.test_request_context(swagger_config['specs'][0]['route']):
+                return live_spec_view().get_data()
+        spec.generate = generate_spec
+        app.view_functions['flasgger.apispec_1'] = spec.view
+    else:
+        app.add_url_rule(swagger_config['specs'][0]['route'], 'apispec_1', spec.view)
+
+    @app.cli.command('freeze-openapi')
+    def freeze_openapi():
+        """Write the OpenAPI spec to OPENAPI_SPEC_PATH."""
+        spec.freeze()
+        print(f"✅ OpenAPI spec written to {spec.path}")
+
+    app.register_blueprint(health_api)
+    app.register_blueprint(device_api)
+    app.register_blueprint(location_api)
+    app.register_blueprint(proximity_event_api)
+    app.register_blueprint(sensor_api)
+    app.register_blueprint(automation_api)
+
+    # Due actions must fire whether or not anything warms or uses automations
+    if config.SCHEDULER_ENABLED:
+        get_action_scheduler().start()
+
+    # Warm caches in the background; /ready fails until every task succeeds.
+    # One load of the active locations fills the geofence index, the compiled
+    # cache and, if no other worker has a fresh one, the shared snapshot.
+    if config.WARMUP_ENABLED:
+        warmup = Warmup({
+            "database": check_database,
+            "device_ids": lambda: get_device_service().warm_device_ids(),
+            **({"api_keys": lambda: get_device_service().warm_api_keys()}
+               if config.DEVICE_AUTH_REQUIRED else {}),
+            **({"device_presence": lambda: get_device_service().warm_presence()}
+               if config.DEVICE_PRESENCE_ENABLED else {}),
+            "geofences": lambda: get_location_service().warm_geofences(),
+            **({"automation_rules": lambda: get_automation_service().warm_rules()}
+               if config.AUTOMATION_ENABLED else {}),
+            **({"scheduler": lambda: get_action_scheduler().repository.count()}
+               if config.SCHEDULER_ENABLED else {})
+        }, max_workers=config.WARMUP_MAX_WORKERS)
+        app.extensions['warmup'] = warmup
+        warmup.start()
+
+    startup_seconds = time.perf_counter() - started
+    app.config['STARTUP_SECONDS'] = startup_seconds
+    if startup_seconds > config.STARTUP_TIME_BUDGET_SECONDS:
+        logger.warning("❌ Startup took %.0f ms, over the %.0f ms budget",
+                       startup_seconds * 1000, config.STARTUP_TIME_BUDGET_SECONDS * 1000)
+    else:
+        logger.info("✅ Startup took %.0f ms", startup_seconds * 1000)
+    return app
+
 if __name__ == "__main__":
-    app.run(host=config.HOST, port=config.PORT, debug=config.DEBUG)
\ No newline at end of file
+    config = get_config()
+    create_app().run(host=config.HOST, port=config.PORT, debug=config.DEBUG)
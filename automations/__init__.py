@@ -0,0 +1 @@
+"""Automations context package."""
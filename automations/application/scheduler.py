@@ -0,0 +1,226 @@
+"""Scheduler for delayed and timed sensor status changes."""
+import heapq
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from automations.domain.entities import ScheduledAction
+from automations.domain.services import AutomationService
+from automations.infrastructure.scheduled_action_repository import ScheduledActionSupabaseRepository
+from shared.infrastructure.leader_lock import LeaderLock
+
+logger = logging.getLogger(__name__)
+
+
+class ActionScheduler:
+    """Runs scheduled sensor actions when they fall due.
+
+    Every worker can schedule actions; they are written to the repository
+    first. One worker per host, elected through a lock file, polls it: it
+    keeps a heap of the actions due within the next horizon_seconds and
+    reads the next slice from the run_at index as time advances, so memory
+    stays bounded however many actions are pending. Each poll also picks up
+    overdue actions it has not seen, such as ones scheduled on another
+    instance or claimed by a worker that died. Due actions are claimed, so
+    that each runs on one instance only, merged into as few sensor updates
+    as possible and deleted once applied. Failed ones are retried after
+    retry_seconds, and marked failed after max_attempts attempts.
+    """
+
+    def __init__(self, repository: ScheduledActionSupabaseRepository, leader_lock: LeaderLock,
+                 sensor_service, poll_seconds: float = 1.0, horizon_seconds: float = 300.0,
+                 batch_size: int = 500, retry_seconds: float = 30.0, max_attempts: int = 5,
+                 claim_seconds: float = 60.0):
+        self.repository = repository
+        self.leader_lock = leader_lock
+        self.sensor_service = sensor_service
+        self.automation_service = AutomationService()
+        self.poll_seconds = poll_seconds
+        self.horizon_seconds = horizon_seconds
+        self.batch_size = batch_size
+        self.retry_seconds = retry_seconds
+        self.max_attempts = max_attempts
+        self.claim_seconds = claim_seconds
+
+        self._heap: List[Tuple[float, int]] = []
+        self._queued: Set[int] = set()
+        self._loaded_until = 0.0
+        # Actions this process scheduled inside the loaded window
+        self._incoming: List[Tuple[int, float]] = []
+        self._incoming_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.counters = {
+            'scheduled': 0,
+            'cancelled': 0,
+            'executed': 0,
+            'sensor_updates': 0,
+            'failed': 0,
+            'dead_lettered': 0
+        }
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self.counters[name] += amount
+
+    def schedule(self, actions: List[ScheduledAction]) -> List[ScheduledAction]:
+        """Persist actions and hand the ones due before the next slice to the runner."""
+        if not actions:
+            return actions
+        self.repository.add_many(actions)
+        self._count('scheduled', len(actions))
+
+        if self.leader_lock.is_leader:
+            early = [(action.action_id, action.run_at) for action in actions
+                     if action.run_at < self._loaded_until]
+            if early:
+                with self._incoming_lock:
+                    self._incoming.extend(early)
+                self._wake.set()
+        return actions
+
+    def cancel(self, action_id: int) -> bool:
+        """Cancel a pending or failed action. Its heap entry is skipped when it falls due."""
+        cancelled = self.repository.delete_many([action_id]) > 0
+        if cancelled:
+            self._count('cancelled')
+        return cancelled
+
+    def start(self) -> bool:
+        """Start the runner thread once per process."""
+        with self._start_lock:
+            if self._thread is not None:
+                return False
+            self._thread = threading.Thread(target=self._run, name='action-scheduler', daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        """Stop the runner thread and give up leadership."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.leader_lock.release()
+
+    def _run(self):
+        """Runner loop: wait for leadership, then refill the heap and run due actions."""
+        while not self._stop.is_set():
+            if not self.leader_lock.is_leader:
+                if not self.leader_lock.try_acquire():
+                    self._stop.wait(self.poll_seconds)
+                    continue
+                logger.info("⏰ Action scheduler is leader")
+                self._reset()
+
+            timeout = self.poll_seconds
+            try:
+                self._refill(time.time())
+                while self._run_due(time.time()) == self.batch_size:
+                    pass
+                if self._heap:
+                    timeout = min(timeout, max(self._heap[0][0] - time.time(), 0))
+            except Exception as e:
+                logger.error("❌ Action scheduler failed: %s", e)
+
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def _reset(self):
+        """Forget the in-memory heap; it is rebuilt from the repository."""
+        self._heap = []
+        self._queued = set()
+        self._loaded_until = 0.0
+        with self._incoming_lock:
+            self._incoming = []
+
+    def _push(self, action_id: int, run_at: float):
+        if action_id not in self._queued:
+            self._queued.add(action_id)
+            heapq.heappush(self._heap, (run_at, action_id))
+
+    def _refill(self, now: float):
+        """Load the actions due within the horizon, plus overdue ones not seen yet."""
+        with self._incoming_lock:
+            incoming, self._incoming = self._incoming, []
+        for action_id, run_at in incoming:
+            self._push(action_id, run_at)
+
+        horizon = now + self.horizon_seconds
+        if horizon - self._loaded_until >= self.poll_seconds:
+            for action_id, run_at in self.repository.due_between(self._loaded_until, horizon):
+                self._push(action_id, run_at)
+            self._loaded_until = horizon
+
+        for action_id, run_at in self.repository.overdue(now, self.batch_size):
+            self._push(action_id, run_at)
+
+    def _run_due(self, now: float) -> int:
+        """Run up to batch_size due actions; returns how many were popped."""
+        due_ids = []
+        while self._heap and self._heap[0][0] <= now and len(due_ids) < self.batch_size:
+            _, action_id = heapq.heappop(self._heap)
+            self._queued.discard(action_id)
+            due_ids.append(action_id)
+        if not due_ids:
+            return 0
+
+        # Cancelled, rescheduled and already claimed actions are not claimed
+        self.execute(self.repository.claim(due_ids, now, now + self.claim_seconds))
+        return len(due_ids)
+
+    def execute(self, actions: List[ScheduledAction]):
+        """Apply claimed actions as batched sensor updates, retrying the ones that fail."""
+        groups: Dict[tuple, List[ScheduledAction]] = {}
+        for action in actions:
+            groups.setdefault((action.user_id, action.target_is_active, action.sensor_type), []).append(action)
+
+        for group in groups.values():
+            try:
+                for user_id, is_active, sensor_type, sensor_ids in self.automation_service.batch_actions(group):
+                    self.sensor_service.update_sensors_status(
+                        is_active, sensor_ids=sensor_ids, user_id=user_id, sensor_type=sensor_type
+                    )
+                    self._count('sensor_updates')
+            except Exception as e:
+                self._fail(group, str(e))
+                continue
+
+            self.repository.delete_many([action.action_id for action in group])
+            self._count('executed', len(group))
+
+    def _fail(self, actions: List[ScheduledAction], error: str):
+        """Reschedule failed actions, or mark them failed once out of attempts."""
+        self._count('failed', len(actions))
+        retry_at = time.time() + self.retry_seconds
+        by_attempts: Dict[int, List[int]] = {}
+        for action in actions:
+            by_attempts.setdefault(action.attempts + 1, []).append(action.action_id)
+
+        for attempts, action_ids in by_attempts.items():
+            if attempts >= self.max_attempts:
+                logger.error("❌ Scheduled actions %s failed %d times, giving up: %s",
+                             action_ids, attempts, error)
+                self.repository.mark_failed(action_ids, attempts, error)
+                self._count('dead_lettered', len(action_ids))
+                continue
+
+            logger.error("❌ Scheduled actions %s failed, retrying in %ss: %s",
+                         action_ids, self.retry_seconds, error)
+            self.repository.reschedule(action_ids, retry_at, attempts, error)
+            for action_id in action_ids:
+                self._push(action_id, retry_at)
+
+    def stats(self) -> dict:
+        """Get scheduler counters and queue sizes."""
+        with self._stats_lock:
+            counters = dict(self.counters)
+        return {
+            'leader': self.leader_lock.is_leader,
+            'pending': self.repository.count(),
+            'in_memory': len(self._heap),
+            **counters
+        }
@@ -0,0 +1,326 @@
+"""Application services for Automations context."""
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from automations.domain.entities import AutomationRule, ScheduledAction
+from automations.domain.services import AutomationService, EVENT_TYPES
+from automations.infrastructure.supabase_repository import AutomationRuleSupabaseRepository
+from automations.infrastructure.rule_index import AutomationRuleIndex
+from automations.application.scheduler import ActionScheduler
+from sensors.domain.services import SensorService
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+
+class AutomationApplicationService:
+    """Application service for automation rules.
+
+    Rules are matched against proximity events from an in-memory index and
+    their sensor updates run on a bounded worker pool, off the request path.
+    Delayed rules and timed actions go through the scheduler.
+    """
+
+    def __init__(self, sensor_service, location_service, device_service,
+                 scheduler: Optional[ActionScheduler] = None):
+        self.repository = AutomationRuleSupabaseRepository()
+        self.automation_service = AutomationService()
+        self.sensor_validator = SensorService()
+        self.sensor_service = sensor_service
+        self.location_service = location_service
+        self.device_service = device_service
+        self.scheduler = scheduler
+
+        config = get_config()
+        self.enabled = config.AUTOMATION_ENABLED
+        self.rules_refresh_seconds = config.AUTOMATION_RULES_REFRESH_SECONDS
+        self.rule_index = AutomationRuleIndex()
+        self._index_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=config.AUTOMATION_MAX_WORKERS, thread_name_prefix='automation'
+        )
+        # Bounds queued plus running events; beyond it events are dropped
+        self.max_pending = config.AUTOMATION_MAX_PENDING
+        self._pending = threading.BoundedSemaphore(self.max_pending)
+        self._stats_lock = threading.Lock()
+        self.counters = {
+            'events_received': 0,
+            'events_dropped': 0,
+            'events_processed': 0,
+            'rules_matched': 0,
+            'rules_rejected': 0,
+            'sensor_updates': 0,
+            'sensors_updated': 0,
+            'actions_scheduled': 0,
+            'errors': 0
+        }
+
+    def _validate_action(self, user_id: str, is_active: bool, sensor_type: Optional[str],
+                         sensor_ids: Optional[List[str]]):
+        """Validate the user and sensor targets of a rule or scheduled action."""
+        if not user_id or not user_id.strip():
+            raise ValueError("User ID is required")
+
+        if not isinstance(is_active, bool):
+            raise ValueError("isActive must be a boolean")
+
+        if sensor_type is not None and not self.sensor_validator.validate_sensor_type(sensor_type):
+            raise ValueError(f"Invalid sensor type: {sensor_type}")
+
+        if sensor_ids is not None:
+            if not isinstance(sensor_ids, list) or not sensor_ids:
+                raise ValueError("sensor_ids must be a non-empty list")
+            if len(sensor_ids) > self.sensor_service.bulk_max_ids:
+                raise ValueError(f"At most {self.sensor_service.bulk_max_ids} sensor_ids can be targeted")
+            if any(not isinstance(sensor_id, str) or not sensor_id.strip() for sensor_id in sensor_ids):
+                raise ValueError("sensor_ids must be non-empty strings")
+
+    def _validate_delay(self, delay_seconds) -> int:
+        """Validate a delay, which needs the scheduler."""
+        if isinstance(delay_seconds, bool) or not isinstance(delay_seconds, int) or delay_seconds < 0:
+            raise ValueError("delay_seconds must be a non-negative integer")
+        if delay_seconds and self.scheduler is None:
+            raise ValueError("Delayed actions require the scheduler to be enabled")
+        return delay_seconds
+
+    def create_rule(self, user_id: str, location_id: str, event_type: str, is_active: bool,
+                    sensor_type: Optional[str] = None, sensor_ids: Optional[List[str]] = None,
+                    delay_seconds: int = 0) -> AutomationRule:
+        """Create a rule on one of the user's locations."""
+        if not self.automation_service.validate_event_type(event_type):
+            raise ValueError(f"Invalid event type: {event_type}. Expected one of {', '.join(EVENT_TYPES)}")
+
+        self._validate_action(user_id, is_active, sensor_type, sensor_ids)
+        self._validate_delay(delay_seconds)
+
+        location = self.location_service.get_location(location_id)
+        if not location or location.profile_id != user_id:
+            raise ValueError(f"Location with ID {location_id} not found")
+
+        rule = AutomationRule(
+            rule_id=str(uuid.uuid4()),
+            user_id=user_id,
+            location_id=location_id,
+            event_type=event_type,
+            target_is_active=is_active,
+            sensor_type=sensor_type,
+            sensor_ids=sensor_ids,
+            delay_seconds=delay_seconds
+        )
+        created_rule = self.repository.create(rule)
+        self.rule_index.upsert(created_rule)
+        return created_rule
+
+    def get_rule(self, rule_id: str) -> Optional[AutomationRule]:
+        """Get a rule by ID."""
+        return self.repository.get_by_id(rule_id)
+
+    def get_rules_by_user(self, user_id: str) -> List[AutomationRule]:
+        """Get all rules of a user."""
+        if not user_id or not user_id.strip():
+            raise ValueError("User ID is required")
+
+        return self.repository.get_by_user_id(user_id)
+
+    def delete_rule(self, rule_id: str) -> bool:
+        """Delete a rule."""
+        deleted = self.repository.delete(rule_id)
+        if deleted:
+            self.rule_index.remove(rule_id)
+        return deleted
+
+    def schedule_action(self, user_id: str, is_active: bool, run_at: Optional[str] = None,
+                        delay_seconds: Optional[int] = None, sensor_type: Optional[str] = None,
+                        sensor_ids: Optional[List[str]] = None) -> ScheduledAction:
+        """Schedule a sensor status change at run_at (ISO 8601, UTC if naive) or after delay_seconds."""
+        if self.scheduler is None:
+            raise ValueError("Delayed actions require the scheduler to be enabled")
+
+        self._validate_action(user_id, is_active, sensor_type, sensor_ids)
+
+        if (run_at is None) == (delay_seconds is None):
+            raise ValueError("Exactly one of run_at or delay_seconds is required")
+        if run_at is not None:
+            try:
+                run_at_time = datetime.fromisoformat(run_at.replace('Z', '+00:00'))
+            except (AttributeError, ValueError):
+                raise ValueError("run_at must be an ISO 8601 timestamp")
+            if run_at_time.tzinfo is None:
+                run_at_time = run_at_time.replace(tzinfo=timezone.utc)
+            timestamp = run_at_time.timestamp()
+            if timestamp < time.time():
+                raise ValueError("run_at must be in the future")
+        else:
+            timestamp = time.time() + self._validate_delay(delay_seconds)
+
+        action = ScheduledAction(
+            user_id=user_id,
+            target_is_active=is_active,
+            run_at=timestamp,
+            sensor_type=sensor_type,
+            sensor_ids=sensor_ids
+        )
+        return self.scheduler.schedule([action])[0]
+
+    def get_scheduled_actions_by_user(self, user_id: str, limit: int = 100) -> List[ScheduledAction]:
+        """Get a user's pending scheduled actions, soonest first."""
+        if not user_id or not user_id.strip():
+            raise ValueError("User ID is required")
+        if self.scheduler is None:
+            return []
+
+        return self.scheduler.repository.get_by_user_id(user_id, limit)
+
+    def cancel_scheduled_action(self, action_id: int) -> bool:
+        """Cancel a pending scheduled action."""
+        if self.scheduler is None:
+            return False
+
+        return self.scheduler.cancel(action_id)
+
+    def warm_rules(self) -> int:
+        """Load every enabled rule into the index."""
+        with self._index_lock:
+            self.rule_index.rebuild(self.repository.get_all_enabled)
+        return len(self.rule_index)
+
+    def _ensure_rules_loaded(self):
+        """Load the index on first use and reload it when it is older than the refresh interval."""
+        loaded_at = self.rule_index.rebuilt_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.rules_refresh_seconds:
+            return
+
+        with self._index_lock:
+            # Another worker may have reloaded it while we waited
+            loaded_at = self.rule_index.rebuilt_at
+            if loaded_at is not None and time.monotonic() - loaded_at < self.rules_refresh_seconds:
+                return
+            try:
+                self.rule_index.rebuild(self.repository.get_all_enabled)
+            except Exception as e:
+                if loaded_at is None:
+                    raise
+                # Keep matching against the previous rules until a reload succeeds
+                logger.error("❌ Automation rules reload failed: %s", e)
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self.counters[name] += amount
+
+    def handle_proximity_event(self, event) -> bool:
+        """Queue the rules reacting to a proximity event without blocking the caller.
+
+        Returns False when automations are disabled or the queue is full, in
+        which case the event is dropped.
+        """
+        if not self.enabled:
+            return False
+
+        self._count('events_received')
+        if not self._pending.acquire(blocking=False):
+            self._count('events_dropped')
+            logger.warning("⚠️ Automation queue full, dropping event %s", event.event_id)
+            return False
+
+        try:
+            self.executor.submit(self._run_event, event)
+        except RuntimeError:
+            # Executor shut down at interpreter exit
+            self._pending.release()
+            self._count('events_dropped')
+            return False
+        return True
+
+    def _run_event(self, event):
+        """Worker: apply the matching rules as batched sensor updates."""
+        try:
+            self.process_event(event)
+        except Exception as e:
+            self._count('errors')
+            logger.error("❌ Automation for %s at %s failed: %s", event.event_type, event.home_location_id, e)
+        finally:
+            self._pending.release()
+
+    def process_event(self, event) -> int:
+        """Apply the rules reacting to a proximity event; returns sensors updated."""
+        self._ensure_rules_loaded()
+        rules = self.rule_index.match(event.home_location_id, event.event_type)
+        self._count('events_processed')
+        if rules:
+            rules = self._owned_rules(event, rules)
+        if not rules:
+            return 0
+
+        self._count('rules_matched', len(rules))
+        delayed: Dict[int, List[AutomationRule]] = {}
+        for rule in rules:
+            if rule.delay_seconds:
+                delayed.setdefault(rule.delay_seconds, []).append(rule)
+        if delayed:
+            self._schedule_delayed(delayed)
+
+        sensors_updated = 0
+        immediate = [rule for rule in rules if not rule.delay_seconds]
+        for user_id, is_active, sensor_type, sensor_ids in self.automation_service.batch_actions(immediate):
+            updated = self.sensor_service.update_sensors_status(
+                is_active, sensor_ids=sensor_ids, user_id=user_id, sensor_type=sensor_type
+            )
+            self._count('sensor_updates')
+            sensors_updated += len(updated)
+
+        self._count('sensors_updated', sensors_updated)
+        return sensors_updated
+
+    def _owned_rules(self, event, rules: List[AutomationRule]) -> List[AutomationRule]:
+        """Keep the rules whose owner also owns the event's device and location.
+
+        Any device can report an event with any location ID, so a rule only
+        runs for its owner's devices at its owner's locations, and only if
+        the event's user_id, when given, is the owner too.
+        """
+        device = self.device_service.get_device(event.device_id)
+        location = self.location_service.get_location(event.home_location_id)
+        owner = device.profile_id if device and location and device.profile_id == location.profile_id else None
+        owned = [rule for rule in rules
+                 if owner is not None and rule.user_id == owner and (not event.user_id or event.user_id == owner)]
+
+        if len(owned) < len(rules):
+            self._count('rules_rejected', len(rules) - len(owned))
+            logger.warning("⚠️ Skipping %d automation rules at %s: device %s does not belong to their owner",
+                           len(rules) - len(owned), event.home_location_id, event.device_id)
+        return owned
+
+    def _schedule_delayed(self, delayed: Dict[int, List[AutomationRule]]):
+        """Schedule the batched actions of delayed rules, grouped by delay."""
+        if self.scheduler is None:
+            logger.warning("⚠️ Scheduler disabled, skipping %d delayed rules",
+                           sum(len(rules) for rules in delayed.values()))
+            return
+
+        now = time.time()
+        actions = [
+            ScheduledAction(user_id=user_id, target_is_active=is_active, run_at=now + delay_seconds,
+                            sensor_type=sensor_type, sensor_ids=sensor_ids)
+            for delay_seconds, rules in delayed.items()
+            for user_id, is_active, sensor_type, sensor_ids in self.automation_service.batch_actions(rules)
+        ]
+        self.scheduler.schedule(actions)
+        self._count('actions_scheduled', len(actions))
+
+    def stats(self) -> dict:
+        """Get automation counters and index size."""
+        with self._stats_lock:
+            counters = dict(self.counters)
+        loaded_at = self.rule_index.rebuilt_at
+        return {
+            'enabled': self.enabled,
+            'rules_indexed': len(self.rule_index),
+            'rules_age_seconds': round(time.monotonic() - loaded_at, 1) if loaded_at is not None else None,
+            'max_pending': self.max_pending,
+            **counters,
+            'scheduler': self.scheduler.stats() if self.scheduler else None
+        }
@@ -0,0 +1,82 @@
+"""Domain entities for Automations context."""
+from datetime import datetime, timezone
+from typing import List, Optional
+
+
+class AutomationRule:
+    """Represents a rule that sets sensor status when a proximity event happens.
+
+    Example: on EXIT of a home location, deactivate every smart_light of the
+    user. sensor_type and sensor_ids narrow the affected sensors; without
+    either, every sensor of the user is affected. With delay_seconds the
+    change is scheduled instead of applied right away.
+    """
+
+    def __init__(self, rule_id: str, user_id: str, location_id: str, event_type: str,
+                 target_is_active: bool, sensor_type: Optional[str] = None,
+                 sensor_ids: Optional[List[str]] = None, enabled: bool = True,
+                 created_at: Optional[datetime] = None, delay_seconds: int = 0):
+        self.rule_id = rule_id
+        self.user_id = user_id
+        self.location_id = location_id
+        self.event_type = event_type
+        self.target_is_active = target_is_active
+        self.sensor_type = sensor_type
+        self.sensor_ids = sensor_ids
+        self.enabled = enabled
+        self.created_at = created_at or datetime.utcnow()
+        self.delay_seconds = delay_seconds
+
+    def to_dict(self) -> dict:
+        """Convert to dictionary representation."""
+        return {
+            'id': self.rule_id,
+            'user_id': self.user_id,
+            'location_id': self.location_id,
+            'event_type': self.event_type,
+            'isActive': self.target_is_active,
+            'sensor_type': self.sensor_type,
+            'sensor_ids': self.sensor_ids,
+            'enabled': self.enabled,
+            'delay_seconds': self.delay_seconds,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class ScheduledAction:
+    """A sensor status change to apply at run_at (epoch seconds).
+
+    The targeted sensors follow the same rules as AutomationRule: sensor_type
+    and sensor_ids narrow them down from every sensor of the user. status is
+    'pending' until the action runs, or 'failed' once its attempts ran out.
+    """
+
+    def __init__(self, user_id: str, target_is_active: bool, run_at: float,
+                 sensor_type: Optional[str] = None, sensor_ids: Optional[List[str]] = None,
+                 action_id: Optional[int] = None, created_at: Optional[datetime] = None,
+                 status: str = 'pending', attempts: int = 0, last_error: Optional[str] = None):
+        self.action_id = action_id
+        self.user_id = user_id
+        self.target_is_active = target_is_active
+        self.run_at = run_at
+        self.sensor_type = sensor_type
+        self.sensor_ids = sensor_ids
+        self.created_at = created_at or datetime.utcnow()
+        self.status = status
+        self.attempts = attempts
+        self.last_error = last_error
+
+    def to_dict(self) -> dict:
+        """Convert to dictionary representation."""
+        return {
+            'id': self.action_id,
+            'user_id': self.user_id,
+            'isActive': self.target_is_active,
+            'sensor_type': self.sensor_type,
+            'sensor_ids': self.sensor_ids,
+            'run_at': datetime.fromtimestamp(self.run_at, timezone.utc).isoformat(),
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
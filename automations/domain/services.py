@@ -0,0 +1,41 @@
+"""Domain services for Automations context."""
+from typing import Dict, List, Optional, Tuple, Union
+from automations.domain.entities import AutomationRule, ScheduledAction
+
+# Proximity event types a rule can react to
+EVENT_TYPES = ('ENTER', 'EXIT')
+
+
+class AutomationService:
+    """Domain service for automation rule logic."""
+
+    @staticmethod
+    def validate_event_type(event_type: str) -> bool:
+        """Check that a rule reacts to a known proximity event type."""
+        return event_type in EVENT_TYPES
+
+    @staticmethod
+    def batch_actions(rules: List[Union[AutomationRule, ScheduledAction]]) -> List[Tuple[str, bool, Optional[str], Optional[List[str]]]]:
+        """Merge the actions of matched rules or due scheduled actions into as few sensor updates as possible.
+
+        Rules setting the same status for the same user and sensor type are
+        combined: explicit sensor_ids are unioned, and a rule without
+        sensor_ids covers all of them. Returns (user_id, is_active,
+        sensor_type, sensor_ids) tuples.
+        """
+        # (user_id, is_active, sensor_type) -> sensor IDs, or None for all
+        merged: Dict[Tuple[str, bool, Optional[str]], Optional[List[str]]] = {}
+        for rule in rules:
+            key = (rule.user_id, rule.target_is_active, rule.sensor_type)
+            if key in merged and merged[key] is None:
+                continue
+            if rule.sensor_ids is None:
+                merged[key] = None
+            else:
+                sensor_ids = merged.setdefault(key, [])
+                sensor_ids.extend(sensor_id for sensor_id in rule.sensor_ids if sensor_id not in sensor_ids)
+
+        return [
+            (user_id, is_active, sensor_type, sensor_ids)
+            for (user_id, is_active, sensor_type), sensor_ids in merged.items()
+        ]
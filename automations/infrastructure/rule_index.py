@@ -0,0 +1,54 @@
+"""In-memory index of automation rules by location and event type."""
+
+from typing import Dict, List, Tuple
+from automations.domain.entities import AutomationRule
+from shared.infrastructure.rebuildable_index import RebuildableIndex
+
+
+class AutomationRuleIndex(RebuildableIndex[AutomationRule]):
+    """Maps (location_id, event_type) to the enabled rules reacting to it.
+
+    Matching a proximity event is a single dictionary lookup. Writes made
+    while a rebuild is loading are replayed onto the rebuilt index.
+    """
+
+    STATE_FIELDS = ('_rules', '_keys')
+
+    def __init__(self):
+        super().__init__()
+        self._rules: Dict[Tuple[str, str], Dict[str, AutomationRule]] = {}
+        self._keys: Dict[str, Tuple[str, str]] = {}
+
+    def _empty(self) -> 'AutomationRuleIndex':
+        return AutomationRuleIndex()
+
+    def _key(self, rule: AutomationRule) -> str:
+        return rule.rule_id
+
+    def _accepts(self, rule: AutomationRule) -> bool:
+        return rule.enabled
+
+    def _add(self, rule: AutomationRule):
+        """Index an enabled rule. Caller holds the lock."""
+        key = (rule.location_id, rule.event_type)
+        self._rules.setdefault(key, {})[rule.rule_id] = rule
+        self._keys[rule.rule_id] = key
+
+    def _discard(self, rule_id: str):
+        """Unindex a rule. Caller holds the lock."""
+        key = self._keys.pop(rule_id, None)
+        if key is None:
+            return
+        rules = self._rules[key]
+        rules.pop(rule_id, None)
+        if not rules:
+            del self._rules[key]
+
+    def match(self, location_id: str, event_type: str) -> List[AutomationRule]:
+        """Get the rules reacting to an event type at a location, oldest first."""
+        with self._lock:
+            rules = list(self._rules.get((location_id, event_type), {}).values())
+        return sorted(rules, key=lambda rule: rule.created_at)
+
+    def __len__(self) -> int:
+        return len(self._keys)
@@ -0,0 +1,133 @@
+"""Scheduled action repository with Supabase implementation."""
+
+from typing import List, Optional, Tuple
+from datetime import datetime
+from automations.domain.entities import ScheduledAction
+from shared.supabase.client import get_supabase_client
+from shared.supabase.timestamps import to_epoch, to_timestamp
+
+PENDING = 'pending'
+FAILED = 'failed'
+
+
+class ScheduledActionSupabaseRepository:
+    """Scheduled actions in Supabase, shared by every worker of every instance.
+
+    The table is a persistent priority queue ordered by run_at. Before
+    running an action a worker claims it with a conditional update, so an
+    action due on several instances at once runs on only one of them; a
+    claim left by a crashed worker expires after the claim timeout.
+    Actions failing max_attempts times are kept with status 'failed'.
+    """
+
+    def __init__(self):
+        self.client = get_supabase_client()
+        self.table_name = 'scheduled_actions'
+
+    def add_many(self, actions: List[ScheduledAction]) -> List[ScheduledAction]:
+        """Save actions with one insert, setting their IDs."""
+        rows = [{
+            'user_id': action.user_id,
+            'target_is_active': action.target_is_active,
+            'sensor_type': action.sensor_type,
+            'sensor_ids': action.sensor_ids,
+            'run_at': to_timestamp(action.run_at),
+            'status': PENDING,
+            'attempts': 0,
+            'created_at': action.created_at.isoformat()
+        } for action in actions]
+
+        response = self.client.table(self.table_name).insert(rows).execute()
+        if len(response.data) != len(actions):
+            raise Exception("Failed to schedule actions")
+        # Rows come back in insert order
+        for action, action_data in zip(actions, response.data):
+            action.action_id = action_data['id']
+        return actions
+
+    def get_by_id(self, action_id: int) -> Optional[ScheduledAction]:
+        """Get a scheduled action by ID."""
+        response = self.client.table(self.table_name).select('*').eq('id', action_id).execute()
+
+        if response.data:
+            return self._map_to_entity(response.data[0])
+        return None
+
+    def get_by_user_id(self, user_id: str, limit: int = 100) -> List[ScheduledAction]:
+        """Get a user's pending and failed actions, soonest first."""
+        response = self.client.table(self.table_name).select('*').eq('user_id', user_id).order('run_at').limit(limit).execute()
+        return [self._map_to_entity(action_data) for action_data in response.data]
+
+    def due_between(self, start: float, end: float, page_size: int = 1000) -> List[Tuple[int, float]]:
+        """Get (id, run_at) of the pending actions with start <= run_at < end."""
+        due = []
+        offset = 0
+        while True:
+            response = (self.client.table(self.table_name).select('id, run_at').eq('status', PENDING)
+                        .gte('run_at', to_timestamp(start)).lt('run_at', to_timestamp(end))
+                        .order('id').range(offset, offset + page_size - 1).execute())
+            due.extend((action_data['id'], to_epoch(action_data['run_at'])) for action_data in response.data)
+
+            if len(response.data) < page_size:
+                return due
+            offset += page_size
+
+    def overdue(self, now: float, limit: int) -> List[Tuple[int, float]]:
+        """Get (id, run_at) of up to limit pending, unclaimed actions already due."""
+        response = (self.client.table(self.table_name).select('id, run_at').eq('status', PENDING)
+                    .lte('run_at', to_timestamp(now))
+                    .or_(f'claimed_until.is.null,claimed_until.lt.{to_timestamp(now)}')
+                    .order('run_at').limit(limit).execute())
+        return [(action_data['id'], to_epoch(action_data['run_at'])) for action_data in response.data]
+
+    def claim(self, action_ids: List[int], now: float, claim_until: float) -> List[ScheduledAction]:
+        """Claim the due, unclaimed pending actions among action_ids; returns the claimed ones."""
+        response = (self.client.table(self.table_name).update({'claimed_until': to_timestamp(claim_until)})
+                    .in_('id', action_ids).eq('status', PENDING).lte('run_at', to_timestamp(now))
+                    .or_(f'claimed_until.is.null,claimed_until.lt.{to_timestamp(now)}')
+                    .execute())
+        return [self._map_to_entity(action_data) for action_data in response.data]
+
+    def count(self) -> int:
+        """Get the number of pending actions."""
+        # limit=0 still returns the exact count in the Content-Range header
+        response = self.client.table(self.table_name).select('id', count='exact').eq('status', PENDING).limit(0).execute()
+        return response.count or 0
+
+    def delete_many(self, action_ids: List[int]) -> int:
+        """Delete actions; returns how many existed."""
+        response = self.client.table(self.table_name).delete().in_('id', action_ids).execute()
+        return len(response.data)
+
+    def reschedule(self, action_ids: List[int], run_at: float, attempts: int, error: str):
+        """Release claimed actions to run again at run_at after a failed attempt."""
+        self.client.table(self.table_name).update({
+            'run_at': to_timestamp(run_at),
+            'attempts': attempts,
+            'last_error': error,
+            'claimed_until': None
+        }).in_('id', action_ids).execute()
+
+    def mark_failed(self, action_ids: List[int], attempts: int, error: str):
+        """Stop retrying claimed actions, keeping them as failed."""
+        self.client.table(self.table_name).update({
+            'status': FAILED,
+            'attempts': attempts,
+            'last_error': error,
+            'claimed_until': None
+        }).in_('id', action_ids).execute()
+
+    def _map_to_entity(self, action_data: dict) -> ScheduledAction:
+        """Map database data to a ScheduledAction entity."""
+        return ScheduledAction(
+            action_id=action_data['id'],
+            user_id=action_data['user_id'],
+            target_is_active=action_data['target_is_active'],
+            run_at=to_epoch(action_data['run_at']),
+            sensor_type=action_data.get('sensor_type'),
+            sensor_ids=action_data.get('sensor_ids'),
+            status=action_data.get('status', PENDING),
+            attempts=action_data.get('attempts', 0),
+            last_error=action_data.get('last_error'),
+            created_at=datetime.fromisoformat(action_data['created_at'].replace('Z', '+00:00')) if action_data.get('created_at') else None
+        )
@@ -0,0 +1,82 @@
+"""Automation rule repository with Supabase implementation."""
+
+from typing import List, Optional
+from datetime import datetime
+from shared.supabase.client import get_supabase_client
+from automations.domain.entities import AutomationRule
+
+
+class AutomationRuleSupabaseRepository:
+    """Automation rule repository using Supabase."""
+
+    def __init__(self):
+        self.client = get_supabase_client()
+        self.table_name = 'automation_rules'
+
+    def create(self, rule: AutomationRule) -> AutomationRule:
+        """Create a new automation rule."""
+        rule_data = {
+            'id': rule.rule_id,
+            'user_id': rule.user_id,
+            'location_id': rule.location_id,
+            'event_type': rule.event_type,
+            'target_is_active': rule.target_is_active,
+            'sensor_type': rule.sensor_type,
+            'sensor_ids': rule.sensor_ids,
+            'enabled': rule.enabled,
+            'delay_seconds': rule.delay_seconds,
+            'created_at': rule.created_at.isoformat() if rule.created_at else datetime.utcnow().isoformat()
+        }
+
+        response = self.client.table(self.table_name).insert(rule_data).execute()
+
+        if response.data:
+            return self._map_to_entity(response.data[0])
+
+        raise Exception("Failed to create automation rule")
+
+    def get_by_id(self, rule_id: str) -> Optional[AutomationRule]:
+        """Get automation rule by ID."""
+        response = self.client.table(self.table_name).select('*').eq('id', rule_id).execute()
+
+        if response.data:
+            return self._map_to_entity(response.data[0])
+
+        return None
+
+    def get_by_user_id(self, user_id: str) -> List[AutomationRule]:
+        """Get all automation rules of a user."""
+        response = self.client.table(self.table_name).select('*').eq('user_id', user_id).order('created_at').execute()
+        return [self._map_to_entity(rule_data) for rule_data in response.data]
+
+    def get_all_enabled(self, page_size: int = 1000) -> List[AutomationRule]:
+        """Get every enabled automation rule, paging through the table."""
+        rules = []
+        start = 0
+        while True:
+            response = self.client.table(self.table_name).select('*').eq('enabled', True).order('id').range(start, start + page_size - 1).execute()
+            rules.extend(self._map_to_entity(rule_data) for rule_data in response.data)
+
+            if len(response.data) < page_size:
+                return rules
+            start += page_size
+
+    def delete(self, rule_id: str) -> bool:
+        """Delete an automation rule."""
+        response = self.client.table(self.table_name).delete().eq('id', rule_id).execute()
+        return len(response.data) > 0
+
+    def _map_to_entity(self, rule_data: dict) -> AutomationRule:
+        """Map database data to AutomationRule entity."""
+        return AutomationRule(
+            rule_id=rule_data['id'],
+            user_id=rule_data['user_id'],
+            location_id=rule_data['location_id'],
+            event_type=rule_data['event_type'],
+            target_is_active=rule_data['target_is_active'],
+            sensor_type=rule_data.get('sensor_type'),
+            sensor_ids=rule_data.get('sensor_ids'),
+            enabled=rule_data.get('enabled', True),
+            delay_seconds=rule_data.get('delay_seconds') or 0,
+            created_at=datetime.fromisoformat(rule_data['created_at'].replace('Z', '+00:00')) if rule_data.get('created_at') else None
+        )
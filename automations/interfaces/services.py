@@ -0,0 +1,322 @@
+"""Interface services for Automations context."""
+from flask import Blueprint, request, jsonify
+from typing import Optional
+from automations.application.services import AutomationApplicationService
+from automations.application.scheduler import ActionScheduler
+from automations.infrastructure.scheduled_action_repository import ScheduledActionSupabaseRepository
+from sensors.interfaces.services import get_sensor_service
+from locations.interfaces.services import get_location_service
+from devices.interfaces.services import get_device_service
+from shared.infrastructure.lazy import lazy_singleton
+from shared.infrastructure.leader_lock import LeaderLock
+from config import get_config
+
+automation_api = Blueprint("automation_api", __name__)
+
+
+@lazy_singleton
+def get_action_scheduler() -> Optional[ActionScheduler]:
+    """Get the action scheduler, or None when disabled. create_app() starts it."""
+    config = get_config()
+    if not config.SCHEDULER_ENABLED:
+        return None
+
+    return ActionScheduler(
+        repository=ScheduledActionSupabaseRepository(),
+        leader_lock=LeaderLock(config.SCHEDULER_LOCK_PATH),
+        sensor_service=get_sensor_service(),
+        poll_seconds=config.SCHEDULER_POLL_SECONDS,
+        horizon_seconds=config.SCHEDULER_HORIZON_SECONDS,
+        batch_size=config.SCHEDULER_BATCH_SIZE,
+        retry_seconds=config.SCHEDULER_RETRY_SECONDS,
+        max_attempts=config.SCHEDULER_MAX_ATTEMPTS,
+        claim_seconds=config.SCHEDULER_CLAIM_SECONDS
+    )
+
+
+@lazy_singleton
+def get_automation_service() -> AutomationApplicationService:
+    """Get the automation application service, built on first use."""
+    return AutomationApplicationService(get_sensor_service(), get_location_service(),
+                                        get_device_service(), get_action_scheduler())
+
+
+@automation_api.route("/api/v1/automations/rules", methods=["POST"])
+def create_automation_rule():
+    """Crear una regla de automatización.
+    ---
+    tags:
+      - Automations
+    description: >
+      Cambia el estado de los sensores del usuario cuando un dispositivo entra
+      o sale de una ubicación. Sin sensor_type ni sensor_ids la regla afecta a
+      todos los sensores del usuario.
+    parameters:
+      - name: rule_data
+        in: body
+        required: true
+        schema:
+          type: object
+          required:
+            - user_id
+            - location_id
+            - event_type
+            - isActive
+          properties:
+            user_id:
+              type: string
+              example: "user_123"
+            location_id:
+              type: string
+              example: "location_001"
+            event_type:
+              type: string
+              enum: [ENTER, EXIT]
+              example: "EXIT"
+            isActive:
+              type: boolean
+              example: false
+            sensor_type:
+              type: string
+              enum: [led_tv, smart_light, air_conditioner, coffee_maker]
+              example: "smart_light"
+            sensor_ids:
+              type: array
+              items:
+                type: string
+            delay_seconds:
+              type: integer
+              description: Segundos de espera antes de aplicar el cambio (0 = inmediato)
+              example: 1800
+    responses:
+      201:
+        description: Regla creada
+      400:
+        description: Datos inválidos
+      404:
+        description: Ubicación no encontrada
+    """
+    try:
+        data = request.get_json()
+        rule = get_automation_service().create_rule(
+            user_id=data['user_id'],
+            location_id=data['location_id'],
+            event_type=data['event_type'],
+            is_active=data['isActive'],
+            sensor_type=data.get('sensor_type'),
+            sensor_ids=data.get('sensor_ids'),
+            delay_seconds=data.get('delay_seconds', 0)
+        )
+        return jsonify(rule.to_dict()), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404 if 'not found' in str(e) else 400
+    except KeyError as e:
+        return jsonify({"error": f"Missing required field: {e}"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@automation_api.route("/api/v1/automations/rules/user/<user_id>", methods=["GET"])
+def get_automation_rules_by_user(user_id):
+    """Listar las reglas de automatización de un usuario.
+    ---
+    tags:
+      - Automations
+    parameters:
+      - in: path
+        name: user_id
+        required: true
+        type: string
+    responses:
+      200:
+        description: Reglas del usuario
+    """
+    try:
+        rules = get_automation_service().get_rules_by_user(user_id)
+        return jsonify([rule.to_dict() for rule in rules]), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@automation_api.route("/api/v1/automations/rules/<rule_id>", methods=["GET"])
+def get_automation_rule(rule_id):
+    """Obtener una regla de automatización.
+    ---
+    tags:
+      - Automations
+    parameters:
+      - in: path
+        name: rule_id
+        required: true
+        type: string
+    responses:
+      200:
+        description: Regla encontrada
+      404:
+        description: Regla no encontrada
+    """
+    try:
+        rule = get_automation_service().get_rule(rule_id)
+        if not rule:
+            return jsonify({"error": "Automation rule not found"}), 404
+        return jsonify(rule.to_dict()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@automation_api.route("/api/v1/automations/rules/<rule_id>", methods=["DELETE"])
+def delete_automation_rule(rule_id):
+    """Eliminar una regla de automatización.
+    ---
+    tags:
+      - Automations
+    parameters:
+      - in: path
+        name: rule_id
+        required: true
+        type: string
+    responses:
+      200:
+        description: Regla eliminada
+      404:
+        description: Regla no encontrada
+    """
+    try:
+        if get_automation_service().delete_rule(rule_id):
+            return jsonify({"message": "Automation rule deleted successfully"}), 200
+        return jsonify({"error": "Automation rule not found"}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@automation_api.route("/api/v1/automations/scheduled-actions", methods=["POST"])
+def create_scheduled_action():
+    """Programar un cambio de estado de sensores.
+    ---
+    tags:
+      - Automations
+    description: >
+      Aplica el cambio en run_at (ISO 8601, UTC si no tiene zona horaria) o
+      tras delay_seconds; se debe indicar exactamente uno de los dos.
+    parameters:
+      - name: action_data
+        in: body
+        required: true
+        schema:
+          type: object
+          required:
+            - user_id
+            - isActive
+          properties:
+            user_id:
+              type: string
+              example: "user_123"
+            isActive:
+              type: boolean
+              example: true
+            run_at:
+              type: string
+              example: "2025-06-19T18:00:00-05:00"
+            delay_seconds:
+              type: integer
+              example: 1800
+            sensor_type:
+              type: string
+              enum: [led_tv, smart_light, air_conditioner, coffee_maker]
+              example: "air_conditioner"
+            sensor_ids:
+              type: array
+              items:
+                type: string
+    responses:
+      201:
+        description: Acción programada
+      400:
+        description: Datos inválidos
+    """
+    try:
+        data = request.get_json()
+        action = get_automation_service().schedule_action(
+            user_id=data['user_id'],
+            is_active=data['isActive'],
+            run_at=data.get('run_at'),
+            delay_seconds=data.get('delay_seconds'),
+            sensor_type=data.get('sensor_type'),
+            sensor_ids=data.get('sensor_ids')
+        )
+        return jsonify(action.to_dict()), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except KeyError as e:
+        return jsonify({"error": f"Missing required field: {e}"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@automation_api.route("/api/v1/automations/scheduled-actions/user/<user_id>", methods=["GET"])
+def get_scheduled_actions_by_user(user_id):
+    """Listar las acciones programadas pendientes de un usuario.
+    ---
+    tags:
+      - Automations
+    parameters:
+      - in: path
+        name: user_id
+        required: true
+        type: string
+      - in: query
+        name: limit
+        type: integer
+        default: 100
+    responses:
+      200:
+        description: Acciones pendientes, de la más próxima a la más lejana
+    """
+    try:
+        limit = int(request.args.get('limit', 100))
+        actions = get_automation_service().get_scheduled_actions_by_user(user_id, limit)
+        return jsonify([action.to_dict() for action in actions]), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@automation_api.route("/api/v1/automations/scheduled-actions/<int:action_id>", methods=["DELETE"])
+def cancel_scheduled_action(action_id):
+    """Cancelar una acción programada.
+    ---
+    tags:
+      - Automations
+    parameters:
+      - in: path
+        name: action_id
+        required: true
+        type: integer
+    responses:
+      200:
+        description: Acción cancelada
+      404:
+        description: Acción no encontrada
+    """
+    try:
+        if get_automation_service().cancel_scheduled_action(action_id):
+            return jsonify({"message": "Scheduled action cancelled successfully"}), 200
+        return jsonify({"error": "Scheduled action not found"}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@automation_api.route("/api/v1/automations/stats", methods=["GET"])
+def automation_stats():
+    """Contadores del motor de automatizaciones.
+    ---
+    tags:
+      - Automations
+    responses:
+      200:
+        description: Eventos recibidos, descartados y procesados, reglas aplicadas, sensores actualizados y estado del programador
+    """
+    return jsonify(get_automation_service().stats()), 200
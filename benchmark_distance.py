@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Benchmark of the distance modes against geopy.
+
+Accuracy against geopy is checked by tests/test_distance.py.
+"""
+
+import math
+import random
+import sys
+import time
+
+from geopy.distance import great_circle
+from locations.domain.compiled import CompiledGeofences
+from locations.domain.entities import Location
+from locations.domain.services import (
+    LocationService, DISTANCE_MODE_EXACT, DISTANCE_MODE_TIERED, FAST_PATH_MAX_LATITUDE
+)
+from locations.domain.geometry import METERS_PER_DEGREE
+
+SAMPLES = 200000
+SEED = 42
+
+
+def random_case(rng: random.Random):
+    """Build a geofence and a device fix, biased towards its boundary."""
+    latitude = rng.uniform(-FAST_PATH_MAX_LATITUDE - 4, FAST_PATH_MAX_LATITUDE + 4)
+    longitude = rng.uniform(-180.0, 180.0)
+    radius = 10 ** rng.uniform(1, 4)
+    location = Location('bench', 'Bench', latitude, longitude, radius, 'bench-profile')
+
+    # Half of the fixes land within 1% of the radius from the boundary
+    if rng.random() < 0.5:
+        offset = radius * (1 + rng.uniform(-0.01, 0.01))
+    else:
+        offset = rng.uniform(0, radius * 20)
+    bearing = rng.uniform(0, 2 * math.pi)
+    device_lat = max(min(latitude + offset * math.cos(bearing) / METERS_PER_DEGREE, 90.0), -90.0)
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    device_lon = longitude + offset * math.sin(bearing) / (METERS_PER_DEGREE * cos_lat)
+    device_lon = (device_lon + 540.0) % 360.0 - 180.0
+    return location, device_lat, device_lon
+
+
+def main() -> int:
+    rng = random.Random(SEED)
+    cases = [random_case(rng) for _ in range(SAMPLES)]
+    compiled_cases = [(CompiledGeofences([location]), device_lat, device_lon)
+                      for location, device_lat, device_lon in cases]
+    exact_service = LocationService(DISTANCE_MODE_EXACT)
+    tiered_service = LocationService(DISTANCE_MODE_TIERED)
+
+    print(f"Benchmarking {SAMPLES} proximity distance checks...")
+    start = time.perf_counter()
+    for location, device_lat, device_lon in cases:
+        great_circle((location.latitude, location.longitude), (device_lat, device_lon))
+    geopy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for compiled, device_lat, device_lon in compiled_cases:
+        exact_service.measure_compiled(compiled, device_lat, device_lon)
+    exact_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for compiled, device_lat, device_lon in compiled_cases:
+        tiered_service.measure_compiled(compiled, device_lat, device_lon)
+    tiered_seconds = time.perf_counter() - start
+
+    print(f"  geopy great_circle:         {geopy_seconds / SAMPLES * 1e6:.2f} µs/check")
+    print(f"  exact (haversine):          {exact_seconds / SAMPLES * 1e6:.2f} µs/check")
+    print(f"  tiered:                     {tiered_seconds / SAMPLES * 1e6:.2f} µs/check")
+
+    fallbacks = 0
+    for (location, _, _), (compiled, device_lat, device_lon) in zip(cases, compiled_cases):
+        [(distance, clearance)] = tiered_service.measure_compiled(compiled, device_lat, device_lon)
+        # The fast path reports a clearance reduced by its error bound
+        if clearance == abs(distance - location.radius):
+            fallbacks += 1
+    print(f"  exact fallbacks:            {fallbacks / SAMPLES:.2%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
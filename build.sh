@@ -14,4 +14,7 @@ else:
     exit(1)
 "
 
+echo "Freezing OpenAPI spec..."
+WARMUP_ENABLED=false FLASK_ENV=production flask --app app freeze-openapi || exit 1
+
 echo "Build completed successfully!"
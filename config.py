@@ -1,6 +1,7 @@
 """Configuration settings for GeoEntry Edge API."""
 
 import os
+import tempfile
 
 class Config:
     """Base configuration class."""
@@ -14,6 +15,150 @@ class Config:
     HOST = os.environ.get('HOST', '0.0.0.0')
     PORT = int(os.environ.get('PORT', 5000))
     
+    # Proximity result cache (per-worker memoization of check_proximity)
+    PROXIMITY_CACHE_ENABLED = os.environ.get('PROXIMITY_CACHE_ENABLED', 'True').lower() == 'true'
+    PROXIMITY_CACHE_MARGIN_METERS = float(os.environ.get('PROXIMITY_CACHE_MARGIN_METERS', 10.0))
+    PROXIMITY_CACHE_MAX_ENTRIES = int(os.environ.get('PROXIMITY_CACHE_MAX_ENTRIES', 50000))
+    PROXIMITY_CACHE_TTL_SECONDS = float(os.environ.get('PROXIMITY_CACHE_TTL_SECONDS', 30.0))
+    
+    # Stationary-device suppression in front of proximity checks
+    STATIONARY_FILTER_ENABLED = os.environ.get('STATIONARY_FILTER_ENABLED', 'True').lower() == 'true'
+    STATIONARY_THRESHOLD_METERS = float(os.environ.get('STATIONARY_THRESHOLD_METERS', 5.0))
+    STATIONARY_WINDOW_SECONDS = float(os.environ.get('STATIONARY_WINDOW_SECONDS', 60.0))
+    STATIONARY_MAX_DEVICES = int(os.environ.get('STATIONARY_MAX_DEVICES', 100000))
+    
+    # GPS smoothing and hysteresis against ENTER/EXIT flapping
+    GPS_SMOOTHING_ENABLED = os.environ.get('GPS_SMOOTHING_ENABLED', 'False').lower() == 'true'
+    GPS_PROCESS_NOISE_MPS = float(os.environ.get('GPS_PROCESS_NOISE_MPS', 3.0))
+    GPS_DEFAULT_ACCURACY_METERS = float(os.environ.get('GPS_DEFAULT_ACCURACY_METERS', 20.0))
+    GPS_FILTER_RESET_SECONDS = float(os.environ.get('GPS_FILTER_RESET_SECONDS', 300.0))
+    GPS_MAX_TRACKED_DEVICES = int(os.environ.get('GPS_MAX_TRACKED_DEVICES', 100000))
+    PROXIMITY_HYSTERESIS_METERS = float(os.environ.get('PROXIMITY_HYSTERESIS_METERS', 5.0))
+    
+    # Distance computation: 'exact' (great-circle) or 'tiered' (equirectangular
+    # with exact fallback near boundaries)
+    DISTANCE_MODE = os.environ.get('DISTANCE_MODE', 'tiered')
+    
+    # Per-profile compiled geofence arrays (proximity checks and nearby queries)
+    GEOFENCE_COMPILED_CACHE_ENABLED = os.environ.get('GEOFENCE_COMPILED_CACHE_ENABLED', 'True').lower() == 'true'
+    GEOFENCE_INDEX_TTL_SECONDS = float(os.environ.get('GEOFENCE_INDEX_TTL_SECONDS', 30.0))
+    GEOFENCE_INDEX_MAX_PROFILES = int(os.environ.get('GEOFENCE_INDEX_MAX_PROFILES', 10000))
+    NEARBY_DEFAULT_LIMIT = int(os.environ.get('NEARBY_DEFAULT_LIMIT', 5))
+    NEARBY_MAX_LIMIT = int(os.environ.get('NEARBY_MAX_LIMIT', 50))
+    
+    # Push a lat/lon bounding box into get_active_locations; distant geofences
+    # are then left out of proximity results. Only applies without the compiled
+    # cache, which always loads whole profiles (see check_config)
+    LOCATION_BBOX_PUSHDOWN = os.environ.get('LOCATION_BBOX_PUSHDOWN', 'False').lower() == 'true'
+    
+    # Global reverse geofence index (all profiles)
+    GLOBAL_INDEX_CELL_DEGREES = float(os.environ.get('GLOBAL_INDEX_CELL_DEGREES', 0.01))
+    GLOBAL_INDEX_MAX_CELLS_PER_LOCATION = int(os.environ.get('GLOBAL_INDEX_MAX_CELLS_PER_LOCATION', 256))
+    GLOBAL_INDEX_REFRESH_SECONDS = float(os.environ.get('GLOBAL_INDEX_REFRESH_SECONDS', 300.0))
+    
+    # Bulk sensor status updates ("scenes")
+    SENSOR_BULK_MAX_IDS = int(os.environ.get('SENSOR_BULK_MAX_IDS', 500))
+    
+    # Memory-mapped snapshot of compiled geofences shared by all worker processes
+    SHARED_GEOFENCE_INDEX_ENABLED = os.environ.get('SHARED_GEOFENCE_INDEX_ENABLED', 'False').lower() == 'true'
+    SHARED_GEOFENCE_INDEX_PATH = os.environ.get('SHARED_GEOFENCE_INDEX_PATH', os.path.join(tempfile.gettempdir(), 'geoentry-geofences.bin'))
+    SHARED_GEOFENCE_INDEX_REFRESH_SECONDS = float(os.environ.get('SHARED_GEOFENCE_INDEX_REFRESH_SECONDS', 15.0))
+    SHARED_GEOFENCE_INDEX_MAX_AGE_SECONDS = float(os.environ.get('SHARED_GEOFENCE_INDEX_MAX_AGE_SECONDS', 30.0))
+    
+    # Startup warm-up (readiness probe at /ready). Known device IDs are trusted
+    # for the TTL, which bounds how long a device deleted through another
+    # worker keeps passing the existence check on this one
+    WARMUP_ENABLED = os.environ.get('WARMUP_ENABLED', 'True').lower() == 'true'
+    WARMUP_MAX_WORKERS = int(os.environ.get('WARMUP_MAX_WORKERS', 4))
+    DEVICE_ID_CACHE_TTL_SECONDS = float(os.environ.get('DEVICE_ID_CACHE_TTL_SECONDS', 30.0))
+    
+    # API docs: the OpenAPI spec is frozen to a file and served with an ETag.
+    # Disabling Swagger UI skips Flasgger; the frozen spec is still served.
+    SWAGGER_UI_ENABLED = os.environ.get('SWAGGER_UI_ENABLED', 'True').lower() == 'true'
+    OPENAPI_SPEC_PATH = os.environ.get('OPENAPI_SPEC_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'openapi.json'))
+    OPENAPI_SPEC_MAX_AGE_SECONDS = int(os.environ.get('OPENAPI_SPEC_MAX_AGE_SECONDS', 86400))
+    
+    # Logging: JSON lines written by a background thread; backend calls slower
+    # than the threshold are logged with their table, filters and row count
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200.0))
+    
+    # Per-request stage timing (Server-Timing header and log line) and
+    # cProfile dumps for a sampled fraction of requests (0 disables)
+    REQUEST_TIMING_ENABLED = os.environ.get('REQUEST_TIMING_ENABLED', 'True').lower() == 'true'
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.0))
+    PROFILE_DIRECTORY = os.environ.get('PROFILE_DIRECTORY', os.path.join(tempfile.gettempdir(), 'geoentry-profiles'))
+    
+    # Time budget for create_app(), module imports not included; exceeding it is logged
+    STARTUP_TIME_BUDGET_SECONDS = float(os.environ.get('STARTUP_TIME_BUDGET_SECONDS', 1.0))
+    
+    # Automation rules run after proximity events on a bounded worker pool;
+    # events beyond AUTOMATION_MAX_PENDING queued ones are dropped
+    AUTOMATION_ENABLED = os.environ.get('AUTOMATION_ENABLED', 'True').lower() == 'true'
+    AUTOMATION_MAX_WORKERS = int(os.environ.get('AUTOMATION_MAX_WORKERS', 4))
+    AUTOMATION_MAX_PENDING = int(os.environ.get('AUTOMATION_MAX_PENDING', 1000))
+    AUTOMATION_RULES_REFRESH_SECONDS = float(os.environ.get('AUTOMATION_RULES_REFRESH_SECONDS', 60))
+    
+    # Per-user sensor state cache, updated by this worker's status writes; the
+    # TTL bounds staleness from writes made by other workers or clients
+    SENSOR_CACHE_ENABLED = os.environ.get('SENSOR_CACHE_ENABLED', 'True').lower() == 'true'
+    SENSOR_CACHE_TTL_SECONDS = float(os.environ.get('SENSOR_CACHE_TTL_SECONDS', 30.0))
+    SENSOR_CACHE_MAX_USERS = int(os.environ.get('SENSOR_CACHE_MAX_USERS', 10000))
+    
+    # Sensor state history: status writes are appended in batches to a
+    # run-length log in Supabase (sensor_state_current) with daily on-time and
+    # toggle rollups (sensor_state_daily); a worker claims a sensor's row for
+    # up to SENSOR_HISTORY_CLAIM_SECONDS while adding to its rollups
+    SENSOR_HISTORY_ENABLED = os.environ.get('SENSOR_HISTORY_ENABLED', 'False').lower() == 'true'
+    SENSOR_HISTORY_CLAIM_SECONDS = float(os.environ.get('SENSOR_HISTORY_CLAIM_SECONDS', 30))
+    SENSOR_HISTORY_FLUSH_SECONDS = float(os.environ.get('SENSOR_HISTORY_FLUSH_SECONDS', 1.0))
+    SENSOR_HISTORY_BATCH_SIZE = int(os.environ.get('SENSOR_HISTORY_BATCH_SIZE', 1000))
+    SENSOR_HISTORY_QUEUE_SIZE = int(os.environ.get('SENSOR_HISTORY_QUEUE_SIZE', 100000))
+    SENSOR_HISTORY_MAX_DAYS = int(os.environ.get('SENSOR_HISTORY_MAX_DAYS', 366))
+    
+    # Delayed and timed sensor actions, stored in Supabase (scheduled_actions)
+    # and polled by one worker per host, elected through a lock file; actions
+    # are claimed before running so each runs on one instance only, and ones
+    # failing SCHEDULER_MAX_ATTEMPTS times are kept as failed
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'True').lower() == 'true'
+    SCHEDULER_LOCK_PATH = os.environ.get('SCHEDULER_LOCK_PATH', os.path.join(tempfile.gettempdir(), 'geoentry-scheduler.lock'))
+    SCHEDULER_POLL_SECONDS = float(os.environ.get('SCHEDULER_POLL_SECONDS', 1.0))
+    SCHEDULER_HORIZON_SECONDS = float(os.environ.get('SCHEDULER_HORIZON_SECONDS', 300))
+    SCHEDULER_BATCH_SIZE = int(os.environ.get('SCHEDULER_BATCH_SIZE', 500))
+    SCHEDULER_RETRY_SECONDS = float(os.environ.get('SCHEDULER_RETRY_SECONDS', 30))
+    SCHEDULER_MAX_ATTEMPTS = int(os.environ.get('SCHEDULER_MAX_ATTEMPTS', 5))
+    SCHEDULER_CLAIM_SECONDS = float(os.environ.get('SCHEDULER_CLAIM_SECONDS', 60))
+    
+    # Bulk device endpoints: IDs per `in` query and rows per insert statement
+    DEVICE_BULK_MAX_ITEMS = int(os.environ.get('DEVICE_BULK_MAX_ITEMS', 10000))
+    DEVICE_BULK_CHUNK_SIZE = int(os.environ.get('DEVICE_BULK_CHUNK_SIZE', 500))
+    
+    # Device authentication. With DEVICE_AUTH_REQUIRED, device endpoints need a
+    # signed token (Authorization: Bearer) or X-API-Key; otherwise requests
+    # without either still only need a known X-Device-ID. A presented
+    # credential must be valid either way. Tokens are disabled
+    # unless DEVICE_TOKEN_SECRET is set, and it must match across workers.
+    # Issuing a key needs the device's current credential or, for its first
+    # key, DEVICE_ADMIN_API_KEY (X-Admin-Key); unset, only rotation works.
+    # Rotated or deleted keys stay valid on other workers until
+    # DEVICE_API_KEY_CACHE_TTL_SECONDS expires. Tokens are verified without
+    # the database, so they stay valid until they expire; the short TTL bounds
+    # revocation. DEVICE_TOKEN_REVOCATION_CHECK also rejects tokens whose key
+    # this worker has in memory and knows to be rotated or deleted.
+    DEVICE_AUTH_REQUIRED = os.environ.get('DEVICE_AUTH_REQUIRED', 'False').lower() == 'true'
+    DEVICE_TOKEN_SECRET = os.environ.get('DEVICE_TOKEN_SECRET', '')
+    DEVICE_ADMIN_API_KEY = os.environ.get('DEVICE_ADMIN_API_KEY', '')
+    DEVICE_TOKEN_TTL_SECONDS = int(os.environ.get('DEVICE_TOKEN_TTL_SECONDS', 300))
+    DEVICE_TOKEN_REVOCATION_CHECK = os.environ.get('DEVICE_TOKEN_REVOCATION_CHECK', 'False').lower() == 'true'
+    DEVICE_API_KEY_CACHE_TTL_SECONDS = float(os.environ.get('DEVICE_API_KEY_CACHE_TTL_SECONDS', 60.0))
+
+    # Device last-seen tracking: authenticated device requests update an
+    # in-memory table, persisted with one upsert per flush interval, so each
+    # device is written at most once per interval
+    DEVICE_PRESENCE_ENABLED = os.environ.get('DEVICE_PRESENCE_ENABLED', 'True').lower() == 'true'
+    DEVICE_PRESENCE_FLUSH_SECONDS = float(os.environ.get('DEVICE_PRESENCE_FLUSH_SECONDS', 60.0))
+    DEVICE_STALE_AFTER_SECONDS = float(os.environ.get('DEVICE_STALE_AFTER_SECONDS', 300.0))
     
 class DevelopmentConfig(Config):
     """Development configuration."""
@@ -23,8 +168,25 @@ class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
 
+# Configuration passed to create_app(), taking precedence over FLASK_ENV
+_active_config = None
+
+def use_config(config):
+    """Make get_config() return the given configuration."""
+    global _active_config
+    _active_config = config
+
+def check_config(config):
+    """Refuse settings that would silently lose data or be silently ignored."""
+    if config.LOCATION_BBOX_PUSHDOWN and config.GEOFENCE_COMPILED_CACHE_ENABLED:
+        raise ValueError("LOCATION_BBOX_PUSHDOWN has no effect with GEOFENCE_COMPILED_CACHE_ENABLED; "
+                         "disable one of them")
+
+
 def get_config():
     """Get configuration based on environment."""
+    if _active_config is not None:
+        return _active_config
     env = os.environ.get('FLASK_ENV', 'development')
     if env == 'production':
         return ProductionConfig()
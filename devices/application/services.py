@@ -1,9 +1,20 @@
 """Application services for Devices context."""
-from typing import List, Optional
+import hmac
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
 from devices.domain.entities import Device
 from devices.domain.services import DeviceService
+from devices.domain.credentials import DeviceCredentialService
 from devices.infrastructure.supabase_repository import DeviceSupabaseRepository
+from devices.infrastructure.api_key_repository import DeviceApiKeySupabaseRepository
+from devices.infrastructure.presence_repository import DevicePresenceSupabaseRepository
+from devices.infrastructure.presence_tracker import DevicePresenceTracker
+from config import get_config
 
+logger = logging.getLogger(__name__)
 
 class DeviceApplicationService:
     """Application service for device management."""
@@ -11,6 +22,32 @@ class DeviceApplicationService:
     def __init__(self):
         self.repository = DeviceSupabaseRepository()
         self.device_service = DeviceService()
+        # Device IDs confirmed to exist, with the monotonic time of confirmation
+        self.known_device_ids: Dict[str, float] = {}
+        config = get_config()
+        self.known_device_ttl = config.DEVICE_ID_CACHE_TTL_SECONDS
+        self._known_lock = threading.Lock()
+        self.bulk_max_items = config.DEVICE_BULK_MAX_ITEMS
+        self.bulk_chunk_size = config.DEVICE_BULK_CHUNK_SIZE
+        
+        self.api_key_repository = DeviceApiKeySupabaseRepository()
+        self.credential_service = DeviceCredentialService()
+        # device_id -> ((salt, key_hash), loaded_at)
+        self.api_key_hashes: Dict[str, tuple] = {}
+        self.api_key_cache_ttl = config.DEVICE_API_KEY_CACHE_TTL_SECONDS
+        self.token_secret = config.DEVICE_TOKEN_SECRET
+        self.token_ttl = config.DEVICE_TOKEN_TTL_SECONDS
+        self.token_revocation_check = config.DEVICE_TOKEN_REVOCATION_CHECK
+        self.auth_required = config.DEVICE_AUTH_REQUIRED
+        self.admin_api_key = config.DEVICE_ADMIN_API_KEY
+        
+        self.presence = DevicePresenceTracker(
+            DevicePresenceSupabaseRepository(),
+            flush_seconds=config.DEVICE_PRESENCE_FLUSH_SECONDS,
+            chunk_size=self.bulk_chunk_size,
+            existing_ids=self.repository.get_existing_ids
+        ) if config.DEVICE_PRESENCE_ENABLED else None
+        self.stale_after = config.DEVICE_STALE_AFTER_SECONDS
 
     def create_device(self, device_id: str, name: str, device_type: str, profile_id: str) -> Device:
         """Create a new device."""
@@ -27,12 +64,102 @@ class DeviceApplicationService:
             profile_id=profile_id
         )
         
-        return self.repository.create(device)
+        created_device = self.repository.create(device)
+        self._remember_device(created_device.device_id)
+        return created_device
+    
+    def create_devices(self, items: List[dict]) -> List[dict]:
+        """Create many devices, returning one result per item in request order.
+        
+        Existence is checked with one `in` query and the new devices are
+        inserted with one multi-row insert per chunk. Each result has the
+        item's index, device_id and a status of created, invalid, duplicate
+        (repeated in the request), exists, failed or unknown (the insert
+        succeeded but did not return the row, so it may not have been created).
+        """
+        if not isinstance(items, list) or not items:
+            raise ValueError("devices must be a non-empty list")
+        if len(items) > self.bulk_max_items:
+            raise ValueError(f"At most {self.bulk_max_items} devices can be created at once")
+        
+        results = []
+        pending: Dict[str, int] = {}
+        for index, item in enumerate(items):
+            fields = [item.get(key) for key in ('device_id', 'name', 'type', 'profile_id')] if isinstance(item, dict) else []
+            device_id = fields[0] if fields else None
+            result = {'index': index, 'device_id': device_id}
+            results.append(result)
+            if (len(fields) != 4 or not all(isinstance(field, str) for field in fields)
+                    or not self.device_service.validate_device_data(*fields)):
+                result.update(status='invalid', error="Invalid device data")
+            elif device_id in pending:
+                result.update(status='duplicate', error=f"Device ID {device_id} is repeated in the request")
+            else:
+                pending[device_id] = index
+        
+        for device_id in self.repository.get_existing_ids(list(pending), self.bulk_chunk_size):
+            results[pending.pop(device_id)].update(
+                status='exists', error=f"Device with ID {device_id} already exists"
+            )
+        
+        devices = [
+            Device(device_id=device_id, name=items[index]['name'],
+                   device_type=items[index]['type'], profile_id=items[index]['profile_id'])
+            for device_id, index in pending.items()
+        ]
+        for start in range(0, len(devices), self.bulk_chunk_size):
+            for device, status, error in self._create_chunk(devices[start:start + self.bulk_chunk_size]):
+                result = results[pending[device.device_id]]
+                if status == 'created':
+                    result.update(status=status, device=device.to_dict())
+                    self._remember_device(device.device_id)
+                else:
+                    result.update(status=status, error=error)
+        return results
+    
+    def _create_chunk(self, devices: List[Device]) -> List[tuple]:
+        """Insert a chunk in one statement, falling back to single inserts if it fails.
+        
+        A device created by someone else since the existence check makes the
+        whole insert fail; retrying one by one pins the error on that item.
+        Returned rows are matched by ID, and devices the insert did not
+        return (row-level security, triggers) are reported as unknown.
+        Returns (device, status, error) triples, one per device.
+        """
+        try:
+            created = {device.device_id: device for device in self.repository.create_many(devices)}
+        except Exception as e:
+            logger.warning("⚠️ Bulk insert of %d devices failed, retrying one by one: %s", len(devices), e)
+        else:
+            return [
+                (created[device.device_id], 'created', None) if device.device_id in created
+                else (device, 'unknown', "The insert did not return this device")
+                for device in devices
+            ]
+        
+        outcomes = []
+        for device in devices:
+            try:
+                outcomes.append((self.repository.create(device), 'created', None))
+            except Exception as e:
+                outcomes.append((device, 'failed', str(e)))
+        return outcomes
     
     def get_device(self, device_id: str) -> Optional[Device]:
         """Get device by ID."""
         return self.repository.get_by_id(device_id)
     
+    def get_devices(self, device_ids: List[str]) -> List[Device]:
+        """Get many devices by ID with one `in` query per chunk."""
+        if not isinstance(device_ids, list) or not device_ids:
+            raise ValueError("device_ids must be a non-empty list")
+        if len(device_ids) > self.bulk_max_items:
+            raise ValueError(f"At most {self.bulk_max_items} devices can be fetched at once")
+        if any(not isinstance(device_id, str) or not device_id.strip() for device_id in device_ids):
+            raise ValueError("device_ids must be non-empty strings")
+        
+        return self.repository.get_by_ids(list(dict.fromkeys(device_ids)), self.bulk_chunk_size)
+    
     def get_devices_by_profile(self, profile_id: str) -> List[Device]:
         """Get all devices for a profile."""
         return self.repository.get_by_profile_id(profile_id)
@@ -52,8 +179,238 @@ class DeviceApplicationService:
     
     def delete_device(self, device_id: str) -> bool:
         """Delete a device."""
+        self._forget_device(device_id)
+        # Revokes the device's key; the keyless entry lets this worker's
+        # revocation check reject its tokens too
+        self.api_key_hashes[device_id] = (None, time.monotonic())
+        self.api_key_repository.delete(device_id)
+        if self.presence is not None:
+            self.presence.repository.delete(device_id)
         return self.repository.delete(device_id)
     
     def device_exists(self, device_id: str) -> bool:
-        """Check if device exists."""
-        return self.repository.exists(device_id)
\ No newline at end of file
+        """Check if device exists, trusting recent confirmations for the cache TTL.
+        
+        Deletions only clear this worker's cache, so other workers keep
+        accepting a deleted device until its confirmation is older than the TTL.
+        """
+        confirmed_at = self.known_device_ids.get(device_id)
+        if confirmed_at is not None and time.monotonic() - confirmed_at <= self.known_device_ttl:
+            return True
+        
+        exists = self.repository.exists(device_id)
+        if exists:
+            self._remember_device(device_id)
+        else:
+            # Deleted through another worker, or never existed
+            self._forget_device(device_id)
+        return exists
+    
+    def warm_device_ids(self) -> int:
+        """Preload the IDs of every device so authentication skips the database."""
+        device_ids = self.repository.get_all_ids()
+        confirmed_at = time.monotonic()
+        with self._known_lock:
+            for device_id in device_ids:
+                self.known_device_ids[device_id] = confirmed_at
+        return len(device_ids)
+    
+    def issue_api_key(self, device_id: str, token: Optional[str] = None, api_key: Optional[str] = None,
+                      admin_key: Optional[str] = None) -> str:
+        """Generate a new API key for a device, replacing the previous one.
+        
+        Needs the device's current token or API key, or the admin key; a
+        device without a key can only get its first one with the admin key.
+        Only the salted hash is stored; the key itself is returned once.
+        Other workers keep accepting the old key, and tokens issued for it,
+        until their key cache expires.
+        """
+        if not self.device_exists(device_id):
+            raise ValueError(f"Device with ID {device_id} not found")
+        if not self._may_rotate_key(device_id, token, api_key, admin_key):
+            raise PermissionError("Issuing a device API key needs its current token or API key, or the admin key")
+        
+        api_key = self.credential_service.generate_api_key()
+        salt = self.credential_service.generate_salt()
+        key_hash = self.credential_service.hash_api_key(api_key, salt)
+        self.api_key_repository.save(device_id, salt, key_hash)
+        self.api_key_hashes[device_id] = ((salt, key_hash), time.monotonic())
+        return api_key
+    
+    def _may_rotate_key(self, device_id: str, token: Optional[str], api_key: Optional[str],
+                        admin_key: Optional[str]) -> bool:
+        """Check that a key request carries the admin key or the device's current credential.
+        
+        Unlike request authentication, a token must have been issued for the
+        device's current key, which is looked up if not cached.
+        """
+        if admin_key and self.admin_api_key and hmac.compare_digest(admin_key, self.admin_api_key):
+            return True
+        if token:
+            if not self.token_secret:
+                return False
+            claims = self.credential_service.verify_token(token, self.token_secret, time.time())
+            if claims is None or claims[0] != device_id:
+                return False
+            key = self._get_api_key(device_id)
+            return key is not None and self.credential_service.key_id(key[1]) == claims[2]
+        return bool(api_key) and self.verify_api_key(device_id, api_key)
+    
+    def _get_api_key(self, device_id: str) -> Optional[Tuple[str, str]]:
+        """Get a device's (salt, key_hash), cached for the key cache TTL."""
+        entry = self.api_key_hashes.get(device_id)
+        if entry is None or time.monotonic() - entry[1] > self.api_key_cache_ttl:
+            key = self.api_key_repository.get_by_device_id(device_id)
+            if key is None:
+                # Not cached, so unknown device IDs cannot grow the cache
+                self.api_key_hashes.pop(device_id, None)
+                return None
+            entry = (key, time.monotonic())
+            self.api_key_hashes[device_id] = entry
+        return entry[0]
+    
+    def verify_api_key(self, device_id: str, api_key: str) -> bool:
+        """Check a device's API key against its cached salted hash."""
+        key = self._get_api_key(device_id)
+        if key is None:
+            return False
+        
+        salt, key_hash = key
+        return self.credential_service.verify_api_key(api_key, salt, key_hash)
+    
+    def warm_api_keys(self) -> int:
+        """Preload every API key hash so key checks skip the database."""
+        keys = self.api_key_repository.get_all()
+        loaded_at = time.monotonic()
+        for device_id, key in keys.items():
+            self.api_key_hashes[device_id] = (key, loaded_at)
+        return len(keys)
+    
+    def issue_token(self, device_id: str, api_key: str) -> Tuple[str, int]:
+        """Exchange a valid API key for a short-lived signed token; returns (token, expires_at)."""
+        if not self.token_secret:
+            raise ValueError("Device tokens are disabled: DEVICE_TOKEN_SECRET is not set")
+        key = self._get_api_key(device_id)
+        if key is None or not self.credential_service.verify_api_key(api_key, *key):
+            raise PermissionError("Invalid device ID or API key")
+        
+        expires_at = int(time.time() + self.token_ttl)
+        key_id = self.credential_service.key_id(key[1])
+        return self.credential_service.sign_token(device_id, expires_at, key_id, self.token_secret), expires_at
+    
+    def verify_token(self, token: str) -> Optional[str]:
+        """Get the device ID of a token with a valid signature that has not expired.
+        
+        Verification never reads the database, so a token outlives a rotated
+        or deleted key until it expires. With the revocation check, tokens
+        whose key this worker has in memory and knows to be replaced or
+        deleted are rejected as well; keys it has not loaded are not looked up.
+        """
+        if not self.token_secret:
+            return None
+        
+        claims = self.credential_service.verify_token(token, self.token_secret, time.time())
+        if claims is None:
+            return None
+        device_id, _, key_id = claims
+        if self.token_revocation_check:
+            entry = self.api_key_hashes.get(device_id)
+            if entry is not None and (entry[0] is None or self.credential_service.key_id(entry[0][1]) != key_id):
+                return None
+        return device_id
+    
+    def authenticate(self, device_id: str, token: Optional[str] = None,
+                     api_key: Optional[str] = None) -> Optional[str]:
+        """Authenticate a device request; returns an error message, or None when allowed.
+        
+        A presented token or API key must be valid whatever auth_required
+        says. Unless auth_required, requests without either fall back to
+        checking that the device exists.
+        """
+        if token:
+            if self.verify_token(token) == device_id:
+                return None
+            return "Invalid or expired device token"
+        if api_key:
+            if self.verify_api_key(device_id, api_key):
+                return None
+            return "Invalid device ID or API key"
+        if self.auth_required:
+            return "Missing device token or API key"
+        
+        if not self.device_exists(device_id):
+            return "Device not found"
+        return None
+    
+    def stop(self):
+        """Stop the presence flush thread."""
+        if self.presence is not None:
+            self.presence.stop()
+    
+    def record_seen(self, device_id: str, latitude: Optional[float] = None,
+                    longitude: Optional[float] = None):
+        """Record that a device was seen now, once per request; persisted on the next presence flush."""
+        if self.presence is not None:
+            self.presence.touch(device_id, latitude, longitude)
+    
+    def warm_presence(self) -> int:
+        """Load every persisted last-seen time so the fleet view covers devices not yet seen here."""
+        return self.presence.load() if self.presence is not None else 0
+    
+    def get_stale_devices(self, stale_after_seconds: Optional[float] = None, limit: int = 100) -> dict:
+        """List devices not seen for stale_after_seconds, oldest first, from memory.
+        
+        Sightings on other workers arrive with each presence flush. Devices
+        in the device ID set loaded at warm-up, or confirmed since, that were
+        never seen are listed as offline after the stale ones. Deleted
+        devices are dropped by delete_device on this worker, and on the others
+        when a failed existence check or presence flush shows they are gone.
+        """
+        if self.presence is None:
+            raise ValueError("Device presence tracking is disabled")
+        stale_after = self.stale_after if stale_after_seconds is None else stale_after_seconds
+        if stale_after < 0 or limit < 1:
+            raise ValueError("stale_after_seconds must be >= 0 and limit >= 1")
+        
+        seen = self.presence.snapshot()
+        with self._known_lock:
+            device_ids = set(self.known_device_ids)
+        
+        now = time.time()
+        stale = sorted(
+            (last_seen, device_id, latitude, longitude)
+            for device_id, (last_seen, latitude, longitude) in seen.items()
+            if now - last_seen > stale_after
+        )
+        never_seen = sorted(device_ids - seen.keys())
+        
+        devices = [{
+            'device_id': device_id,
+            'status': 'stale',
+            'last_seen': datetime.fromtimestamp(last_seen, timezone.utc).isoformat(),
+            'seconds_since_seen': round(now - last_seen, 1),
+            'latitude': latitude,
+            'longitude': longitude
+        } for last_seen, device_id, latitude, longitude in stale[:limit]]
+        devices.extend({'device_id': device_id, 'status': 'offline', 'last_seen': None}
+                       for device_id in never_seen[:limit - len(devices)])
+        return {
+            'stale_after_seconds': stale_after,
+            'online': len(seen) - len(stale),
+            'stale': len(stale),
+            'offline': len(never_seen),
+            'devices': devices,
+            'tracker': self.presence.stats()
+        }
+    
+    def _remember_device(self, device_id: str):
+        """Record that a device exists."""
+        with self._known_lock:
+            self.known_device_ids[device_id] = time.monotonic()
+    
+    def _forget_device(self, device_id: str):
+        """Drop a device that no longer exists from the ID set and the presence table."""
+        with self._known_lock:
+            self.known_device_ids.pop(device_id, None)
+        if self.presence is not None:
+            self.presence.forget([device_id])
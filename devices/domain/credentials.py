@@ -0,0 +1,79 @@
+"""Device credentials: salted API key hashes and signed device tokens."""
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+from typing import Optional, Tuple
+
+
+class DeviceCredentialService:
+    """Domain service for device API keys and tokens.
+
+    API keys are random 256-bit strings generated here, so a salted SHA-256
+    is enough to store them; unlike passwords they cannot be guessed from a
+    dictionary. Tokens are "<payload>.<signature>", both base64url, where the
+    payload holds the device ID, expiry and the ID of the key the token was
+    issued for, and the signature is an HMAC-SHA256 of it, so any worker
+    holding the secret can verify them. Rotating or deleting the key changes
+    the key ID, which revokes the tokens issued for the old one.
+    """
+
+    @staticmethod
+    def generate_api_key() -> str:
+        """Generate a new API key."""
+        return secrets.token_urlsafe(32)
+
+    @staticmethod
+    def generate_salt() -> str:
+        """Generate a salt for hashing an API key."""
+        return secrets.token_hex(16)
+
+    @staticmethod
+    def hash_api_key(api_key: str, salt: str) -> str:
+        """Hash an API key with its salt."""
+        return hashlib.sha256(f"{salt}:{api_key}".encode()).hexdigest()
+
+    @classmethod
+    def verify_api_key(cls, api_key: str, salt: str, key_hash: str) -> bool:
+        """Check an API key against a stored salted hash in constant time."""
+        return hmac.compare_digest(cls.hash_api_key(api_key, salt), key_hash)
+
+    @staticmethod
+    def key_id(key_hash: str) -> str:
+        """Get the ID tokens use to refer to a stored key."""
+        return key_hash[:16]
+
+    @staticmethod
+    def _encode(data: bytes) -> str:
+        return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+    @staticmethod
+    def _decode(text: str) -> bytes:
+        return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+    @classmethod
+    def sign_token(cls, device_id: str, expires_at: int, key_id: str, secret: str) -> str:
+        """Issue a token for a device's key, valid until expires_at (epoch seconds)."""
+        payload = cls._encode(json.dumps({'sub': device_id, 'exp': expires_at, 'kid': key_id},
+                                         separators=(',', ':')).encode())
+        signature = hmac.new(secret.encode(), payload.encode(), hashlib.sha256).digest()
+        return f"{payload}.{cls._encode(signature)}"
+
+    @classmethod
+    def verify_token(cls, token: str, secret: str, now: float) -> Optional[Tuple[str, int, str]]:
+        """Get (device_id, expires_at, key_id) from a token, or None if forged, malformed or expired."""
+        try:
+            payload, signature = token.split('.')
+            expected = hmac.new(secret.encode(), payload.encode(), hashlib.sha256).digest()
+            if not hmac.compare_digest(expected, cls._decode(signature)):
+                return None
+            claims = json.loads(cls._decode(payload))
+            device_id, expires_at, key_id = claims['sub'], claims['exp'], claims['kid']
+        except (ValueError, KeyError, TypeError):
+            return None
+
+        if (not isinstance(device_id, str) or not isinstance(expires_at, int)
+                or not isinstance(key_id, str) or expires_at <= now):
+            return None
+        return device_id, expires_at, key_id
@@ -0,0 +1,50 @@
+"""Device API key repository with Supabase implementation."""
+
+from typing import Dict, Optional, Tuple
+from datetime import datetime
+from shared.supabase.client import get_supabase_client
+
+
+class DeviceApiKeySupabaseRepository:
+    """Stores one salted API key hash per device; plaintext keys are never stored."""
+
+    def __init__(self):
+        self.client = get_supabase_client()
+        self.table_name = 'device_api_keys'
+
+    def save(self, device_id: str, salt: str, key_hash: str):
+        """Store a device's key hash, replacing any previous key."""
+        key_data = {
+            'device_id': device_id,
+            'salt': salt,
+            'key_hash': key_hash,
+            'created_at': datetime.utcnow().isoformat()
+        }
+        self.client.table(self.table_name).upsert(key_data, on_conflict='device_id').execute()
+
+    def get_by_device_id(self, device_id: str) -> Optional[Tuple[str, str]]:
+        """Get the (salt, key_hash) of a device."""
+        response = self.client.table(self.table_name).select('salt, key_hash').eq('device_id', device_id).execute()
+
+        if response.data:
+            key_data = response.data[0]
+            return key_data['salt'], key_data['key_hash']
+
+        return None
+
+    def delete(self, device_id: str):
+        """Delete a device's key, revoking it and the tokens issued for it."""
+        self.client.table(self.table_name).delete().eq('device_id', device_id).execute()
+
+    def get_all(self, page_size: int = 1000) -> Dict[str, Tuple[str, str]]:
+        """Get the (salt, key_hash) of every device, paging through the table."""
+        keys = {}
+        start = 0
+        while True:
+            response = self.client.table(self.table_name).select('device_id, salt, key_hash').order('device_id').range(start, start + page_size - 1).execute()
+            for key_data in response.data:
+                keys[key_data['device_id']] = (key_data['salt'], key_data['key_hash'])
+
+            if len(response.data) < page_size:
+                return keys
+            start += page_size
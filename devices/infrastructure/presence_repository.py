@@ -0,0 +1,54 @@
+"""Device presence repository with Supabase implementation."""
+
+from typing import List, Optional, Tuple
+from datetime import datetime, timezone
+from shared.supabase.client import get_supabase_client
+
+# (device_id, last_seen epoch seconds, latitude, longitude)
+PresenceRow = Tuple[str, float, Optional[float], Optional[float]]
+
+
+class DevicePresenceSupabaseRepository:
+    """Stores the last time and position each device was seen."""
+
+    def __init__(self):
+        self.client = get_supabase_client()
+        self.table_name = 'device_presence'
+
+    def upsert_many(self, rows: List[PresenceRow], chunk_size: int = 500):
+        """Write many devices' presence with one upsert per chunk."""
+        for start in range(0, len(rows), chunk_size):
+            presence_data = [{
+                'device_id': device_id,
+                'last_seen_at': datetime.fromtimestamp(last_seen, timezone.utc).isoformat(),
+                'latitude': latitude,
+                'longitude': longitude
+            } for device_id, last_seen, latitude, longitude in rows[start:start + chunk_size]]
+            self.client.table(self.table_name).upsert(presence_data, on_conflict='device_id').execute()
+
+    def delete(self, device_id: str):
+        """Delete a device's presence."""
+        self.client.table(self.table_name).delete().eq('device_id', device_id).execute()
+
+    def get_seen_since(self, since: Optional[float] = None, page_size: int = 1000) -> List[PresenceRow]:
+        """Get the presence of devices seen after since (epoch seconds), or of all devices."""
+        rows = []
+        start = 0
+        while True:
+            query = self.client.table(self.table_name).select('device_id, last_seen_at, latitude, longitude')
+            if since is not None:
+                query = query.gt('last_seen_at', datetime.fromtimestamp(since, timezone.utc).isoformat())
+            response = query.order('device_id').range(start, start + page_size - 1).execute()
+            rows.extend(self._map_to_row(presence_data) for presence_data in response.data)
+
+            if len(response.data) < page_size:
+                return rows
+            start += page_size
+
+    def _map_to_row(self, presence_data: dict) -> PresenceRow:
+        """Map database data to a presence row."""
+        last_seen = datetime.fromisoformat(presence_data['last_seen_at'].replace('Z', '+00:00'))
+        if last_seen.tzinfo is None:
+            last_seen = last_seen.replace(tzinfo=timezone.utc)
+        return (presence_data['device_id'], last_seen.timestamp(),
+                presence_data.get('latitude'), presence_data.get('longitude'))
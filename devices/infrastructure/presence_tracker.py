@@ -0,0 +1,160 @@
+"""In-memory device last-seen table with coalesced persistence."""
+
+import atexit
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from devices.infrastructure.presence_repository import DevicePresenceSupabaseRepository, PresenceRow
+
+logger = logging.getLogger(__name__)
+
+
+class DevicePresenceTracker:
+    """Tracks when and where each device was last seen.
+
+    touch() only updates memory. A background thread persists the devices
+    touched since the previous flush every flush_seconds with one bulk upsert,
+    so each device is written at most once per interval however often it
+    calls the API. After writing it merges in what other workers persisted,
+    so every worker's table converges within an interval.
+
+    Presence rows reference their device, so a device deleted before its
+    sighting is flushed fails the upsert. On a failed flush, existing_ids
+    (when given) tells which devices still exist; only those are retried.
+    """
+
+    def __init__(self, repository: DevicePresenceSupabaseRepository, flush_seconds: float = 60.0,
+                 chunk_size: int = 500,
+                 existing_ids: Optional[Callable[[List[str]], List[str]]] = None):
+        self.repository = repository
+        self.flush_seconds = flush_seconds
+        self.chunk_size = chunk_size
+        self.existing_ids = existing_ids
+        # device_id -> [last_seen, latitude, longitude]
+        self._seen: Dict[str, list] = {}
+        self._dirty: Set[str] = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._pulled_at: Optional[float] = None
+        self.touches = 0
+        self.written = 0
+        self.flushes = 0
+        self.errors = 0
+
+    def touch(self, device_id: str, latitude: Optional[float] = None,
+              longitude: Optional[float] = None):
+        """Record that a device was seen now, at a position when given."""
+        if self._thread is None:
+            self._start()
+        now = time.time()
+        with self._lock:
+            entry = self._seen.get(device_id)
+            if entry is None:
+                self._seen[device_id] = [now, latitude, longitude]
+            else:
+                entry[0] = now
+                if latitude is not None and longitude is not None:
+                    entry[1], entry[2] = latitude, longitude
+            self._dirty.add(device_id)
+            self.touches += 1
+
+    def merge(self, rows: List[PresenceRow]):
+        """Merge persisted presence, keeping whichever sighting is newer."""
+        with self._lock:
+            for device_id, last_seen, latitude, longitude in rows:
+                entry = self._seen.get(device_id)
+                if entry is None or entry[0] < last_seen:
+                    self._seen[device_id] = [last_seen, latitude, longitude]
+
+    def forget(self, device_ids: Iterable[str]):
+        """Drop devices from memory without touching the persisted table."""
+        with self._lock:
+            for device_id in device_ids:
+                self._seen.pop(device_id, None)
+                self._dirty.discard(device_id)
+
+    def load(self) -> int:
+        """Seed the table with every persisted sighting."""
+        pulled_at = time.time()
+        rows = self.repository.get_seen_since()
+        self.merge(rows)
+        self._pulled_at = pulled_at
+        return len(rows)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='device-presence', daemon=True)
+            self._thread.start()
+        # Persist the last interval on a clean shutdown
+        atexit.register(self.flush)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            self.flush()
+
+    def stop(self):
+        """Stop the flush thread, persisting what it had not written yet."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            atexit.unregister(self.flush)
+            self.flush()
+
+    def flush(self) -> int:
+        """Write the devices seen since the last flush; returns how many."""
+        with self._flush_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+                rows = [(device_id, *self._seen[device_id]) for device_id in dirty]
+
+            try:
+                if rows:
+                    self.repository.upsert_many(rows, self.chunk_size)
+                pulled_at = time.time()
+                # Overlap by one interval so slow writers are not missed
+                since = self._pulled_at - self.flush_seconds if self._pulled_at is not None else None
+                self.merge(self.repository.get_seen_since(since))
+                self._pulled_at = pulled_at
+            except Exception as e:
+                self.errors += 1
+                logger.error("❌ Device presence flush of %d devices failed: %s", len(rows), e)
+                self._requeue(dirty)
+                return 0
+
+            self.flushes += 1
+            self.written += len(rows)
+            return len(rows)
+
+    def _requeue(self, dirty: Set[str]):
+        """Retry unflushed devices on the next flush, forgetting deleted ones."""
+        retry = dirty
+        if self.existing_ids is not None and dirty:
+            try:
+                retry = set(self.existing_ids(list(dirty)))
+            except Exception as e:
+                logger.error("❌ Device presence existence check failed: %s", e)
+            self.forget(dirty - retry)
+        with self._lock:
+            # Devices touched again since are already dirty
+            self._dirty |= {device_id for device_id in retry if device_id in self._seen}
+
+    def snapshot(self) -> Dict[str, tuple]:
+        """Get {device_id: (last_seen, latitude, longitude)}."""
+        with self._lock:
+            return {device_id: tuple(entry) for device_id, entry in self._seen.items()}
+
+    def stats(self) -> dict:
+        """Get tracker counters."""
+        return {
+            'devices': len(self._seen),
+            'pending': len(self._dirty),
+            'touches': self.touches,
+            'written': self.written,
+            'flushes': self.flushes,
+            'errors': self.errors
+        }
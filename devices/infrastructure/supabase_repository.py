@@ -100,3 +100,57 @@ class DeviceSupabaseRepository:
         """Check if device exists."""
         response = self.client.table(self.table_name).select('id').eq('id', device_id).execute()
         return len(response.data) > 0
+    
+    def get_existing_ids(self, device_ids: List[str], chunk_size: int = 500) -> List[str]:
+        """Get which of device_ids exist, with one `in` query per chunk."""
+        existing_ids = []
+        for start in range(0, len(device_ids), chunk_size):
+            chunk = device_ids[start:start + chunk_size]
+            response = self.client.table(self.table_name).select('id').in_('id', chunk).execute()
+            existing_ids.extend(device_data['id'] for device_data in response.data)
+        return existing_ids
+    
+    def get_by_ids(self, device_ids: List[str], chunk_size: int = 500) -> List[Device]:
+        """Get the devices among device_ids, with one `in` query per chunk."""
+        devices = []
+        for start in range(0, len(device_ids), chunk_size):
+            chunk = device_ids[start:start + chunk_size]
+            response = self.client.table(self.table_name).select('*').in_('id', chunk).execute()
+            devices.extend(self._map_to_entity(device_data) for device_data in response.data)
+        return devices
+    
+    def create_many(self, devices: List[Device]) -> List[Device]:
+        """Create devices with a single multi-row insert."""
+        now = datetime.utcnow().isoformat()
+        rows = [{
+            'id': device.device_id,
+            'name': device.name,
+            'type': device.device_type,
+            'profile_id': device.profile_id,
+            'created_at': device.created_at.isoformat() if device.created_at else now
+        } for device in devices]
+        
+        response = self.client.table(self.table_name).insert(rows).execute()
+        return [self._map_to_entity(device_data) for device_data in response.data]
+    
+    def get_all_ids(self, page_size: int = 1000) -> List[str]:
+        """Get the IDs of every device, paging through the table."""
+        device_ids = []
+        start = 0
+        while True:
+            response = self.client.table(self.table_name).select('id').order('id').range(start, start + page_size - 1).execute()
+            device_ids.extend(device_data['id'] for device_data in response.data)
+            
+            if len(response.data) < page_size:
+                return device_ids
+            start += page_size
+    
+    def _map_to_entity(self, device_data: dict) -> Device:
+        """Map database data to Device entity."""
+        return Device(
+            device_id=device_data['id'],
+            name=device_data['name'],
+            device_type=device_data['type'],
+            profile_id=device_data['profile_id'],
+            created_at=datetime.fromisoformat(device_data['created_at'].replace('Z', '+00:00')) if device_data['created_at'] else None
+        )
@@ -1,9 +1,17 @@
 """Interface services for Devices context."""
+from typing import Optional, Tuple
 from flask import Blueprint, request, jsonify
 from devices.application.services import DeviceApplicationService
+from shared.infrastructure.lazy import lazy_singleton
+from shared.infrastructure.timing import stage
 
 device_api = Blueprint("device_api", __name__)
-device_service = DeviceApplicationService()
+
+
+@lazy_singleton
+def get_device_service() -> DeviceApplicationService:
+    """Get the device application service, built on first use."""
+    return DeviceApplicationService()
 
 
 @device_api.route('/devices', methods=['POST'])
@@ -46,7 +54,7 @@ def create_device():
     """
     try:
         data = request.get_json()
-        device = device_service.create_device(
+        device = get_device_service().create_device(
             device_id=data['device_id'],
             name=data['name'],
             device_type=data['type'],
@@ -61,6 +69,158 @@ def create_device():
         return jsonify({"error": str(e)}), 500
 
 
+@device_api.route('/devices/bulk', methods=['POST'])
+def create_devices():
+    """Create many devices at once.
+    ---
+    tags:
+      - Devices
+    description: >
+      Registra hasta DEVICE_BULK_MAX_ITEMS dispositivos con una sola consulta de
+      existencia y una inserción por lote. Cada elemento recibe su propio
+      resultado: created, invalid, duplicate, exists, failed o unknown (la
+      inserción no devolvió la fila y no se puede confirmar).
+    parameters:
+      - in: body
+        name: devices_data
+        required: true
+        schema:
+          type: object
+          required:
+            - devices
+          properties:
+            devices:
+              type: array
+              items:
+                type: object
+                properties:
+                  device_id:
+                    type: string
+                    example: "smart-band-001"
+                  name:
+                    type: string
+                    example: "Smart Band"
+                  type:
+                    type: string
+                    example: "wearable"
+                  profile_id:
+                    type: string
+                    example: "user_123"
+    responses:
+      201:
+        description: Every device was created
+      207:
+        description: Some devices were not created; see each result's status and error
+      400:
+        description: Invalid request data
+    """
+    try:
+        data = request.get_json()
+        try:
+            items = data['devices']
+        except (KeyError, TypeError):
+            return jsonify({"error": "Missing required field: 'devices'"}), 400
+
+        results = get_device_service().create_devices(items)
+        created = sum(1 for result in results if result['status'] == 'created')
+        return jsonify({
+            "created": created,
+            "failed": len(results) - created,
+            "results": results
+        }), 201 if created == len(results) else 207
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@device_api.route('/devices/bulk/lookup', methods=['POST'])
+def get_devices():
+    """Get many devices by ID.
+    ---
+    tags:
+      - Devices
+    parameters:
+      - in: body
+        name: lookup_data
+        required: true
+        schema:
+          type: object
+          required:
+            - device_ids
+          properties:
+            device_ids:
+              type: array
+              items:
+                type: string
+              example: ["smart-band-001", "smart-band-002"]
+    responses:
+      200:
+        description: Devices found; not_found lists the requested IDs that do not exist
+      400:
+        description: Invalid request data
+    """
+    try:
+        data = request.get_json()
+        try:
+            device_ids = data['device_ids']
+        except (KeyError, TypeError):
+            return jsonify({"error": "Missing required field: 'device_ids'"}), 400
+
+        devices = get_device_service().get_devices(device_ids)
+        found_ids = {device.device_id for device in devices}
+        return jsonify({
+            "data": [device.to_dict() for device in devices],
+            "not_found": [device_id for device_id in dict.fromkeys(device_ids) if device_id not in found_ids]
+        }), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@device_api.route('/devices/fleet/stale', methods=['GET'])
+def get_stale_devices():
+    """List devices that have not been seen recently.
+    ---
+    tags:
+      - Devices
+    description: >
+      Se calcula en memoria, sin consultar la base de datos, con la tabla de
+      última conexión y los IDs de dispositivos cargados al arrancar o
+      confirmados después. Los que nunca se han visto aparecen como offline y
+      los eliminados no aparecen. Las conexiones registradas por otros workers
+      llegan con cada volcado (DEVICE_PRESENCE_FLUSH_SECONDS).
+    parameters:
+      - in: query
+        name: stale_after_seconds
+        type: number
+        required: false
+        description: Seconds without requests before a device is stale (default DEVICE_STALE_AFTER_SECONDS)
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        default: 100
+    responses:
+      200:
+        description: Stale and offline devices, oldest first, with fleet counts
+      400:
+        description: Invalid parameters or presence tracking disabled
+    """
+    try:
+        stale_after = request.args.get('stale_after_seconds')
+        fleet = get_device_service().get_stale_devices(
+            stale_after_seconds=float(stale_after) if stale_after is not None else None,
+            limit=int(request.args.get('limit', 100))
+        )
+        return jsonify(fleet), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @device_api.route('/devices/<device_id>', methods=['GET'])
 def get_device(device_id):
     """Get device by ID.
@@ -79,7 +239,7 @@ def get_device(device_id):
         description: Device not found
     """
     try:
-        device = device_service.get_device(device_id)
+        device = get_device_service().get_device(device_id)
         if not device:
             return jsonify({"error": "Device not found"}), 404
         return jsonify(device.to_dict()), 200
@@ -103,7 +263,7 @@ def get_devices_by_profile(profile_id):
         description: Devices found
     """
     try:
-        devices = device_service.get_devices_by_profile(profile_id)
+        devices = get_device_service().get_devices_by_profile(profile_id)
         return jsonify([device.to_dict() for device in devices]), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -137,7 +297,7 @@ def update_device(device_id):
     """
     try:
         data = request.get_json()
-        device = device_service.update_device(
+        device = get_device_service().update_device(
             device_id=device_id,
             name=data.get('name'),
             device_type=data.get('type')
@@ -167,7 +327,7 @@ def delete_device(device_id):
         description: Device not found
     """
     try:
-        if device_service.delete_device(device_id):
+        if get_device_service().delete_device(device_id):
             return jsonify({"message": "Device deleted successfully"}), 200
         else:
             return jsonify({"error": "Device not found"}), 404
@@ -175,6 +335,124 @@ def delete_device(device_id):
         return jsonify({"error": str(e)}), 500
 
 
-def authenticate_device(device_id: str) -> bool:
-    """Simple device authentication check."""
-    return device_service.device_exists(device_id)
\ No newline at end of file
+@device_api.route('/devices/<device_id>/api-key', methods=['POST'])
+def issue_device_api_key(device_id):
+    """Generate a new API key for a device.
+    ---
+    tags:
+      - Devices
+    description: >
+      Devuelve la clave una sola vez; sólo se guarda su hash con sal. La clave
+      anterior y los tokens emitidos con ella dejan de ser válidos. Requiere el
+      token o la API key actuales del dispositivo, o la clave de administración
+      (X-Admin-Key, DEVICE_ADMIN_API_KEY), que es la única forma de emitir la
+      primera clave de un dispositivo.
+    security:
+      - BearerAuth: []
+      - ApiKeyAuth: []
+    parameters:
+      - in: path
+        name: device_id
+        required: true
+        type: string
+      - name: X-Admin-Key
+        in: header
+        type: string
+        required: false
+    responses:
+      201:
+        description: API key created
+      401:
+        description: Missing or invalid device or admin credentials
+      404:
+        description: Device not found
+    """
+    try:
+        with stage('auth'):
+            api_key = get_device_service().issue_api_key(
+                device_id,
+                token=bearer_token(),
+                api_key=request.headers.get("X-API-Key"),
+                admin_key=request.headers.get("X-Admin-Key")
+            )
+        return jsonify({"device_id": device_id, "api_key": api_key}), 201
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 401
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@device_api.route('/devices/token', methods=['POST'])
+def issue_device_token():
+    """Exchange a device API key for a short-lived signed token.
+    ---
+    tags:
+      - Devices
+    description: >
+      El token se envía como `Authorization: Bearer <token>` y se verifica sin
+      consultar la base de datos hasta que expira.
+    parameters:
+      - name: X-Device-ID
+        in: header
+        type: string
+        required: true
+      - name: X-API-Key
+        in: header
+        type: string
+        required: true
+    responses:
+      200:
+        description: Token issued
+        schema:
+          type: object
+          properties:
+            token:
+              type: string
+            token_type:
+              type: string
+              example: "Bearer"
+            expires_at:
+              type: integer
+              description: Expiry as epoch seconds
+      400:
+        description: Device tokens are disabled
+      401:
+        description: Invalid device ID or API key
+    """
+    device_id = request.headers.get("X-Device-ID")
+    api_key = request.headers.get("X-API-Key")
+    if not device_id or not api_key:
+        return jsonify({"error": "Missing X-Device-ID or X-API-Key header"}), 401
+
+    try:
+        with stage('auth'):
+            token, expires_at = get_device_service().issue_token(device_id, api_key)
+        return jsonify({"token": token, "token_type": "Bearer", "expires_at": expires_at}), 200
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 401
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def bearer_token() -> Optional[str]:
+    """Get the token from the current request's Authorization: Bearer header."""
+    authorization = request.headers.get("Authorization", "")
+    return authorization[7:].strip() if authorization.startswith("Bearer ") else None
+
+
+def device_auth_error(device_id: str) -> Optional[Tuple[str, int]]:
+    """Authenticate the current request as device_id; returns (error, status) on failure.
+
+    Handlers record the device's last-seen time and position themselves,
+    once they have read it from the request.
+    """
+    with stage('auth'):
+        error = get_device_service().authenticate(device_id, token=bearer_token(),
+                                                  api_key=request.headers.get("X-API-Key"))
+    if error is None:
+        return None
+    return error, 404 if 'not found' in error else 401
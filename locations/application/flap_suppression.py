@@ -0,0 +1,79 @@
+"""Per-device flap suppression for proximity checks."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from locations.domain.smoothing import GpsKalmanFilter
+
+
+class _DeviceTrack:
+    """Smoothing filter and last geofence membership of one device."""
+
+    __slots__ = ('filter', 'membership')
+
+    def __init__(self, position_filter: GpsKalmanFilter):
+        self.filter = position_filter
+        self.membership: Dict[str, Dict[str, bool]] = {}
+
+
+class FlapSuppressor:
+    """Keeps per-device state used to suppress ENTER/EXIT flapping.
+
+    Optionally smooths incoming fixes with a per-device Kalman filter and
+    remembers which geofences each device was last inside, so proximity checks
+    can apply a hysteresis band around every radius.
+    """
+
+    def __init__(self, smoothing_enabled: bool = False, process_noise: float = 3.0,
+                 default_accuracy: float = 20.0, reset_after_seconds: float = 300.0,
+                 max_devices: int = 100000):
+        self.smoothing_enabled = smoothing_enabled
+        self.process_noise = process_noise
+        self.default_accuracy = default_accuracy
+        self.reset_after_seconds = reset_after_seconds
+        self.max_devices = max_devices
+        self._tracks: "OrderedDict[str, _DeviceTrack]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _track(self, device_id: str) -> _DeviceTrack:
+        """Get or create the track of a device. Caller holds the lock."""
+        track = self._tracks.get(device_id)
+        if track is None:
+            track = _DeviceTrack(GpsKalmanFilter(self.process_noise))
+            self._tracks[device_id] = track
+            while len(self._tracks) > self.max_devices:
+                self._tracks.popitem(last=False)
+        else:
+            self._tracks.move_to_end(device_id)
+        return track
+
+    def smooth(self, device_id: str, latitude: float, longitude: float,
+               accuracy: Optional[float] = None) -> Tuple[float, float]:
+        """Get the smoothed position for a new fix of a device."""
+        if not self.smoothing_enabled:
+            return latitude, longitude
+
+        now = time.monotonic()
+        with self._lock:
+            position_filter = self._track(device_id).filter
+            if now - position_filter.timestamp > self.reset_after_seconds:
+                position_filter.reset()
+            return position_filter.update(
+                latitude, longitude,
+                accuracy if accuracy is not None else self.default_accuracy,
+                now
+            )
+
+    def membership(self, device_id: str, profile_id: str) -> Dict[str, bool]:
+        """Get which geofences of a profile the device was last inside."""
+        with self._lock:
+            track = self._tracks.get(device_id)
+            if track is None:
+                return {}
+            return dict(track.membership.get(profile_id, {}))
+
+    def remember(self, device_id: str, profile_id: str, results: List[dict]):
+        """Record the geofence membership reported to a device."""
+        membership = {result['location_id']: result['within_radius'] for result in results}
+        with self._lock:
+            self._track(device_id).membership[profile_id] = membership
@@ -1,8 +1,22 @@
 """Application services for Locations context."""
-from typing import List, Optional
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
 from locations.domain.entities import Location
 from locations.domain.services import LocationService
+from locations.domain.geometry import encode_polygon, validate_polygon
+from locations.domain.compiled import CompiledGeofences
 from locations.infrastructure.supabase_repository import LocationSupabaseRepository
+from locations.infrastructure.geofence_versions import get_geofence_versions
+from locations.infrastructure.proximity_cache import ProximityResultCache
+from locations.infrastructure.profile_index_cache import ProfileIndexCache
+from locations.infrastructure.global_geofence_index import get_global_geofence_index
+from locations.infrastructure.shared_geofence_store import SharedGeofenceStore
+from config import get_config
+
+logger = logging.getLogger(__name__)
 
 
 class LocationApplicationService:
@@ -10,12 +24,46 @@ class LocationApplicationService:
 
     def __init__(self):
         self.repository = LocationSupabaseRepository()
-        self.location_service = LocationService()
+        config = get_config()
+        self.location_service = LocationService(config.DISTANCE_MODE)
+        self.geofence_versions = get_geofence_versions()
+
+        self.hysteresis = config.PROXIMITY_HYSTERESIS_METERS
+        self.proximity_cache = ProximityResultCache(
+            margin=config.PROXIMITY_CACHE_MARGIN_METERS,
+            max_entries=config.PROXIMITY_CACHE_MAX_ENTRIES,
+            ttl_seconds=config.PROXIMITY_CACHE_TTL_SECONDS,
+            enabled=config.PROXIMITY_CACHE_ENABLED
+        )
+        self.compiled_cache_enabled = config.GEOFENCE_COMPILED_CACHE_ENABLED
+        self.compiled_geofences = ProfileIndexCache(
+            ttl_seconds=config.GEOFENCE_INDEX_TTL_SECONDS,
+            max_profiles=config.GEOFENCE_INDEX_MAX_PROFILES
+        )
+        self.bbox_pushdown = config.LOCATION_BBOX_PUSHDOWN
+        self.profile_reaches = ProfileIndexCache(
+            ttl_seconds=config.GEOFENCE_INDEX_TTL_SECONDS,
+            max_profiles=config.GEOFENCE_INDEX_MAX_PROFILES
+        )
+        self.global_index = get_global_geofence_index(
+            cell_degrees=config.GLOBAL_INDEX_CELL_DEGREES,
+            max_cells_per_location=config.GLOBAL_INDEX_MAX_CELLS_PER_LOCATION
+        )
+        self.global_index_refresh_seconds = config.GLOBAL_INDEX_REFRESH_SECONDS
+        self._global_refresh_lock = threading.Lock()
+        self.shared_geofences = SharedGeofenceStore(
+            path=config.SHARED_GEOFENCE_INDEX_PATH,
+            refresh_seconds=config.SHARED_GEOFENCE_INDEX_REFRESH_SECONDS,
+            max_age_seconds=config.SHARED_GEOFENCE_INDEX_MAX_AGE_SECONDS
+        ) if config.SHARED_GEOFENCE_INDEX_ENABLED else None
+        self._shared_publish_lock = threading.Lock()
 
     def create_location(self, location_id: str, name: str, latitude: float, 
                        longitude: float, radius: float, profile_id: str, 
-                       address: str = "") -> Location:
-        """Create a new location."""
+                       address: str = "", polygon: Optional[List[List[float]]] = None) -> Location:
+        """Create a new location, optionally with a polygon geofence."""
+        encoded_polygon = encode_polygon(validate_polygon(polygon)) if polygon else None
+        
         if self.repository.exists(location_id):
             raise ValueError(f"Location with ID {location_id} already exists")
         
@@ -26,10 +74,14 @@ class LocationApplicationService:
             longitude=longitude,
             radius=radius,
             profile_id=profile_id,
-            address=address
+            address=address,
+            polygon=encoded_polygon
         )
         
-        return self.repository.create(location)
+        created_location = self.repository.create(location)
+        self.geofence_versions.bump(created_location.profile_id)
+        self.global_index.upsert(created_location)
+        return created_location
     
     def get_location(self, location_id: str) -> Optional[Location]:
         """Get location by ID."""
@@ -45,8 +97,11 @@ class LocationApplicationService:
     
     def update_location(self, location_id: str, name: str = None, latitude: float = None,
                        longitude: float = None, radius: float = None, 
-                       address: str = None, is_active: bool = None) -> Location:
-        """Update location information."""
+                       address: str = None, is_active: bool = None,
+                       polygon: Optional[List[List[float]]] = None) -> Location:
+        """Update location information. An empty polygon clears it."""
+        encoded_polygon = encode_polygon(validate_polygon(polygon)) if polygon else None
+        
         location = self.repository.get_by_id(location_id)
         if not location:
             raise ValueError(f"Location with ID {location_id} not found")
@@ -63,34 +118,228 @@ class LocationApplicationService:
             location.address = address
         if is_active is not None:
             location.is_active = is_active
+        if polygon is not None:
+            location.polygon = encoded_polygon
         
-        return self.repository.update(location)
+        updated_location = self.repository.update(location)
+        self.geofence_versions.bump(updated_location.profile_id)
+        self.global_index.upsert(updated_location)
+        return updated_location
     
     def delete_location(self, location_id: str) -> bool:
         """Delete a location."""
-        return self.repository.delete(location_id)
+        location = self.repository.get_by_id(location_id)
+        if not location:
+            return False
+        
+        deleted = self.repository.delete(location_id)
+        if deleted:
+            self.geofence_versions.bump(location.profile_id)
+            self.global_index.remove(location_id)
+        return deleted
+
+    def check_proximity(self, device_lat: float, device_lon: float, profile_id: str,
+                        previous_membership: Optional[Dict[str, bool]] = None) -> List[dict]:
+        """Check proximity to all active locations of a profile.
 
-    def check_proximity(self, device_lat: float, device_lon: float, profile_id: str) -> List[dict]:
-        """Check proximity to all active locations of a profile."""
-        locations = self.repository.get_active_locations(profile_id)
+        previous_membership maps location IDs to whether the device was last
+        reported inside them; when given, the hysteresis band is applied.
+        """
+        previous_membership = previous_membership or {}
+        version = self.geofence_versions.get(profile_id)
+        cached_results = self.proximity_cache.get(profile_id, version, device_lat, device_lon)
+        if cached_results is not None:
+            return cached_results
+
+        compiled = self._get_compiled_geofences(profile_id, version, device_lat, device_lon)
+        measurements = self.location_service.measure_compiled(
+            compiled, device_lat, device_lon, self.hysteresis
+        )
         results = []
+        # Distance from the device to the closest geofence boundary
+        clearance = float('inf')
 
-        for location in locations:
-            distance = self.location_service.calculate_distance(
-                location.latitude,
-                location.longitude,
-                device_lat,
-                device_lon
+        for index, (distance, location_clearance) in enumerate(measurements):
+            location_id = compiled.location_ids[index]
+            within_radius = self.location_service.is_inside(
+                distance,
+                compiled.radii[index],
+                previous_membership.get(location_id),
+                self.hysteresis
             )
-            within_radius = distance <= location.radius
+            clearance = min(clearance, location_clearance)
             event_type = "ENTER" if within_radius else "EXIT"
 
             results.append({
-                "location_id": location.location_id,
-                "location_name": location.name,
+                "location_id": location_id,
+                "location_name": compiled.names[index],
                 "distance": distance,
                 "within_radius": within_radius,
                 "event_type": event_type
             })
 
-        return results
\ No newline at end of file
+        # Cached answers must also be unaffected by the hysteresis band
+        self.proximity_cache.put(profile_id, version, device_lat, device_lon, results,
+                                 clearance - self.hysteresis)
+        return results
+
+    def _get_compiled_geofences(self, profile_id: str, version: int,
+                                device_lat: float, device_lon: float) -> CompiledGeofences:
+        """Get the compiled geofences to check a device against.
+
+        When the compiled cache is enabled, the whole profile is compiled once
+        per geofence version and shared; otherwise the candidates are fetched
+        and compiled for this check only.
+        """
+        if not self.compiled_cache_enabled:
+            return CompiledGeofences(
+                self._get_candidate_locations(profile_id, version, device_lat, device_lon)
+            )
+        return self._get_profile_geofences(profile_id, version)
+
+    def _get_profile_geofences(self, profile_id: str, version: int) -> CompiledGeofences:
+        """Get all active geofences of a profile, compiled once per geofence version."""
+        return self.compiled_geofences.get_or_build(
+            profile_id, version, lambda: self._compile_profile_geofences(profile_id)
+        )
+
+    def _compile_profile_geofences(self, profile_id: str) -> CompiledGeofences:
+        """Compile a profile's geofences, mapping them from the shared snapshot when fresh."""
+        if self.shared_geofences is not None:
+            if self.shared_geofences.needs_refresh():
+                self._run_in_background(self._shared_publish_lock, self.publish_shared_geofences,
+                                        "Shared geofence snapshot publish")
+            compiled = self.shared_geofences.load(
+                profile_id, self.geofence_versions.changed_at(profile_id)
+            )
+            if compiled is not None:
+                return compiled
+
+        return CompiledGeofences(self.repository.get_active_locations(profile_id))
+
+    def publish_shared_geofences(self) -> Optional[int]:
+        """Publish every active location to the shared geofence snapshot.
+
+        Returns the number of profiles published, or None if the snapshot is
+        disabled, still fresh, or being published by another worker.
+        """
+        if self.shared_geofences is None:
+            return None
+
+        def load() -> Tuple[float, Dict[str, CompiledGeofences]]:
+            loaded_at = time.time()
+            return loaded_at, self._compile_by_profile(self.repository.get_all_active_locations())
+        return self.shared_geofences.publish(load)
+
+    @staticmethod
+    def _compile_by_profile(locations: List[Location]) -> Dict[str, CompiledGeofences]:
+        """Compile active locations into one CompiledGeofences per profile."""
+        by_profile: Dict[str, List[Location]] = defaultdict(list)
+        for location in locations:
+            if location.is_active:
+                by_profile[location.profile_id].append(location)
+        return {profile_id: CompiledGeofences(profile_locations)
+                for profile_id, profile_locations in by_profile.items()}
+
+    def _get_candidate_locations(self, profile_id: str, version: int,
+                                 device_lat: float, device_lon: float) -> List[Location]:
+        """Get the active locations of a profile that may contain the device.
+
+        With bounding-box pushdown, the profile's maximum reach is learnt from
+        one full fetch per geofence version; later fetches only ask the
+        database for locations whose coordinates lie within that reach, plus
+        the proximity cache margin and the hysteresis band.
+        """
+        if not self.bbox_pushdown:
+            return self.repository.get_active_locations(profile_id)
+
+        fetched = []
+        def build_reach() -> float:
+            fetched.append(self.repository.get_active_locations(profile_id))
+            return max((self.location_service.calculate_reach(location) for location in fetched[0]),
+                       default=0.0)
+
+        reach = self.profile_reaches.get_or_build(profile_id, version, build_reach)
+        if fetched:
+            return fetched[0]
+
+        # Every geofence left out must be farther than the cache margin plus
+        # the hysteresis band, so that including it could change neither
+        # this answer nor whether it is cached for the rest of the cell. One
+        # extra meter absorbs rounding in the degree conversion.
+        padding = reach + self.proximity_cache.margin + self.hysteresis + 1.0
+        bounding_box = self.location_service.padded_box(
+            device_lat, device_lon, device_lat, device_lon, padding
+        )
+        return self.repository.get_active_locations(profile_id, bounding_box)
+
+    def get_nearby_locations(self, profile_id: str, latitude: float, longitude: float,
+                             limit: int = 5, max_distance: Optional[float] = None) -> List[dict]:
+        """Get the nearest active locations of a profile, closest first."""
+        version = self.geofence_versions.get(profile_id)
+        compiled = self._get_profile_geofences(profile_id, version)
+
+        return [
+            {
+                "location_id": compiled.location_ids[index],
+                "location_name": compiled.names[index],
+                "latitude": compiled.latitudes[index],
+                "longitude": compiled.longitudes[index],
+                "radius": compiled.radii[index],
+                "distance": distance
+            }
+            for index, distance in compiled.kd_tree.query(latitude, longitude, limit, max_distance)
+        ]
+
+    def warm_geofences(self) -> int:
+        """Load every active location once into the global index, the compiled cache and the shared snapshot.
+
+        The snapshot is only published if no other worker has a fresh one.
+        """
+        loaded_at = time.time()
+        locations = []
+        def load() -> List[Location]:
+            locations.extend(self.repository.get_all_active_locations())
+            return locations
+        self.global_index.rebuild(load)
+
+        compiled_by_profile = self._compile_by_profile(locations)
+        for profile_id, compiled in compiled_by_profile.items():
+            # Profiles written during the load are compiled lazily instead
+            if self.geofence_versions.changed_at(profile_id) < loaded_at:
+                self.compiled_geofences.put(profile_id, self.geofence_versions.get(profile_id), compiled)
+        if self.shared_geofences is not None:
+            self.shared_geofences.publish(lambda: (loaded_at, compiled_by_profile))
+        return len(locations)
+
+    def warm_global_index(self) -> int:
+        """Load every active location into the global geofence index."""
+        self.global_index.rebuild(self.repository.get_all_active_locations)
+        return self.global_index.stats()['locations']
+
+    def reverse_lookup(self, latitude: float, longitude: float) -> List[Location]:
+        """Get the active locations of any profile containing a position."""
+        warmed_at = self.global_index.rebuilt_at
+        if warmed_at is None:
+            self.warm_global_index()
+        elif time.monotonic() - warmed_at > self.global_index_refresh_seconds:
+            self._run_in_background(self._global_refresh_lock, self.warm_global_index,
+                                    "Global geofence index refresh")
+
+        return self.global_index.lookup(latitude, longitude)
+
+    @staticmethod
+    def _run_in_background(lock: threading.Lock, task: Callable[[], object], description: str):
+        """Run task in a daemon thread without blocking the caller, once at a time per lock."""
+        if not lock.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                task()
+            except Exception as e:
+                logger.error("❌ %s failed: %s", description, e)
+            finally:
+                lock.release()
+
+        threading.Thread(target=run, daemon=True).start()
@@ -0,0 +1,86 @@
+"""Compiled, array-based geofence representation for Locations context."""
+import math
+import sys
+from array import array
+from typing import Dict, List, Optional, Sequence
+from locations.domain.entities import Location
+from locations.domain.geometry import PreparedPolygon, prepare_polygon
+from locations.domain.spatial_index import SphericalKDTree
+
+
+class CompiledGeofences:
+    """Read-only snapshot of a profile's active geofences as parallel arrays.
+
+    Coordinates, radii and the trigonometric terms distance kernels need are
+    stored in contiguous float64 arrays, with parallel lists of IDs and names.
+    Polygon geofences keep their prepared geometry in a sparse map by index.
+    One instance is built per geofence version and shared by every request,
+    so it must never be mutated after construction.
+    """
+
+    # Float arrays, in serialization order
+    ARRAY_FIELDS = ('latitudes', 'longitudes', 'radii', 'lat_radians', 'lon_radians',
+                    'sin_lat', 'cos_lat', 'sin_lon', 'cos_lon')
+
+    def __init__(self, locations: Sequence[Location]):
+        self.location_ids: List[str] = [location.location_id for location in locations]
+        self.names: List[str] = [location.name for location in locations]
+        self.latitudes = array('d', (location.latitude for location in locations))
+        self.longitudes = array('d', (location.longitude for location in locations))
+        self.radii = array('d', (location.radius for location in locations))
+        self.lat_radians = array('d', (math.radians(latitude) for latitude in self.latitudes))
+        self.lon_radians = array('d', (math.radians(longitude) for longitude in self.longitudes))
+        self.sin_lat = array('d', (math.sin(phi) for phi in self.lat_radians))
+        self.cos_lat = array('d', (math.cos(phi) for phi in self.lat_radians))
+        self.sin_lon = array('d', (math.sin(lam) for lam in self.lon_radians))
+        self.cos_lon = array('d', (math.cos(lam) for lam in self.lon_radians))
+        self.encoded_polygons: Dict[int, str] = {
+            index: location.polygon
+            for index, location in enumerate(locations)
+            if location.polygon
+        }
+        self.polygons: Dict[int, PreparedPolygon] = {
+            index: prepare_polygon(encoded) for index, encoded in self.encoded_polygons.items()
+        }
+        self._kd_tree: Optional[SphericalKDTree] = None
+
+    @classmethod
+    def from_arrays(cls, location_ids: List[str], names: List[str],
+                    arrays: Dict[str, Sequence[float]],
+                    encoded_polygons: Dict[int, str]) -> 'CompiledGeofences':
+        """Rebuild from serialized fields; arrays may be zero-copy buffer views."""
+        compiled = cls.__new__(cls)
+        compiled.location_ids = location_ids
+        compiled.names = names
+        for field in cls.ARRAY_FIELDS:
+            setattr(compiled, field, arrays[field])
+        compiled.encoded_polygons = encoded_polygons
+        compiled.polygons = {
+            index: prepare_polygon(encoded) for index, encoded in encoded_polygons.items()
+        }
+        compiled._kd_tree = None
+        return compiled
+
+    def __len__(self) -> int:
+        return len(self.location_ids)
+
+    @property
+    def kd_tree(self) -> SphericalKDTree:
+        """Get the k-nearest-neighbour index over the geofence centers, built on first use."""
+        if self._kd_tree is None:
+            self._kd_tree = SphericalKDTree.from_unit_vectors([
+                (self.cos_lat[index] * self.cos_lon[index],
+                 self.cos_lat[index] * self.sin_lon[index],
+                 self.sin_lat[index])
+                for index in range(len(self))
+            ])
+        return self._kd_tree
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the arrays, lists and strings."""
+        arrays = [getattr(self, field) for field in self.ARRAY_FIELDS]
+        total = sum(values.itemsize * len(values) for values in arrays)
+        total += sys.getsizeof(self.location_ids) + sys.getsizeof(self.names)
+        total += sum(sys.getsizeof(value) for value in self.location_ids)
+        total += sum(sys.getsizeof(value) for value in self.names)
+        return total
@@ -1,6 +1,7 @@
 """Domain entities for Locations context."""
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
+from locations.domain.geometry import Point, PreparedPolygon, decode_polygon, prepare_polygon
 
 
 class Location:
@@ -8,7 +9,8 @@ class Location:
 
     def __init__(self, location_id: str, name: str, latitude: float,
                  longitude: float, radius: float, profile_id: str,
-                 address: str = "", is_active: bool = True, created_at: Optional[datetime] = None):
+                 address: str = "", is_active: bool = True, created_at: Optional[datetime] = None,
+                 polygon: Optional[str] = None):
         self.location_id = location_id
         self.name = name
         self.latitude = latitude
@@ -18,6 +20,18 @@ class Location:
         self.address = address
         self.is_active = is_active
         self.created_at = created_at or datetime.utcnow()
+        # Encoded polyline of the polygon geofence; None for circular geofences
+        self.polygon = polygon or None
+    
+    @property
+    def polygon_points(self) -> Optional[List[Point]]:
+        """Get the polygon vertices as (latitude, longitude) pairs."""
+        return decode_polygon(self.polygon) if self.polygon else None
+    
+    @property
+    def prepared_polygon(self) -> Optional[PreparedPolygon]:
+        """Get the prepared polygon geometry, shared by equal shapes."""
+        return prepare_polygon(self.polygon) if self.polygon else None
     
     def to_dict(self) -> dict:
         """Convert to dictionary representation."""
@@ -30,5 +44,6 @@ class Location:
             'profile_id': self.profile_id,
             'address': self.address,
             'is_active': self.is_active,
+            'polygon': [list(point) for point in self.polygon_points] if self.polygon else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
\ No newline at end of file
@@ -0,0 +1,260 @@
+"""Polygon geofence geometry for Locations context."""
+import math
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+# Mean earth radius in meters, as used by geopy's great_circle
+EARTH_RADIUS_METERS = 6371009.0
+METERS_PER_DEGREE = EARTH_RADIUS_METERS * math.pi / 180.0
+# Encoded polylines use 6 decimal places (~0.1 m)
+POLYLINE_PRECISION = 6
+MIN_POLYGON_VERTICES = 3
+
+Point = Tuple[float, float]
+
+
+def encode_polygon(points: Sequence[Point], precision: int = POLYLINE_PRECISION) -> str:
+    """Encode (lat, lon) vertices with the Google encoded polyline algorithm."""
+    factor = 10 ** precision
+    encoded = []
+    previous_lat = previous_lon = 0
+    for latitude, longitude in points:
+        lat = int(round(latitude * factor))
+        lon = int(round(longitude * factor))
+        for delta in (lat - previous_lat, lon - previous_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                encoded.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            encoded.append(chr(value + 63))
+        previous_lat, previous_lon = lat, lon
+    return ''.join(encoded)
+
+
+def decode_polygon(encoded: str, precision: int = POLYLINE_PRECISION) -> List[Point]:
+    """Decode an encoded polyline into (lat, lon) vertices."""
+    factor = 10 ** precision
+    points = []
+    index = lat = lon = 0
+    length = len(encoded)
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        points.append((lat / factor, lon / factor))
+    return points
+
+
+def validate_polygon(points: Sequence[Sequence[float]]) -> List[Point]:
+    """Validate raw polygon vertices and return them as (lat, lon) tuples.
+
+    Bounding boxes and projections use plain longitude ranges, so polygons
+    crossing the antimeridian are refused: no edge may span more than 180
+    degrees of longitude, since its shorter way round would cross it.
+    """
+    if not isinstance(points, (list, tuple)):
+        raise ValueError("Polygon must be a list of [latitude, longitude] pairs")
+
+    vertices = []
+    for point in points:
+        if not isinstance(point, (list, tuple)) or len(point) != 2:
+            raise ValueError("Polygon must be a list of [latitude, longitude] pairs")
+        latitude, longitude = float(point[0]), float(point[1])
+        if latitude < -90 or latitude > 90 or longitude < -180 or longitude > 180:
+            raise ValueError("Polygon vertex out of range")
+        vertices.append((latitude, longitude))
+
+    # A closing vertex equal to the first one is implicit
+    if len(vertices) > 1 and vertices[0] == vertices[-1]:
+        vertices.pop()
+    if len(vertices) < MIN_POLYGON_VERTICES:
+        raise ValueError(f"Polygon needs at least {MIN_POLYGON_VERTICES} vertices")
+    for index, (_, longitude) in enumerate(vertices):
+        if abs(vertices[index - 1][1] - longitude) > 180:
+            raise ValueError("Polygon must not cross the antimeridian (180° longitude)")
+    return vertices
+
+
+class PreparedPolygon:
+    """Polygon preprocessed for fast containment and boundary distance tests.
+
+    Vertices are projected once onto a local equirectangular plane in meters
+    around the polygon's bounding-box center. Containment uses a bounding-box
+    reject followed by ray casting over the edges of a single horizontal slab;
+    boundary distance walks a uniform edge grid outwards from the query cell
+    and stops as soon as no unvisited cell can hold a closer edge.
+    """
+
+    def __init__(self, points: Sequence[Point]):
+        if len(points) < MIN_POLYGON_VERTICES:
+            raise ValueError(f"Polygon needs at least {MIN_POLYGON_VERTICES} vertices")
+
+        latitudes = [point[0] for point in points]
+        longitudes = [point[1] for point in points]
+        self.min_lat, self.max_lat = min(latitudes), max(latitudes)
+        self.min_lon, self.max_lon = min(longitudes), max(longitudes)
+        self.center_lat = (self.min_lat + self.max_lat) / 2.0
+        self.center_lon = (self.min_lon + self.max_lon) / 2.0
+        self._cos_center = math.cos(math.radians(self.center_lat))
+
+        xs, ys = [], []
+        for latitude, longitude in points:
+            x, y = self.project(latitude, longitude)
+            xs.append(x)
+            ys.append(y)
+        self.vertex_count = len(points)
+        self._edges = [
+            (xs[i], ys[i], xs[(i + 1) % len(xs)], ys[(i + 1) % len(ys)])
+            for i in range(len(xs))
+        ]
+        self.min_x, self.max_x = min(xs), max(xs)
+        self.min_y, self.max_y = min(ys), max(ys)
+        # Farthest vertex from the center, in meters
+        self.extent = max(math.hypot(x, y) for x, y in zip(xs, ys))
+
+        self._build_slabs()
+        self._build_grid()
+
+    def project(self, latitude: float, longitude: float) -> Tuple[float, float]:
+        """Project a position onto the polygon's local plane in meters."""
+        x = math.radians(longitude - self.center_lon) * self._cos_center * EARTH_RADIUS_METERS
+        y = math.radians(latitude - self.center_lat) * EARTH_RADIUS_METERS
+        return x, y
+
+    def _build_slabs(self):
+        """Bucket non-horizontal edges into horizontal slabs."""
+        self._slab_count = max(1, int(math.sqrt(len(self._edges))))
+        self._slab_height = max((self.max_y - self.min_y) / self._slab_count, 1e-9)
+        self._slabs: List[List[tuple]] = [[] for _ in range(self._slab_count)]
+        for edge in self._edges:
+            x1, y1, x2, y2 = edge
+            if y1 == y2:
+                continue
+            first = self._slab_index(min(y1, y2))
+            last = self._slab_index(max(y1, y2))
+            for slab in range(first, last + 1):
+                self._slabs[slab].append(edge)
+
+    def _slab_index(self, y: float) -> int:
+        """Get the slab containing a projected y coordinate."""
+        index = int((y - self.min_y) / self._slab_height)
+        return min(max(index, 0), self._slab_count - 1)
+
+    def _build_grid(self):
+        """Bucket edges into a uniform grid of cells by their bounding boxes."""
+        self._grid_size = max(1, int(math.sqrt(len(self._edges))))
+        self._cell_width = max((self.max_x - self.min_x) / self._grid_size, 1e-9)
+        self._cell_height = max((self.max_y - self.min_y) / self._grid_size, 1e-9)
+        self._grid: dict = {}
+        for edge in self._edges:
+            x1, y1, x2, y2 = edge
+            col_first, row_first = self._cell_of(min(x1, x2), min(y1, y2))
+            col_last, row_last = self._cell_of(max(x1, x2), max(y1, y2))
+            for col in range(col_first, col_last + 1):
+                for row in range(row_first, row_last + 1):
+                    self._grid.setdefault((col, row), []).append(edge)
+
+    def _cell_of(self, x: float, y: float) -> Tuple[int, int]:
+        """Get the grid cell of a projected point, clamped to the grid."""
+        col = int((x - self.min_x) / self._cell_width)
+        row = int((y - self.min_y) / self._cell_height)
+        last = self._grid_size - 1
+        return min(max(col, 0), last), min(max(row, 0), last)
+
+    def _contains_xy(self, x: float, y: float) -> bool:
+        """Even-odd ray casting restricted to one slab."""
+        if x < self.min_x or x > self.max_x or y < self.min_y or y > self.max_y:
+            return False
+        inside = False
+        for x1, y1, x2, y2 in self._slabs[self._slab_index(y)]:
+            if (y1 > y) != (y2 > y):
+                if x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                    inside = not inside
+        return inside
+
+    def _cell_distance(self, x: float, y: float, col: int, row: int) -> float:
+        """Distance from a point to a grid cell rectangle."""
+        left = self.min_x + col * self._cell_width
+        bottom = self.min_y + row * self._cell_height
+        dx = max(left - x, 0.0, x - (left + self._cell_width))
+        dy = max(bottom - y, 0.0, y - (bottom + self._cell_height))
+        return math.hypot(dx, dy)
+
+    def _ring_cells(self, col: int, row: int, ring: int):
+        """Yield the in-grid cells at Chebyshev distance `ring` from a cell."""
+        if ring == 0:
+            yield col, row
+            return
+        last = self._grid_size - 1
+        for c in range(max(col - ring, 0), min(col + ring, last) + 1):
+            if row - ring >= 0:
+                yield c, row - ring
+            if row + ring <= last:
+                yield c, row + ring
+        for r in range(max(row - ring + 1, 0), min(row + ring - 1, last) + 1):
+            if col - ring >= 0:
+                yield col - ring, r
+            if col + ring <= last:
+                yield col + ring, r
+
+    def _boundary_distance_xy(self, x: float, y: float) -> float:
+        """Distance from a projected point to the closest polygon edge."""
+        start_col, start_row = self._cell_of(x, y)
+        best = float('inf')
+        visited = set()
+        # Cells never get closer as rings grow, so stop at the first ring
+        # whose closest cell is already farther than the best edge.
+        for ring in range(self._grid_size):
+            ring_min = float('inf')
+            for col, row in self._ring_cells(start_col, start_row, ring):
+                cell_distance = self._cell_distance(x, y, col, row)
+                ring_min = min(ring_min, cell_distance)
+                if cell_distance >= best:
+                    continue
+                for edge in self._grid.get((col, row), ()):
+                    if id(edge) in visited:
+                        continue
+                    visited.add(id(edge))
+                    best = min(best, _segment_distance(x, y, *edge))
+            if ring_min >= best:
+                break
+        return best
+
+    def contains(self, latitude: float, longitude: float) -> bool:
+        """Check if a position lies inside the polygon."""
+        if (latitude < self.min_lat or latitude > self.max_lat
+                or longitude < self.min_lon or longitude > self.max_lon):
+            return False
+        return self._contains_xy(*self.project(latitude, longitude))
+
+    def signed_distance(self, latitude: float, longitude: float) -> float:
+        """Distance in meters to the boundary, negative inside the polygon."""
+        x, y = self.project(latitude, longitude)
+        distance = self._boundary_distance_xy(x, y)
+        return -distance if self._contains_xy(x, y) else distance
+
+
+def _segment_distance(x: float, y: float, x1: float, y1: float, x2: float, y2: float) -> float:
+    """Distance from a point to a line segment on the plane."""
+    dx, dy = x2 - x1, y2 - y1
+    length_squared = dx * dx + dy * dy
+    if length_squared == 0:
+        return math.hypot(x - x1, y - y1)
+    t = max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) / length_squared))
+    return math.hypot(x - (x1 + t * dx), y - (y1 + t * dy))
+
+
+@lru_cache(maxsize=4096)
+def prepare_polygon(encoded: str) -> PreparedPolygon:
+    """Get the prepared geometry of an encoded polygon, built once per shape."""
+    return PreparedPolygon(decode_polygon(encoded))
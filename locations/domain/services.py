@@ -1,22 +1,194 @@
 """Domain services for Locations context."""
+import math
+from typing import List, Optional, Tuple
 from geopy.distance import great_circle
+from locations.domain.geometry import EARTH_RADIUS_METERS, METERS_PER_DEGREE
+
+
+DISTANCE_MODE_EXACT = 'exact'
+DISTANCE_MODE_TIERED = 'tiered'
+# Limits within which the equirectangular error bound has been validated
+FAST_PATH_MAX_LATITUDE = 85.0
+FAST_PATH_MAX_DISTANCE_METERS = 200000.0
+# Absolute slack covering floating point rounding, in meters
+FAST_PATH_ABSOLUTE_SLACK = 1e-3
+# Reported distances may be off by at most this fraction on the fast path
+FAST_PATH_MAX_RELATIVE_ERROR = 1e-3
 
 
 class LocationService:
     """Service for location operations."""
 
+    def __init__(self, distance_mode: str = DISTANCE_MODE_EXACT):
+        if distance_mode not in (DISTANCE_MODE_EXACT, DISTANCE_MODE_TIERED):
+            raise ValueError(f"Invalid distance mode: {distance_mode}")
+        self.distance_mode = distance_mode
+
     @staticmethod
     def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """Calculate distance between two points in meters."""
         return great_circle((lat1, lon1), (lat2, lon2)).meters
 
+    @staticmethod
+    def calculate_geofence_distance(location, device_lat: float, device_lon: float) -> Tuple[float, float]:
+        """Get the distance to a geofence and the clearance to its boundary.
+
+        For circular geofences the distance is measured to the center. For
+        polygon geofences it is measured to the polygon (0 inside it) and the
+        radius acts as an outer buffer. The clearance is how far the device is
+        from the point where its membership would change.
+        """
+        prepared_polygon = location.prepared_polygon
+        if prepared_polygon is None:
+            distance = LocationService.calculate_distance(
+                location.latitude,
+                location.longitude,
+                device_lat,
+                device_lon
+            )
+            return distance, abs(distance - location.radius)
+
+        signed_distance = prepared_polygon.signed_distance(device_lat, device_lon)
+        return max(signed_distance, 0.0), abs(signed_distance - location.radius)
+
+    @staticmethod
+    def _fast_path_error_bound(distance: float, abs_tan_lat1: float,
+                               delta_phi: float, delta_lambda: float) -> float:
+        """Error bound of an equirectangular distance from point 1, infinite when not tight.
+
+        The distance uses cos(lat1) for the east-west term. Angles in radians,
+        its relative error against the great-circle distance is, to second
+        order, |tan(lat1)|·|Δφ|/2 + (Δφ² + Δλ²)/8: the first term comes from
+        using cos(lat1) instead of the cosine at the mid latitude, the second
+        from the flat-earth and small-angle approximations. The bound used,
+        |tan(lat1)|·|Δφ| + Δφ² + Δλ², is at least twice that. The neglected
+        third-order terms are below the square of the bound, at most 1e-6
+        while it stays within FAST_PATH_MAX_RELATIVE_ERROR, so the factor of
+        two covers them. tests/test_distance.py checks it against geopy.
+        """
+        relative_error = (abs_tan_lat1 * abs(delta_phi)
+                          + delta_phi * delta_phi + delta_lambda * delta_lambda)
+        if relative_error > FAST_PATH_MAX_RELATIVE_ERROR:
+            return float('inf')
+        return distance * relative_error + FAST_PATH_ABSOLUTE_SLACK
+
+    def measure_compiled(self, compiled, device_lat: float, device_lon: float,
+                         band: float = 0.0) -> List[Tuple[float, float]]:
+        """Get (distance, clearance) to every geofence of a CompiledGeofences.
+
+        Polygon geofences are measured as in calculate_geofence_distance. In
+        tiered mode circular geofences within FAST_PATH_MAX_LATITUDE and
+        FAST_PATH_MAX_DISTANCE_METERS are first measured with the
+        equirectangular approximation bounded by _fast_path_error_bound; the exact
+        haversine distance is only computed when the approximation is within
+        its error bound plus `band` (e.g. a hysteresis band) of the radius,
+        where it could change the answer, or when the bound is not tight. The
+        returned clearance is then a lower bound.
+        """
+        phi = math.radians(device_lat)
+        lam = math.radians(device_lon)
+        cos_phi = math.cos(phi)
+        tiered = self.distance_mode == DISTANCE_MODE_TIERED
+        latitudes, lat_radians, lon_radians = compiled.latitudes, compiled.lat_radians, compiled.lon_radians
+        sin_lat, cos_lat, radii, polygons = compiled.sin_lat, compiled.cos_lat, compiled.radii, compiled.polygons
+        measurements = []
+
+        for index in range(len(compiled)):
+            radius = radii[index]
+            prepared_polygon = polygons.get(index) if polygons else None
+            if prepared_polygon is not None:
+                signed_distance = prepared_polygon.signed_distance(device_lat, device_lon)
+                measurements.append((max(signed_distance, 0.0), abs(signed_distance - radius)))
+                continue
+
+            delta_phi = phi - lat_radians[index]
+            delta_lambda = (lam - lon_radians[index] + 3 * math.pi) % (2 * math.pi) - math.pi
+
+            if tiered and abs(latitudes[index]) <= FAST_PATH_MAX_LATITUDE:
+                distance = EARTH_RADIUS_METERS * math.hypot(delta_lambda * cos_lat[index], delta_phi)
+                if distance <= FAST_PATH_MAX_DISTANCE_METERS:
+                    error_bound = self._fast_path_error_bound(
+                        distance, abs(sin_lat[index] / cos_lat[index]), delta_phi, delta_lambda
+                    )
+                    clearance = abs(distance - radius) - error_bound
+                    if clearance > band:
+                        measurements.append((distance, clearance))
+                        continue
+
+            sin_half_phi = math.sin(delta_phi / 2.0)
+            sin_half_lambda = math.sin(delta_lambda / 2.0)
+            haversine = sin_half_phi * sin_half_phi + cos_lat[index] * cos_phi * sin_half_lambda * sin_half_lambda
+            distance = 2.0 * EARTH_RADIUS_METERS * math.asin(math.sqrt(min(haversine, 1.0)))
+            measurements.append((distance, abs(distance - radius)))
+
+        return measurements
+
     @staticmethod
     def is_within_radius(location, device_lat: float, device_lon: float) -> bool:
         """Check if device is within location radius."""
-        distance = LocationService.calculate_distance(
+        distance, _ = LocationService.calculate_geofence_distance(location, device_lat, device_lon)
+        return distance <= location.radius
+
+    @staticmethod
+    def is_inside(distance: float, radius: float, was_inside: Optional[bool] = None,
+                  hysteresis: float = 0.0) -> bool:
+        """Check membership with a hysteresis band around the radius.
+
+        A device that was inside only leaves beyond radius + hysteresis and one
+        that was outside only enters within radius - hysteresis.
+        """
+        if was_inside is None:
+            return distance <= radius
+        if was_inside:
+            return distance <= radius + hysteresis
+        return distance <= max(radius - hysteresis, 0.0)
+
+    @staticmethod
+    def padded_box(min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                   padding: float) -> Tuple[float, float, float, float]:
+        """Grow a (min_lat, min_lon, max_lat, max_lon) box by padding meters.
+
+        Longitudes are not wrapped, so a box crossing the antimeridian has
+        min_lon < -180 or max_lon > 180. Boxes reaching a pole span all longitudes.
+        """
+        lat_padding = padding / METERS_PER_DEGREE
+        min_lat, max_lat = min_lat - lat_padding, max_lat + lat_padding
+        if min_lat <= -90.0 or max_lat >= 90.0:
+            return max(min_lat, -90.0), -180.0, min(max_lat, 90.0), 180.0
+
+        cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+        lon_padding = lat_padding / cos_lat
+        if max_lon - min_lon + 2 * lon_padding >= 360.0:
+            return min_lat, -180.0, max_lat, 180.0
+        return min_lat, min_lon - lon_padding, max_lat, max_lon + lon_padding
+
+    @staticmethod
+    def bounding_box(location) -> Tuple[float, float, float, float]:
+        """Get a (min_lat, min_lon, max_lat, max_lon) box covering a geofence."""
+        prepared_polygon = location.prepared_polygon
+        if prepared_polygon is None:
+            return LocationService.padded_box(
+                location.latitude, location.longitude,
+                location.latitude, location.longitude,
+                location.radius
+            )
+        return LocationService.padded_box(
+            prepared_polygon.min_lat, prepared_polygon.min_lon,
+            prepared_polygon.max_lat, prepared_polygon.max_lon,
+            location.radius
+        )
+
+    @staticmethod
+    def calculate_reach(location) -> float:
+        """Get the farthest distance from a location's coordinates that can be inside it."""
+        prepared_polygon = location.prepared_polygon
+        if prepared_polygon is None:
+            return location.radius
+
+        anchor_to_center = LocationService.calculate_distance(
             location.latitude,
             location.longitude,
-            device_lat,
-            device_lon
+            prepared_polygon.center_lat,
+            prepared_polygon.center_lon
         )
-        return distance <= location.radius
\ No newline at end of file
+        return anchor_to_center + prepared_polygon.extent + location.radius
@@ -0,0 +1,54 @@
+"""GPS smoothing for Locations context."""
+from typing import Optional, Tuple
+
+
+class GpsKalmanFilter:
+    """Accuracy-aware Kalman filter for a single device's position.
+
+    Latitude and longitude are filtered as two independent constant-position
+    processes sharing one variance in square meters. The variance grows with
+    `process_noise` (expected speed in m/s) between fixes and each fix is
+    weighted by its reported horizontal accuracy, so precise fixes move the
+    estimate a lot and noisy ones barely move it. Longitude is filtered
+    across the antimeridian: each fix is unwrapped to within 180 degrees of
+    the estimate and the result is normalised back to [-180, 180).
+    """
+
+    def __init__(self, process_noise: float = 3.0, min_accuracy: float = 1.0):
+        self.process_noise = process_noise
+        self.min_accuracy = min_accuracy
+        self.latitude: Optional[float] = None
+        self.longitude: Optional[float] = None
+        self.variance = -1.0
+        self.timestamp = 0.0
+
+    def reset(self):
+        """Forget the current estimate."""
+        self.latitude = None
+        self.longitude = None
+        self.variance = -1.0
+
+    def update(self, latitude: float, longitude: float, accuracy: float,
+               timestamp: float) -> Tuple[float, float]:
+        """Fold a new fix into the estimate and return the smoothed position."""
+        accuracy = max(accuracy, self.min_accuracy)
+        measurement_variance = accuracy * accuracy
+
+        if self.variance < 0:
+            self.latitude = latitude
+            self.longitude = longitude
+            self.variance = measurement_variance
+        else:
+            elapsed = timestamp - self.timestamp
+            if elapsed > 0:
+                self.variance += elapsed * self.process_noise * self.process_noise
+
+            gain = self.variance / (self.variance + measurement_variance)
+            self.latitude += gain * (latitude - self.latitude)
+            # Take the short way round when the fix is across the antimeridian
+            longitude_delta = (longitude - self.longitude + 180.0) % 360.0 - 180.0
+            self.longitude = (self.longitude + gain * longitude_delta + 180.0) % 360.0 - 180.0
+            self.variance = (1 - gain) * self.variance
+
+        self.timestamp = timestamp
+        return self.latitude, self.longitude
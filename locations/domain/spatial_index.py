@@ -0,0 +1,115 @@
+"""Spatial indexes for Locations context."""
+import heapq
+import math
+from typing import List, Optional, Sequence, Tuple
+from locations.domain.geometry import EARTH_RADIUS_METERS
+
+
+def to_unit_vector(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    """Convert a position to (x, y, z) on the unit sphere."""
+    lat = math.radians(latitude)
+    lon = math.radians(longitude)
+    cos_lat = math.cos(lat)
+    return cos_lat * math.cos(lon), cos_lat * math.sin(lon), math.sin(lat)
+
+
+def chord_to_meters(chord: float) -> float:
+    """Convert a unit-sphere chord length to a great-circle distance in meters."""
+    return 2.0 * math.asin(min(chord / 2.0, 1.0)) * EARTH_RADIUS_METERS
+
+
+def meters_to_chord(meters: float) -> float:
+    """Convert a great-circle distance in meters to a unit-sphere chord length."""
+    angle = min(meters / EARTH_RADIUS_METERS, math.pi)
+    return 2.0 * math.sin(angle / 2.0)
+
+
+class SphericalKDTree:
+    """KD-tree over unit-sphere coordinates for k-nearest-neighbour queries.
+
+    Chord length on the unit sphere is monotonic in great-circle distance, so
+    an ordinary 3D KD-tree answers great-circle nearest-neighbour queries
+    without special cases at the poles or the antimeridian. Queries visit
+    O(log n) nodes on average. Results are (position index, meters) pairs.
+    """
+
+    def __init__(self, positions: Sequence[Tuple[float, float]]):
+        self._index_vectors([to_unit_vector(lat, lon) for lat, lon in positions])
+
+    @classmethod
+    def from_unit_vectors(cls, vectors: Sequence[Tuple[float, float, float]]) -> 'SphericalKDTree':
+        """Build a tree from precomputed unit-sphere coordinates."""
+        tree = cls.__new__(cls)
+        tree._index_vectors(vectors)
+        return tree
+
+    def _index_vectors(self, vectors: Sequence[Tuple[float, float, float]]):
+        """Build the tree over unit vectors, keeping their positions as indexes."""
+        # Node layout: (x, y, z, position index, split axis, left, right)
+        self._nodes: List[tuple] = []
+        points = [tuple(vector) + (index,) for index, vector in enumerate(vectors)]
+        self._root = self._build(points)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def _build(self, points: List[tuple]) -> int:
+        """Build a balanced subtree and return its node index, -1 if empty."""
+        if not points:
+            return -1
+
+        spreads = [
+            max(point[axis] for point in points) - min(point[axis] for point in points)
+            for axis in range(3)
+        ]
+        axis = spreads.index(max(spreads))
+        points.sort(key=lambda point: point[axis])
+        middle = len(points) // 2
+
+        node_index = len(self._nodes)
+        self._nodes.append(None)
+        left = self._build(points[:middle])
+        right = self._build(points[middle + 1:])
+        x, y, z, position_index = points[middle]
+        self._nodes[node_index] = (x, y, z, position_index, axis, left, right)
+        return node_index
+
+    def query(self, latitude: float, longitude: float, k: int = 1,
+              max_distance: Optional[float] = None) -> List[Tuple[int, float]]:
+        """Get up to k nearest positions, closest first, within max_distance meters."""
+        if k <= 0 or self._root < 0:
+            return []
+
+        target = to_unit_vector(latitude, longitude)
+        bound = meters_to_chord(max_distance) if max_distance is not None else float('inf')
+        bound_squared = bound * bound
+        # Max-heap of (-squared chord, position index) holding the best k so far
+        best: List[Tuple[float, int]] = []
+        stack = [self._root]
+
+        while stack:
+            node_index = stack.pop()
+            x, y, z, position_index, axis, left, right = self._nodes[node_index]
+            dx, dy, dz = target[0] - x, target[1] - y, target[2] - z
+            distance_squared = dx * dx + dy * dy + dz * dz
+
+            limit = -best[0][0] if len(best) == k else bound_squared
+            if distance_squared <= limit and distance_squared <= bound_squared:
+                if len(best) == k:
+                    heapq.heapreplace(best, (-distance_squared, position_index))
+                else:
+                    heapq.heappush(best, (-distance_squared, position_index))
+
+            offset = target[axis] - (x, y, z)[axis]
+            near, far = (left, right) if offset < 0 else (right, left)
+            limit = -best[0][0] if len(best) == k else bound_squared
+            # Push the far side first so the near side is explored first
+            if far >= 0 and offset * offset <= limit:
+                stack.append(far)
+            if near >= 0:
+                stack.append(near)
+
+        return sorted(
+            ((position_index, chord_to_meters(math.sqrt(-negative))) for negative, position_index in best),
+            key=lambda item: item[1]
+        )
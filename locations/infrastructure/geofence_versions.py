@@ -0,0 +1,42 @@
+"""Per-profile geofence version tracking for Locations context."""
+
+import threading
+import time
+from typing import Dict
+
+
+class GeofenceVersionRegistry:
+    """Tracks a monotonically increasing geofence version per profile.
+
+    Every location write bumps the version of the affected profile, so any
+    cache keyed on (profile_id, version) is invalidated implicitly.
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._changed_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, profile_id: str) -> int:
+        """Get the current geofence version of a profile."""
+        return self._versions.get(profile_id, 0)
+
+    def changed_at(self, profile_id: str) -> float:
+        """Get the wall-clock time of a profile's last write in this process, 0 if none."""
+        return self._changed_at.get(profile_id, 0.0)
+
+    def bump(self, profile_id: str) -> int:
+        """Invalidate a profile's geofences and return the new version."""
+        with self._lock:
+            version = self._versions.get(profile_id, 0) + 1
+            self._versions[profile_id] = version
+            self._changed_at[profile_id] = time.time()
+            return version
+
+
+# Shared registry instance
+geofence_versions = GeofenceVersionRegistry()
+
+def get_geofence_versions() -> GeofenceVersionRegistry:
+    """Get the geofence version registry instance."""
+    return geofence_versions
@@ -0,0 +1,132 @@
+"""Global in-memory spatial index of active locations across all profiles."""
+
+import math
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+from locations.domain.entities import Location
+from locations.domain.services import LocationService
+from shared.infrastructure.lazy import register_reset
+from shared.infrastructure.rebuildable_index import RebuildableIndex
+
+
+class GlobalGeofenceIndex(RebuildableIndex[Location]):
+    """Grid-cell index answering "which geofences contain this point".
+
+    Every active location is registered in the fixed-size lat/lon cells its
+    bounding box overlaps. A lookup hashes the point to its cell and runs exact
+    containment tests on that cell's few candidates only. Locations covering
+    more than `max_cells_per_location` cells are kept in a short list that is
+    tested on every lookup instead of flooding the grid. Writes made while
+    a rebuild is loading are replayed onto the rebuilt index.
+    """
+
+    STATE_FIELDS = ('_cells', '_locations', '_location_cells', '_oversized')
+
+    def __init__(self, cell_degrees: float = 0.01, max_cells_per_location: int = 256):
+        super().__init__()
+        self.cell_degrees = cell_degrees
+        self.max_cells_per_location = max_cells_per_location
+        self._lon_cells = int(math.ceil(360.0 / cell_degrees))
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+        self._locations: Dict[str, Location] = {}
+        self._location_cells: Dict[str, List[Tuple[int, int]]] = {}
+        self._oversized: Set[str] = set()
+
+    def _empty(self) -> 'GlobalGeofenceIndex':
+        return GlobalGeofenceIndex(self.cell_degrees, self.max_cells_per_location)
+
+    def _key(self, location: Location) -> str:
+        return location.location_id
+
+    def _accepts(self, location: Location) -> bool:
+        return location.is_active
+
+    def _cell_of(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        """Get the grid cell of a position, wrapping longitude."""
+        lat_index = math.floor(latitude / self.cell_degrees)
+        lon_index = math.floor((longitude + 180.0) / self.cell_degrees) % self._lon_cells
+        return lat_index, lon_index
+
+    def _cells_for(self, location: Location) -> Optional[List[Tuple[int, int]]]:
+        """Get the cells covered by a location, or None if it is oversized."""
+        min_lat, min_lon, max_lat, max_lon = LocationService.bounding_box(location)
+        lat_first = math.floor(min_lat / self.cell_degrees)
+        lat_last = math.floor(max_lat / self.cell_degrees)
+        lon_first = math.floor((min_lon + 180.0) / self.cell_degrees)
+        lon_last = math.floor((max_lon + 180.0) / self.cell_degrees)
+
+        lon_count = min(lon_last - lon_first + 1, self._lon_cells)
+        if (lat_last - lat_first + 1) * lon_count > self.max_cells_per_location:
+            return None
+
+        return [
+            (lat_index, (lon_first + offset) % self._lon_cells)
+            for lat_index in range(lat_first, lat_last + 1)
+            for offset in range(lon_count)
+        ]
+
+    def _add(self, location: Location):
+        """Register an active location. Caller holds the lock."""
+        self._locations[location.location_id] = location
+        cells = self._cells_for(location)
+        if cells is None:
+            self._oversized.add(location.location_id)
+            return
+        self._location_cells[location.location_id] = cells
+        for cell in cells:
+            self._cells.setdefault(cell, set()).add(location.location_id)
+
+    def _discard(self, location_id: str):
+        """Unregister a location. Caller holds the lock."""
+        self._locations.pop(location_id, None)
+        self._oversized.discard(location_id)
+        for cell in self._location_cells.pop(location_id, ()):
+            members = self._cells.get(cell)
+            if members is not None:
+                members.discard(location_id)
+                if not members:
+                    del self._cells[cell]
+
+    def lookup(self, latitude: float, longitude: float) -> List[Location]:
+        """Get every indexed geofence containing a position."""
+        with self._lock:
+            candidate_ids = set(self._cells.get(self._cell_of(latitude, longitude), ()))
+            candidate_ids.update(self._oversized)
+            candidates = [self._locations[location_id] for location_id in candidate_ids]
+
+        return [
+            location for location in candidates
+            if LocationService.is_within_radius(location, latitude, longitude)
+        ]
+
+    def stats(self) -> dict:
+        """Get index size counters."""
+        return {
+            'locations': len(self._locations),
+            'cells': len(self._cells),
+            'oversized_locations': len(self._oversized),
+            'cell_degrees': self.cell_degrees,
+            'warmed': self.rebuilt_at is not None
+        }
+
+
+# Shared index instance, configured on first use
+_global_index: Optional[GlobalGeofenceIndex] = None
+_global_index_lock = threading.Lock()
+
+def get_global_geofence_index(cell_degrees: float = 0.01,
+                              max_cells_per_location: int = 256) -> GlobalGeofenceIndex:
+    """Get the global geofence index instance."""
+    global _global_index
+    with _global_index_lock:
+        if _global_index is None:
+            _global_index = GlobalGeofenceIndex(cell_degrees, max_cells_per_location)
+        return _global_index
+
+
+@register_reset
+def reset_global_geofence_index():
+    """Drop the global geofence index so the next use builds it from the current configuration."""
+    global _global_index
+    with _global_index_lock:
+        _global_index = None
@@ -0,0 +1,60 @@
+"""Per-profile cache of derived geofence indexes."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+
+class ProfileIndexCache:
+    """LRU cache of indexes built from a profile's geofences.
+
+    Entries are keyed on (profile_id, geofence version) so location writes in
+    this worker invalidate them immediately; the TTL bounds how long writes
+    made by other workers can go unnoticed.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, max_profiles: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_profiles = max_profiles
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+
+    def get_or_build(self, profile_id: str, version: int, builder: Callable[[], Any]) -> Any:
+        """Get the index of a profile, building it with builder() when stale."""
+        with self._lock:
+            entry = self._entries.get(profile_id)
+            if (entry is not None and entry[0] == version
+                    and time.monotonic() - entry[1] <= self.ttl_seconds):
+                self._entries.move_to_end(profile_id)
+                self.hits += 1
+                return entry[2]
+
+        # Build outside the lock; concurrent builders just race to store
+        index = builder()
+        self.put(profile_id, version, index)
+        return index
+
+    def put(self, profile_id: str, version: int, index: Any):
+        """Store a freshly built index of a profile."""
+        with self._lock:
+            self._entries[profile_id] = (version, time.monotonic(), index)
+            self._entries.move_to_end(profile_id)
+            while len(self._entries) > self.max_profiles:
+                self._entries.popitem(last=False)
+            self.builds += 1
+
+    def invalidate(self, profile_id: str):
+        """Drop the index of a profile."""
+        with self._lock:
+            self._entries.pop(profile_id, None)
+
+    def stats(self) -> dict:
+        """Get cache counters."""
+        return {
+            'profiles': len(self._entries),
+            'hits': self.hits,
+            'builds': self.builds
+        }
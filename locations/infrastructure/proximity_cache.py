@@ -0,0 +1,108 @@
+"""Quantized-position cache for proximity check results."""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from locations.domain.geometry import METERS_PER_DEGREE
+
+# Below this cos(latitude) longitude cells stop shrinking (polar caps)
+MIN_COS_LATITUDE = 1e-3
+
+
+class ProximityResultCache:
+    """LRU cache of check_proximity results keyed on a quantized lat/lon cell.
+
+    Cells are squares of side margin / 2 meters, so any two fixes falling in
+    the same cell are less than `margin` meters apart. A result is only stored
+    when every geofence boundary is more than `margin` meters away from the
+    fix that produced it, which guarantees that any other fix in the same cell
+    gets the same within_radius/event_type answers and distances that are off
+    by less than `margin`. Near-boundary positions are never cached.
+    """
+
+    def __init__(self, margin: float = 10.0, max_entries: int = 50000,
+                 ttl_seconds: float = 30.0, enabled: bool = True):
+        if margin <= 0:
+            raise ValueError("Cache margin must be positive")
+        self.margin = margin
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.cell_degrees = (margin / 2.0) / METERS_PER_DEGREE
+        self._entries: "OrderedDict[tuple, Tuple[float, List[dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.bypasses = 0
+
+    def cell_for(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        """Quantize a position into its (lat, lon) cell indices."""
+        lat_index = math.floor(latitude / self.cell_degrees)
+        # Use the cell edge closest to the equator, where a degree of
+        # longitude is widest, so the cell never exceeds its nominal size.
+        low = lat_index * self.cell_degrees
+        high = low + self.cell_degrees
+        widest = 0.0 if low <= 0.0 <= high else min(abs(low), abs(high))
+        cos_lat = max(math.cos(math.radians(widest)), MIN_COS_LATITUDE)
+        lon_index = math.floor(longitude / (self.cell_degrees / cos_lat))
+        return lat_index, lon_index
+
+    def get(self, profile_id: str, version: int, latitude: float,
+            longitude: float) -> Optional[List[dict]]:
+        """Get a cached result for a position, or None on a miss."""
+        if not self.enabled:
+            return None
+
+        key = (profile_id, version) + self.cell_for(latitude, longitude)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            results = entry[1]
+
+        return [dict(result) for result in results]
+
+    def put(self, profile_id: str, version: int, latitude: float, longitude: float,
+            results: List[dict], clearance: float) -> bool:
+        """Store a result if its closest boundary clearance exceeds the margin."""
+        if not self.enabled:
+            return False
+
+        if clearance <= self.margin:
+            with self._lock:
+                self.bypasses += 1
+            return False
+
+        key = (profile_id, version) + self.cell_for(latitude, longitude)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), [dict(result) for result in results])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.stores += 1
+        return True
+
+    def clear(self):
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Get cache counters."""
+        return {
+            'enabled': self.enabled,
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'near_boundary_bypasses': self.bypasses,
+            'margin_meters': self.margin
+        }
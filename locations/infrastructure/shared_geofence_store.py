@@ -0,0 +1,195 @@
+"""Memory-mapped snapshot of compiled geofences shared across worker processes."""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from locations.domain.compiled import CompiledGeofences
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+SNAPSHOT_MAGIC = b'GEOFNC01'
+# Magic, loaded_at (epoch seconds), directory offset, directory length
+SNAPSHOT_PREAMBLE = struct.Struct('<8sdQQ')
+DOUBLE_SIZE = 8
+
+
+class SharedGeofenceStore:
+    """Compiled geofences of every profile in one read-only memory-mapped file.
+
+    Each profile is stored as the float64 arrays of CompiledGeofences back to
+    back, followed by a JSON blob of IDs, names and encoded polygons; a JSON
+    directory of profiles sits at the end. Publishing writes a new file and
+    os.replace()s it over the old one, so readers never see a partial
+    snapshot, and every worker remaps when the inode changes. Float arrays
+    are memoryview casts over the shared page cache, so adding workers does
+    not add copies of them.
+    """
+
+    def __init__(self, path: str, refresh_seconds: float = 15.0, max_age_seconds: float = 30.0):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        # ((device, inode), mmap, loaded_at, directory) of the mapped snapshot
+        self._mapping: Optional[tuple] = None
+        self.maps = 0
+        self.hits = 0
+        self.publishes = 0
+
+    def _current(self) -> Optional[tuple]:
+        """Get the mapping of the published snapshot, remapping after a swap."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            if self._mapping is None or self._mapping[0] != (stat.st_dev, stat.st_ino):
+                self._mapping = self._map()
+            return self._mapping
+
+    def _map(self) -> Optional[tuple]:
+        """Map the snapshot file read-only. Caller holds the lock."""
+        try:
+            with open(self.path, 'rb') as snapshot:
+                stat = os.fstat(snapshot.fileno())
+                if stat.st_size < SNAPSHOT_PREAMBLE.size:
+                    return None
+                buffer = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+
+        magic, loaded_at, directory_offset, directory_length = SNAPSHOT_PREAMBLE.unpack_from(buffer, 0)
+        if magic != SNAPSHOT_MAGIC:
+            return None
+        directory = json.loads(buffer[directory_offset:directory_offset + directory_length])
+        self.maps += 1
+        # The old mmap is released once no compiled view references it
+        return (stat.st_dev, stat.st_ino), buffer, loaded_at, directory
+
+    def age(self) -> Optional[float]:
+        """Get the age of the published snapshot in seconds, None if there is none."""
+        mapping = self._current()
+        if mapping is None:
+            return None
+        return time.time() - mapping[2]
+
+    def needs_refresh(self) -> bool:
+        """Check whether the snapshot is missing or due for republishing."""
+        age = self.age()
+        return age is None or age > self.refresh_seconds
+
+    def load(self, profile_id: str, changed_at: float = 0.0) -> Optional[CompiledGeofences]:
+        """Get a profile's geofences from the snapshot, None if it is too old.
+
+        changed_at is when this process last wrote the profile; snapshots
+        loaded before that write are not used for it.
+        """
+        mapping = self._current()
+        if mapping is None:
+            return None
+        _, buffer, loaded_at, directory = mapping
+        if time.time() - loaded_at > self.max_age_seconds or changed_at >= loaded_at:
+            return None
+
+        self.hits += 1
+        entry = directory.get(profile_id)
+        if entry is None:
+            return CompiledGeofences([])
+
+        offset, count, meta_offset, meta_length = entry
+        view = memoryview(buffer)
+        arrays = {}
+        for position, field in enumerate(CompiledGeofences.ARRAY_FIELDS):
+            start = offset + position * count * DOUBLE_SIZE
+            arrays[field] = view[start:start + count * DOUBLE_SIZE].cast('d')
+        meta = json.loads(buffer[meta_offset:meta_offset + meta_length])
+        return CompiledGeofences.from_arrays(
+            meta['ids'], meta['names'], arrays,
+            {int(index): encoded for index, encoded in meta['polygons'].items()}
+        )
+
+    def publish(self, loader: Callable[[], Tuple[float, Dict[str, CompiledGeofences]]]) -> Optional[int]:
+        """Swap in a new snapshot of the geofences returned by loader().
+
+        loader() returns when the locations were loaded and their compiled
+        geofences by profile; it is only called when the snapshot needs a
+        refresh. Returns the number of profiles published, or None when the
+        snapshot is fresh or another process is already publishing.
+        """
+        lock_file = open(self.path + '.lock', 'a')
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return None
+            # Another process may have published while we waited for the lock
+            if not self.needs_refresh():
+                return None
+
+            loaded_at, compiled_by_profile = loader()
+            self._write(loaded_at, compiled_by_profile)
+            self.publishes += 1
+            return len(compiled_by_profile)
+        finally:
+            lock_file.close()
+
+    def _write(self, loaded_at: float, compiled_by_profile: Dict[str, CompiledGeofences]):
+        """Write a snapshot to a temporary file and atomically replace the old one."""
+        directory_name = os.path.dirname(self.path) or '.'
+        descriptor, temporary_path = tempfile.mkstemp(
+            dir=directory_name, prefix=os.path.basename(self.path) + '.'
+        )
+        try:
+            with os.fdopen(descriptor, 'wb') as snapshot:
+                snapshot.write(b'\0' * SNAPSHOT_PREAMBLE.size)
+                directory = {}
+                for profile_id, compiled in compiled_by_profile.items():
+                    offset = snapshot.tell()
+                    for field in CompiledGeofences.ARRAY_FIELDS:
+                        snapshot.write(getattr(compiled, field).tobytes())
+                    meta = json.dumps({
+                        'ids': compiled.location_ids,
+                        'names': compiled.names,
+                        'polygons': compiled.encoded_polygons
+                    }).encode('utf-8')
+                    meta_offset = snapshot.tell()
+                    snapshot.write(meta)
+                    # Keep the next profile's arrays 8-byte aligned
+                    snapshot.write(b'\0' * (-snapshot.tell() % DOUBLE_SIZE))
+                    directory[profile_id] = [offset, len(compiled), meta_offset, len(meta)]
+
+                directory_bytes = json.dumps(directory).encode('utf-8')
+                directory_offset = snapshot.tell()
+                snapshot.write(directory_bytes)
+                snapshot.seek(0)
+                snapshot.write(SNAPSHOT_PREAMBLE.pack(
+                    SNAPSHOT_MAGIC, loaded_at, directory_offset, len(directory_bytes)
+                ))
+                snapshot.flush()
+                os.fsync(snapshot.fileno())
+            os.replace(temporary_path, self.path)
+        except Exception:
+            os.unlink(temporary_path)
+            raise
+
+    def stats(self) -> dict:
+        """Get snapshot counters."""
+        mapping = self._current()
+        return {
+            'profiles': len(mapping[3]) if mapping else 0,
+            'bytes': len(mapping[1]) if mapping else 0,
+            'age_seconds': round(time.time() - mapping[2], 3) if mapping else None,
+            'maps': self.maps,
+            'hits': self.hits,
+            'publishes': self.publishes
+        }
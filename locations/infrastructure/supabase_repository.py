@@ -1,6 +1,6 @@
 """Location repository with Supabase implementation."""
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
 from shared.supabase.client import get_supabase_client
 from locations.domain.entities import Location
@@ -24,6 +24,7 @@ class LocationSupabaseRepository:
             'profile_id': location.profile_id,
             'address': location.address,
             'is_active': location.is_active,
+            'polygon': location.polygon,
             'created_at': location.created_at.isoformat() if location.created_at else datetime.utcnow().isoformat()
         }
         
@@ -40,6 +41,7 @@ class LocationSupabaseRepository:
                 profile_id=created_location['profile_id'],
                 address=created_location['address'],
                 is_active=created_location['is_active'],
+                polygon=created_location.get('polygon'),
                 created_at=datetime.fromisoformat(created_location['created_at'].replace('Z', '+00:00')) if created_location['created_at'] else None
             )
         
@@ -60,6 +62,7 @@ class LocationSupabaseRepository:
                 profile_id=location_data['profile_id'],
                 address=location_data['address'],
                 is_active=location_data['is_active'],
+                polygon=location_data.get('polygon'),
                 created_at=datetime.fromisoformat(location_data['created_at'].replace('Z', '+00:00')) if location_data['created_at'] else None
             )
         
@@ -80,14 +83,33 @@ class LocationSupabaseRepository:
                 profile_id=location_data['profile_id'],
                 address=location_data['address'],
                 is_active=location_data['is_active'],
+                polygon=location_data.get('polygon'),
                 created_at=datetime.fromisoformat(location_data['created_at'].replace('Z', '+00:00')) if location_data['created_at'] else None
             ))
         
         return locations
     
-    def get_active_locations(self, profile_id: str) -> List[Location]:
-        """Get all active locations for a profile."""
-        response = self.client.table(self.table_name).select('*').eq('profile_id', profile_id).eq('is_active', True).execute()
+    def get_active_locations(self, profile_id: str,
+                             bounding_box: Optional[Tuple[float, float, float, float]] = None) -> List[Location]:
+        """Get all active locations for a profile.
+        
+        When a (min_lat, min_lon, max_lat, max_lon) bounding box is given, only
+        locations whose coordinates fall inside it are fetched. Longitudes
+        beyond ±180 mean the box wraps around the antimeridian.
+        """
+        query = self.client.table(self.table_name).select('*').eq('profile_id', profile_id).eq('is_active', True)
+        
+        if bounding_box is not None:
+            min_lat, min_lon, max_lat, max_lon = bounding_box
+            query = query.gte('latitude', min_lat).lte('latitude', max_lat)
+            if min_lon < -180.0:
+                query = query.or_(f'longitude.gte.{min_lon + 360.0},longitude.lte.{max_lon}')
+            elif max_lon > 180.0:
+                query = query.or_(f'longitude.gte.{min_lon},longitude.lte.{max_lon - 360.0}')
+            elif min_lon > -180.0 or max_lon < 180.0:
+                query = query.gte('longitude', min_lon).lte('longitude', max_lon)
+        
+        response = query.execute()
         
         locations = []
         for location_data in response.data:
@@ -100,11 +122,37 @@ class LocationSupabaseRepository:
                 profile_id=location_data['profile_id'],
                 address=location_data['address'],
                 is_active=location_data['is_active'],
+                polygon=location_data.get('polygon'),
                 created_at=datetime.fromisoformat(location_data['created_at'].replace('Z', '+00:00')) if location_data['created_at'] else None
             ))
         
         return locations
     
+    def get_all_active_locations(self, page_size: int = 1000) -> List[Location]:
+        """Get all active locations of every profile, paging through the table."""
+        locations = []
+        start = 0
+        while True:
+            response = self.client.table(self.table_name).select('*').eq('is_active', True).order('id').range(start, start + page_size - 1).execute()
+            
+            for location_data in response.data:
+                locations.append(Location(
+                    location_id=location_data['id'],
+                    name=location_data['name'],
+                    latitude=location_data['latitude'],
+                    longitude=location_data['longitude'],
+                    radius=location_data['radius'],
+                    profile_id=location_data['profile_id'],
+                    address=location_data['address'],
+                    is_active=location_data['is_active'],
+                    polygon=location_data.get('polygon'),
+                    created_at=datetime.fromisoformat(location_data['created_at'].replace('Z', '+00:00')) if location_data['created_at'] else None
+                ))
+            
+            if len(response.data) < page_size:
+                return locations
+            start += page_size
+    
     def update(self, location: Location) -> Location:
         """Update an existing location."""
         location_data = {
@@ -113,7 +161,8 @@ class LocationSupabaseRepository:
             'longitude': location.longitude,
             'radius': location.radius,
             'address': location.address,
-            'is_active': location.is_active
+            'is_active': location.is_active,
+            'polygon': location.polygon
         }
         
         response = self.client.table(self.table_name).update(location_data).eq('id', location.location_id).execute()
@@ -129,6 +178,7 @@ class LocationSupabaseRepository:
                 profile_id=updated_location['profile_id'],
                 address=updated_location['address'],
                 is_active=updated_location['is_active'],
+                polygon=updated_location.get('polygon'),
                 created_at=datetime.fromisoformat(updated_location['created_at'].replace('Z', '+00:00')) if updated_location['created_at'] else None
             )
         
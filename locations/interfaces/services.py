@@ -1,12 +1,45 @@
 """Interface services for Locations context."""
 from flask import Blueprint, request, jsonify
 from locations.application.services import LocationApplicationService
-from devices.interfaces.services import authenticate_device
-from devices.application.services import DeviceApplicationService
+from devices.interfaces.services import device_auth_error, get_device_service
+from locations.application.flap_suppression import FlapSuppressor
+from locations.interfaces.stationary_filter import StationaryDeviceFilter
+from shared.infrastructure.lazy import lazy_singleton
+from shared.infrastructure.timing import stage
+from config import get_config
 
 location_api = Blueprint("location_api", __name__)
-location_service = LocationApplicationService()
-device_service = DeviceApplicationService()
+
+
+@lazy_singleton
+def get_location_service() -> LocationApplicationService:
+    """Get the location application service, built on first use."""
+    return LocationApplicationService()
+
+
+@lazy_singleton
+def get_stationary_filter() -> StationaryDeviceFilter:
+    """Get the stationary device filter, built on first use."""
+    config = get_config()
+    return StationaryDeviceFilter(
+        threshold_meters=config.STATIONARY_THRESHOLD_METERS,
+        window_seconds=config.STATIONARY_WINDOW_SECONDS,
+        max_devices=config.STATIONARY_MAX_DEVICES,
+        enabled=config.STATIONARY_FILTER_ENABLED
+    )
+
+
+@lazy_singleton
+def get_flap_suppressor() -> FlapSuppressor:
+    """Get the GPS flap suppressor, built on first use."""
+    config = get_config()
+    return FlapSuppressor(
+        smoothing_enabled=config.GPS_SMOOTHING_ENABLED,
+        process_noise=config.GPS_PROCESS_NOISE_MPS,
+        default_accuracy=config.GPS_DEFAULT_ACCURACY_METERS,
+        reset_after_seconds=config.GPS_FILTER_RESET_SECONDS,
+        max_devices=config.GPS_MAX_TRACKED_DEVICES
+    )
 
 
 @location_api.route("/api/v1/locations", methods=["POST"])
@@ -50,6 +83,14 @@ def create_location():
             address:
               type: string
               example: "Av. Principal 123"
+            polygon:
+              type: array
+              description: Optional polygon geofence as [latitude, longitude] pairs, not crossing the antimeridian; radius becomes an outer buffer
+              items:
+                type: array
+                items:
+                  type: number
+              example: [[-12.1230, -77.5436], [-12.1230, -77.5428], [-12.1238, -77.5428], [-12.1238, -77.5436]]
     responses:
       201:
         description: Location created successfully
@@ -60,18 +101,19 @@ def create_location():
     """
     try:
         data = request.get_json()
-        location = location_service.create_location(
+        location = get_location_service().create_location(
             location_id=data['location_id'],
             name=data['name'],
             latitude=data['latitude'],
             longitude=data['longitude'],
             radius=data['radius'],
             profile_id=data['profile_id'],
-            address=data.get('address', '')
+            address=data.get('address', ''),
+            polygon=data.get('polygon')
         )
         return jsonify(location.to_dict()), 201
     except ValueError as e:
-        return jsonify({"error": str(e)}), 409
+        return jsonify({"error": str(e)}), 409 if 'already exists' in str(e) else 400
     except KeyError as e:
         return jsonify({"error": f"Missing required field: {e}"}), 400
     except Exception as e:
@@ -96,7 +138,7 @@ def get_location(location_id):
         description: Location not found
     """
     try:
-        location = location_service.get_location(location_id)
+        location = get_location_service().get_location(location_id)
         if not location:
             return jsonify({"error": "Location not found"}), 404
         return jsonify(location.to_dict()), 200
@@ -120,12 +162,124 @@ def get_locations_by_profile(profile_id):
         description: Locations found
     """
     try:
-        locations = location_service.get_locations_by_profile(profile_id)
+        locations = get_location_service().get_locations_by_profile(profile_id)
         return jsonify([location.to_dict() for location in locations]), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@location_api.route("/api/v1/locations/profile/<profile_id>/nearby", methods=["GET"])
+def get_nearby_locations(profile_id):
+    """Get the nearest active locations of a profile to a position.
+    ---
+    tags:
+      - Locations
+    parameters:
+      - in: path
+        name: profile_id
+        required: true
+        type: string
+      - in: query
+        name: latitude
+        required: true
+        type: number
+        example: -12.12345
+      - in: query
+        name: longitude
+        required: true
+        type: number
+        example: -77.54321
+      - in: query
+        name: limit
+        type: integer
+        default: 5
+        description: Number of locations to return (k)
+      - in: query
+        name: max_distance
+        type: number
+        description: Maximum distance in meters to the location center
+    responses:
+      200:
+        description: Nearest locations, closest first
+      400:
+        description: Invalid query parameters
+    """
+    try:
+        try:
+            latitude = float(request.args['latitude'])
+            longitude = float(request.args['longitude'])
+            limit = int(request.args.get('limit', get_config().NEARBY_DEFAULT_LIMIT))
+            max_distance = request.args.get('max_distance')
+            max_distance = float(max_distance) if max_distance is not None else None
+        except KeyError as e:
+            return jsonify({"error": f"Missing required parameter: {e}"}), 400
+        except ValueError:
+            return jsonify({"error": "Invalid numeric parameter"}), 400
+
+        if latitude < -90 or latitude > 90 or longitude < -180 or longitude > 180:
+            return jsonify({"error": "Coordinates out of range"}), 400
+        if limit < 1 or limit > get_config().NEARBY_MAX_LIMIT:
+            return jsonify({"error": f"limit must be between 1 and {get_config().NEARBY_MAX_LIMIT}"}), 400
+        if max_distance is not None and max_distance < 0:
+            return jsonify({"error": "max_distance must be non-negative"}), 400
+
+        locations = get_location_service().get_nearby_locations(
+            profile_id, latitude, longitude, limit, max_distance
+        )
+        return jsonify({
+            "profile_id": profile_id,
+            "position": {"latitude": latitude, "longitude": longitude},
+            "locations": locations
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@location_api.route("/api/v1/locations/reverse-lookup", methods=["GET"])
+def reverse_lookup():
+    """Get the active locations of any profile that contain a position.
+    ---
+    tags:
+      - Locations
+    parameters:
+      - in: query
+        name: latitude
+        required: true
+        type: number
+        example: -12.12345
+      - in: query
+        name: longitude
+        required: true
+        type: number
+        example: -77.54321
+    responses:
+      200:
+        description: IDs of the geofences containing the position
+      400:
+        description: Invalid query parameters
+    """
+    try:
+        try:
+            latitude = float(request.args['latitude'])
+            longitude = float(request.args['longitude'])
+        except KeyError as e:
+            return jsonify({"error": f"Missing required parameter: {e}"}), 400
+        except ValueError:
+            return jsonify({"error": "Invalid numeric parameter"}), 400
+
+        if latitude < -90 or latitude > 90 or longitude < -180 or longitude > 180:
+            return jsonify({"error": "Coordinates out of range"}), 400
+
+        locations = get_location_service().reverse_lookup(latitude, longitude)
+        return jsonify({
+            "position": {"latitude": latitude, "longitude": longitude},
+            "location_ids": [location.location_id for location in locations],
+            "count": len(locations)
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @location_api.route("/api/v1/locations/proximity-check", methods=["POST"])
 def proximity_check():
     """Verificar proximidad a todas las ubicaciones configuradas para el dispositivo.
@@ -164,13 +318,18 @@ def proximity_check():
               type: string
               description: ID del perfil del usuario
               example: "user_123"
+            accuracy:
+              type: number
+              format: float
+              description: Precisión horizontal del GPS en metros (opcional)
+              example: 12.5
     responses:
       200:
         description: Verificación de proximidad exitosa
       400:
         description: Datos inválidos o faltantes
       401:
-        description: Device ID faltante
+        description: Device ID faltante o credenciales inválidas
       404:
         description: Dispositivo no encontrado
       500:
@@ -181,17 +340,45 @@ def proximity_check():
         if not device_id:
             return jsonify({"error": "Missing X-Device-ID header"}), 401
 
-        # Verificar que el dispositivo existe
-        if not authenticate_device(device_id):
-            return jsonify({"error": "Device not found"}), 404
+        # Verificar el token o la API key del dispositivo (o que exista)
+        auth_error = device_auth_error(device_id)
+        if auth_error:
+            return jsonify({"error": auth_error[0]}), auth_error[1]
 
         data = request.get_json()
         latitude = data["latitude"]
         longitude = data["longitude"]
         profile_id = data["profile_id"]
+        accuracy = data.get("accuracy")
 
-        # Realizar verificación de proximidad
-        results = location_service.check_proximity(latitude, longitude, profile_id)
+        if accuracy is not None and (isinstance(accuracy, bool)
+                                     or not isinstance(accuracy, (int, float))
+                                     or accuracy <= 0):
+            return jsonify({"error": "accuracy must be a positive number"}), 400
+
+        location_service = get_location_service()
+        stationary_filter = get_stationary_filter()
+        flap_suppressor = get_flap_suppressor()
+
+        with stage('proximity'):
+            # Dispositivos estacionarios reutilizan la última respuesta
+            version = location_service.geofence_versions.get(profile_id)
+            results = stationary_filter.lookup(device_id, profile_id, version, latitude, longitude)
+
+            if results is None:
+                # Suavizar la posición y aplicar histéresis contra el parpadeo ENTER/EXIT
+                smoothed_lat, smoothed_lon = flap_suppressor.smooth(device_id, latitude, longitude, accuracy)
+                previous_membership = flap_suppressor.membership(device_id, profile_id)
+
+                # Realizar verificación de proximidad
+                results = location_service.check_proximity(
+                    smoothed_lat, smoothed_lon, profile_id, previous_membership
+                )
+                flap_suppressor.remember(device_id, profile_id, results)
+                stationary_filter.accept(device_id, profile_id, version, latitude, longitude, results)
+
+        # Última posición conocida del dispositivo (sólo en memoria hasta el próximo volcado)
+        get_device_service().record_seen(device_id, latitude, longitude)
 
         return jsonify({
             "device_id": device_id,
@@ -205,6 +392,39 @@ def proximity_check():
         return jsonify({"error": str(e)}), 500
 
 
+@location_api.route("/api/v1/locations/proximity-check/stats", methods=["GET"])
+def proximity_check_stats():
+    """Contadores de trabajo ahorrado en las verificaciones de proximidad.
+    ---
+    tags:
+      - Locations
+    responses:
+      200:
+        description: Contadores del filtro de dispositivos estacionarios y de la caché de resultados
+        schema:
+          type: object
+          properties:
+            stationary_filter:
+              type: object
+            proximity_cache:
+              type: object
+            compiled_geofences:
+              type: object
+            global_index:
+              type: object
+            shared_geofences:
+              type: object
+    """
+    location_service = get_location_service()
+    return jsonify({
+        "stationary_filter": get_stationary_filter().stats(),
+        "proximity_cache": location_service.proximity_cache.stats(),
+        "compiled_geofences": location_service.compiled_geofences.stats(),
+        "global_index": location_service.global_index.stats(),
+        "shared_geofences": location_service.shared_geofences.stats() if location_service.shared_geofences else None
+    }), 200
+
+
 @location_api.route("/api/v1/locations/<location_id>", methods=["PUT"])
 def update_location(location_id):
     """Update location information.
@@ -233,26 +453,36 @@ def update_location(location_id):
               type: string
             is_active:
               type: boolean
+            polygon:
+              type: array
+              description: Polygon geofence as [latitude, longitude] pairs, not crossing the antimeridian; an empty list clears it
+              items:
+                type: array
+                items:
+                  type: number
     responses:
       200:
         description: Location updated successfully
+      400:
+        description: Invalid polygon
       404:
         description: Location not found
     """
     try:
         data = request.get_json()
-        location = location_service.update_location(
+        location = get_location_service().update_location(
             location_id=location_id,
             name=data.get('name'),
             latitude=data.get('latitude'),
             longitude=data.get('longitude'),
             radius=data.get('radius'),
             address=data.get('address'),
-            is_active=data.get('is_active')
+            is_active=data.get('is_active'),
+            polygon=data.get('polygon')
         )
         return jsonify(location.to_dict()), 200
     except ValueError as e:
-        return jsonify({"error": str(e)}), 404
+        return jsonify({"error": str(e)}), 404 if 'not found' in str(e) else 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -275,7 +505,7 @@ def delete_location(location_id):
         description: Location not found
     """
     try:
-        if location_service.delete_location(location_id):
+        if get_location_service().delete_location(location_id):
             return jsonify({"message": "Location deleted successfully"}), 200
         else:
             return jsonify({"error": "Location not found"}), 404
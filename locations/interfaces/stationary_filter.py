@@ -0,0 +1,99 @@
+"""Stationary-device suppression of proximity checks."""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+from locations.domain.geometry import EARTH_RADIUS_METERS
+
+
+class _AcceptedFix:
+    """Last position that went through the full proximity pipeline."""
+
+    __slots__ = ('latitude', 'longitude', 'version', 'accepted_at', 'results')
+
+    def __init__(self, latitude: float, longitude: float, version: int,
+                 accepted_at: float, results: List[dict]):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.version = version
+        self.accepted_at = accepted_at
+        self.results = results
+
+
+class StationaryDeviceFilter:
+    """Short-circuits fixes from devices that have not moved.
+
+    A fix is suppressed, and the previous answer returned, when it lies within
+    `threshold_meters` of the last accepted fix of the same device and profile,
+    the last accepted fix is younger than `window_seconds` and the profile's
+    geofences have not changed since. Suppressed fixes never refresh the
+    accepted fix, so a stationary device still gets a full check once per window.
+    """
+
+    def __init__(self, threshold_meters: float = 5.0, window_seconds: float = 60.0,
+                 max_devices: int = 100000, enabled: bool = True):
+        self.threshold_meters = threshold_meters
+        self.window_seconds = window_seconds
+        self.max_devices = max_devices
+        self.enabled = enabled
+        self._fixes: "OrderedDict[tuple, _AcceptedFix]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.suppressed = 0
+
+    @staticmethod
+    def displacement(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+        """Approximate distance in meters between two nearby points."""
+        x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2.0))
+        y = math.radians(lat2 - lat1)
+        return EARTH_RADIUS_METERS * math.hypot(x, y)
+
+    def lookup(self, device_id: str, profile_id: str, version: int,
+               latitude: float, longitude: float) -> Optional[List[dict]]:
+        """Get the previous answer if the device is stationary, else None."""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            fix = self._fixes.get((device_id, profile_id))
+            if (fix is None
+                    or fix.version != version
+                    or time.monotonic() - fix.accepted_at > self.window_seconds
+                    or self.displacement(fix.latitude, fix.longitude,
+                                         latitude, longitude) > self.threshold_meters):
+                return None
+            self.suppressed += 1
+            results = fix.results
+
+        return [dict(result) for result in results]
+
+    def accept(self, device_id: str, profile_id: str, version: int,
+               latitude: float, longitude: float, results: List[dict]):
+        """Record a fix that went through the full proximity pipeline."""
+        if not self.enabled:
+            return
+
+        key = (device_id, profile_id)
+        fix = _AcceptedFix(latitude, longitude, version, time.monotonic(),
+                           [dict(result) for result in results])
+        with self._lock:
+            self._fixes[key] = fix
+            self._fixes.move_to_end(key)
+            while len(self._fixes) > self.max_devices:
+                self._fixes.popitem(last=False)
+            self.accepted += 1
+
+    def stats(self) -> dict:
+        """Get suppression counters."""
+        total = self.accepted + self.suppressed
+        return {
+            'enabled': self.enabled,
+            'tracked_devices': len(self._fixes),
+            'accepted_fixes': self.accepted,
+            'suppressed_fixes': self.suppressed,
+            'suppression_ratio': self.suppressed / total if total else 0.0,
+            'threshold_meters': self.threshold_meters,
+            'window_seconds': self.window_seconds
+        }
@@ -1,15 +1,23 @@
 """Application services for Proximity Events context."""
-from typing import List, Optional
+import logging
+from typing import Callable, List, Optional
 import uuid
 from proximity_events.domain.entities import ProximityEvent
 from proximity_events.infrastructure.supabase_repository import ProximityEventSupabaseRepository
 
+logger = logging.getLogger(__name__)
+
 
 class ProximityEventApplicationService:
     """Application service for proximity events."""
 
     def __init__(self):
         self.repository = ProximityEventSupabaseRepository()
+        self.listeners: List[Callable[[ProximityEvent], object]] = []
+
+    def add_listener(self, listener: Callable[[ProximityEvent], object]):
+        """Call listener with every event once it is saved. Listeners must not block."""
+        self.listeners.append(listener)
 
     def create_proximity_event(self, device_id: str, home_location_id: str,
                                home_location_name: str, event_type: str, 
@@ -30,7 +38,13 @@ class ProximityEventApplicationService:
             user_id=user_id
         )
         
-        return self.repository.create(event)
+        created_event = self.repository.create(event)
+        for listener in self.listeners:
+            try:
+                listener(created_event)
+            except Exception as e:
+                logger.error("❌ Proximity event listener failed: %s", e)
+        return created_event
     
     def get_event_by_id(self, event_id: str) -> Optional[ProximityEvent]:
         """Get a specific proximity event by ID."""
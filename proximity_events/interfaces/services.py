@@ -1,10 +1,23 @@
 """Interface services for Proximity Events context."""
 from flask import Blueprint, request, jsonify
 from proximity_events.application.services import ProximityEventApplicationService
-from devices.interfaces.services import authenticate_device
+from shared.infrastructure.lazy import lazy_singleton
+from devices.interfaces.services import device_auth_error, get_device_service
+from automations.interfaces.services import get_automation_service
 
 proximity_event_api = Blueprint("proximity_event_api", __name__)
-event_service = ProximityEventApplicationService()
+
+
+@lazy_singleton
+def get_event_service() -> ProximityEventApplicationService:
+    """Get the proximity event application service, built on first use.
+
+    Saved events are handed to the automation engine, which runs the
+    matching rules in the background.
+    """
+    event_service = ProximityEventApplicationService()
+    event_service.add_listener(get_automation_service().handle_proximity_event)
+    return event_service
 
 
 @proximity_event_api.route("/api/v1/proximity-events", methods=["POST"])
@@ -65,7 +78,9 @@ def create_proximity_event():
       400:
         description: Invalid request data
       401:
-        description: Device ID faltante
+        description: Device ID faltante o credenciales inválidas
+      403:
+        description: device_id del cuerpo distinto de X-Device-ID
       404:
         description: Device not found
     """
@@ -74,12 +89,16 @@ def create_proximity_event():
         if not device_id:
             return jsonify({"error": "Missing X-Device-ID header"}), 401
 
-        # Verificar que el dispositivo existe
-        if not authenticate_device(device_id):
-            return jsonify({"error": "Device not found"}), 404
+        # Verificar el token o la API key del dispositivo (o que exista)
+        auth_error = device_auth_error(device_id)
+        if auth_error:
+            return jsonify({"error": auth_error[0]}), auth_error[1]
 
         data = request.get_json()
-        event = event_service.create_proximity_event(
+        if data['device_id'] != device_id:
+            return jsonify({"error": "device_id does not match X-Device-ID"}), 403
+
+        event = get_event_service().create_proximity_event(
             device_id=data['device_id'],
             home_location_id=data['home_location_id'],
             home_location_name=data['home_location_name'],
@@ -89,6 +108,7 @@ def create_proximity_event():
             longitude=data['longitude'],
             user_id=data.get('user_id')
         )
+        get_device_service().record_seen(device_id, event.latitude, event.longitude)
         return jsonify(event.to_dict()), 201
     except KeyError as e:
         return jsonify({"error": f"Missing required field: {e}"}), 400
@@ -114,7 +134,7 @@ def get_proximity_event(event_id):
         description: Proximity event not found
     """
     try:
-        event = event_service.get_event_by_id(event_id)
+        event = get_event_service().get_event_by_id(event_id)
         if not event:
             return jsonify({"error": "Proximity event not found"}), 404
         return jsonify(event.to_dict()), 200
@@ -143,7 +163,7 @@ def get_events_by_device(device_id):
     """
     try:
         limit = int(request.args.get('limit', 100))
-        events = event_service.get_events_by_device(device_id, limit)
+        events = get_event_service().get_events_by_device(device_id, limit)
         return jsonify([event.to_dict() for event in events]), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -170,7 +190,7 @@ def get_events_by_user(user_id):
     """
     try:
         limit = int(request.args.get('limit', 100))
-        events = event_service.get_events_by_user(user_id, limit)
+        events = get_event_service().get_events_by_user(user_id, limit)
         return jsonify([event.to_dict() for event in events]), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -197,7 +217,7 @@ def get_events_by_location(location_id):
     """
     try:
         limit = int(request.args.get('limit', 100))
-        events = event_service.get_events_by_location(location_id, limit)
+        events = get_event_service().get_events_by_location(location_id, limit)
         return jsonify([event.to_dict() for event in events]), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -221,7 +241,7 @@ def delete_proximity_event(event_id):
         description: Proximity event not found
     """
     try:
-        if event_service.delete_event(event_id):
+        if get_event_service().delete_event(event_id):
             return jsonify({"message": "Proximity event deleted successfully"}), 200
         else:
             return jsonify({"error": "Proximity event not found"}), 404
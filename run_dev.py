@@ -7,7 +7,7 @@ import os
 # Añadir el directorio actual al path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from app import app
+from app import create_app
 
 if __name__ == "__main__":
     print("🚀 Iniciando GeoEntry Edge API con Swagger UI...")
@@ -16,4 +16,4 @@ if __name__ == "__main__":
     print("💚 Health check en: http://localhost:5000/")
     print("---")
     
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    create_app().run(host="0.0.0.0", port=5000, debug=True)
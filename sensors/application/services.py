@@ -1,8 +1,16 @@
 """Application services for Sensors context."""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
 from typing import List, Optional
-from sensors.domain.entities import Sensor
+from sensors.domain.entities import Sensor, SensorType
 from sensors.domain.services import SensorService
 from sensors.infrastructure.supabase_repository import SensorSupabaseRepository
+from sensors.infrastructure.sensor_cache import SensorStateCache
+from sensors.infrastructure.state_history_repository import SensorHistorySupabaseRepository
+from sensors.infrastructure.history_recorder import SensorHistoryRecorder
+from shared.infrastructure.timing import stage
+from config import get_config
 
 
 class SensorApplicationService:
@@ -11,71 +19,210 @@ class SensorApplicationService:
     def __init__(self):
         self.repository = SensorSupabaseRepository()
         self.sensor_service = SensorService()
+        config = get_config()
+        self.bulk_max_ids = config.SENSOR_BULK_MAX_IDS
+        self.sensor_cache = SensorStateCache(
+            ttl_seconds=config.SENSOR_CACHE_TTL_SECONDS,
+            max_users=config.SENSOR_CACHE_MAX_USERS,
+            enabled=config.SENSOR_CACHE_ENABLED
+        )
+        self.history = SensorHistoryRecorder(
+            SensorHistorySupabaseRepository(claim_seconds=config.SENSOR_HISTORY_CLAIM_SECONDS),
+            flush_seconds=config.SENSOR_HISTORY_FLUSH_SECONDS,
+            batch_size=config.SENSOR_HISTORY_BATCH_SIZE,
+            queue_size=config.SENSOR_HISTORY_QUEUE_SIZE
+        ) if config.SENSOR_HISTORY_ENABLED else None
+        self.history_max_days = config.SENSOR_HISTORY_MAX_DAYS
+        # One count query per sensor type plus the active count
+        self.statistics_executor = ThreadPoolExecutor(
+            max_workers=len(SensorType) + 1, thread_name_prefix='sensor-stats'
+        )
 
     def get_sensor(self, sensor_id: str) -> Optional[Sensor]:
-        """Get sensor by ID."""
-        return self.repository.get_by_id(sensor_id)
+        """Get sensor by ID, from the cache when its user's sensors are loaded."""
+        return self.sensor_cache.get_sensor(sensor_id) or self.repository.get_by_id(sensor_id)
     
-    def get_sensors_by_user(self, user_id: str) -> List[Sensor]:
-        """Get all sensors for a user."""
+    def _get_user_sensors(self, user_id: str) -> List[Sensor]:
+        """Get every sensor of a user through the state cache."""
+        return self.sensor_cache.get_user_sensors(
+            user_id, lambda: self.repository.get_by_user_id(user_id)
+        )
+    
+    def get_sensors_by_user(self, user_id: str, active_only: bool = False,
+                            sensor_type: Optional[str] = None) -> List[Sensor]:
+        """Get a user's sensors, optionally only active ones and of one type."""
         if not user_id or not user_id.strip():
             raise ValueError("User ID is required")
         
-        return self.repository.get_by_user_id(user_id)
+        if sensor_type is not None and not self.sensor_service.validate_sensor_type(sensor_type):
+            raise ValueError(f"Invalid sensor type: {sensor_type}")
+        
+        is_active = True if active_only else None
+        if not self.sensor_cache.enabled:
+            return self.repository.get_by_user_id(user_id, is_active, sensor_type)
+        
+        return self.sensor_service.filter_sensors(self._get_user_sensors(user_id), is_active, sensor_type)
     
     def get_active_sensors_by_user(self, user_id: str) -> List[Sensor]:
         """Get all active sensors for a user."""
-        if not user_id or not user_id.strip():
-            raise ValueError("User ID is required")
-        
-        return self.repository.get_active_sensors_by_user(user_id)
+        return self.get_sensors_by_user(user_id, active_only=True)
     
     def get_sensors_by_type(self, user_id: str, sensor_type: str) -> List[Sensor]:
         """Get sensors by type for a user."""
-        if not user_id or not user_id.strip():
+        return self.get_sensors_by_user(user_id, sensor_type=sensor_type)
+    
+    def update_sensor_status(self, sensor_id: str, is_active: bool,
+                             expected_updated_at: Optional[str] = None) -> Sensor:
+        """Update sensor status (activate/deactivate) in a single conditional query.
+        
+        With expected_updated_at, the update only applies if the sensor has not
+        been modified since; otherwise a "modified since" error is raised.
+        """
+        if not sensor_id or not sensor_id.strip():
+            raise ValueError("Sensor ID is required")
+        
+        if expected_updated_at is not None:
+            try:
+                expected_updated_at = datetime.fromisoformat(
+                    expected_updated_at.replace('Z', '+00:00')
+                ).isoformat()
+            except (AttributeError, ValueError):
+                raise ValueError("updated_at must be an ISO 8601 timestamp")
+        
+        updated_sensor = self.repository.update_status(sensor_id, is_active, expected_updated_at)
+        if updated_sensor:
+            self._after_write([updated_sensor])
+            return updated_sensor
+        
+        # Nothing matched: tell a lost race apart from a missing sensor
+        if expected_updated_at is not None and self.repository.exists(sensor_id):
+            raise ValueError(f"Sensor with ID {sensor_id} was modified since {expected_updated_at}")
+        raise ValueError(f"Sensor with ID {sensor_id} not found")
+    
+    def update_sensors_status(self, is_active: bool, sensor_ids: Optional[List[str]] = None,
+                              user_id: Optional[str] = None,
+                              sensor_type: Optional[str] = None) -> List[Sensor]:
+        """Update the status of a set of sensors, or all of a user's or of a type, at once."""
+        if sensor_ids is None and user_id is None:
+            raise ValueError("sensor_ids or user_id is required")
+        
+        if user_id is not None and (not isinstance(user_id, str) or not user_id.strip()):
             raise ValueError("User ID is required")
         
-        if not self.sensor_service.validate_sensor_type(sensor_type):
+        if sensor_ids is not None:
+            if not sensor_ids:
+                raise ValueError("sensor_ids must not be empty")
+            if len(sensor_ids) > self.bulk_max_ids:
+                raise ValueError(f"At most {self.bulk_max_ids} sensor_ids can be updated at once")
+            if any(not isinstance(sensor_id, str) or not sensor_id.strip() for sensor_id in sensor_ids):
+                raise ValueError("sensor_ids must be non-empty strings")
+        
+        if sensor_type is not None and not self.sensor_service.validate_sensor_type(sensor_type):
             raise ValueError(f"Invalid sensor type: {sensor_type}")
         
-        return self.repository.get_sensors_by_type(user_id, sensor_type)
+        updated_sensors = self.repository.update_status_where(is_active, sensor_ids, user_id, sensor_type)
+        self._after_write(updated_sensors)
+        return updated_sensors
     
-    def update_sensor_status(self, sensor_id: str, is_active: bool) -> Sensor:
-        """Update sensor status (activate/deactivate)."""
-        if not sensor_id or not sensor_id.strip():
-            raise ValueError("Sensor ID is required")
+    def _after_write(self, updated_sensors: List[Sensor]):
+        """Apply written sensors to the state cache and queue them for the history log."""
+        self.sensor_cache.write_through(updated_sensors)
+        if self.history is not None:
+            self.history.record(updated_sensors)
+    
+    def get_sensor_history(self, sensor_id: str, start_date: str, end_date: str) -> dict:
+        """Get per-day on-time and toggle counts of a sensor between two UTC dates, inclusive.
+        
+        Closed runs come from the daily rollups; the sensor's current run is
+        added up to now.
+        """
+        if self.history is None:
+            raise ValueError("Sensor history is disabled")
         
-        # Verify sensor exists
-        existing_sensor = self.repository.get_by_id(sensor_id)
-        if not existing_sensor:
+        try:
+            start_day = date.fromisoformat(start_date)
+            end_day = date.fromisoformat(end_date)
+        except (TypeError, ValueError):
+            raise ValueError("from and to must be dates in YYYY-MM-DD format")
+        if end_day < start_day:
+            raise ValueError("to must not be before from")
+        if (end_day - start_day).days >= self.history_max_days:
+            raise ValueError(f"At most {self.history_max_days} days of history can be requested")
+        
+        if not self.get_sensor(sensor_id):
             raise ValueError(f"Sensor with ID {sensor_id} not found")
         
-        # Update status
-        updated_sensor = self.repository.update_status(sensor_id, is_active)
-        if not updated_sensor:
-            raise Exception("Failed to update sensor status")
+        daily = self.history.repository.get_daily(sensor_id, start_day.isoformat(), end_day.isoformat())
+        days = {}
+        for offset in range((end_day - start_day).days + 1):
+            day = (start_day + timedelta(days=offset)).isoformat()
+            on_seconds, toggles = daily.get(day, (0.0, 0))
+            days[day] = {'date': day, 'on_seconds': on_seconds, 'toggles': toggles}
+        
+        current = self.history.repository.get_current(sensor_id)
+        if current is not None and current[0]:
+            range_start = datetime(start_day.year, start_day.month, start_day.day, tzinfo=timezone.utc).timestamp()
+            range_end = range_start + len(days) * 86400
+            open_start = max(current[1], range_start)
+            open_end = min(time.time(), range_end)
+            for day, seconds in self.sensor_service.split_by_day(open_start, open_end):
+                days[day]['on_seconds'] += seconds
         
-        return updated_sensor
+        for entry in days.values():
+            entry['on_seconds'] = round(entry['on_seconds'], 1)
+        return {
+            'sensor_id': sensor_id,
+            'from': start_day.isoformat(),
+            'to': end_day.isoformat(),
+            'is_active': current[0] if current is not None else None,
+            'on_seconds': round(sum(entry['on_seconds'] for entry in days.values()), 1),
+            'toggles': sum(entry['toggles'] for entry in days.values()),
+            'days': list(days.values())
+        }
     
     def get_sensor_statistics(self, user_id: str) -> dict:
-        """Get sensor statistics for a user."""
+        """Get sensor statistics for a user.
+        
+        Computed from the cached sensors when the user's are loaded, otherwise
+        from count-only queries run in parallel.
+        """
         if not user_id or not user_id.strip():
             raise ValueError("User ID is required")
         
-        sensors = self.repository.get_by_user_id(user_id)
-        
-        total_sensors = len(sensors)
-        active_sensors = self.sensor_service.count_active_sensors(sensors)
-        inactive_sensors = total_sensors - active_sensors
+        cached_sensors = self.sensor_cache.get_cached(user_id)
+        if cached_sensors is not None:
+            sensors_by_type = {
+                sensor_type: len(sensors)
+                for sensor_type, sensors in self.sensor_service.group_sensors_by_type(cached_sensors).items()
+            }
+            active_sensors = self.sensor_service.count_active_sensors(cached_sensors)
+            return {
+                'total_sensors': len(cached_sensors),
+                'active_sensors': active_sensors,
+                'inactive_sensors': len(cached_sensors) - active_sensors,
+                'sensors_by_type': sensors_by_type
+            }
         
-        grouped_by_type = self.sensor_service.group_sensors_by_type(sensors)
+        sensor_types = [sensor_type.value for sensor_type in SensorType]
+        with stage('db'):
+            type_counts = self.statistics_executor.map(
+                lambda sensor_type: self.repository.count_by_user(user_id, [sensor_type]),
+                sensor_types
+            )
+            active_count = self.statistics_executor.submit(
+                self.repository.count_by_user, user_id, sensor_types, True
+            )
+            sensors_by_type = {
+                sensor_type: count
+                for sensor_type, count in zip(sensor_types, type_counts)
+                if count
+            }
+            active_sensors = active_count.result()
         
+        total_sensors = sum(sensors_by_type.values())
         return {
             'total_sensors': total_sensors,
             'active_sensors': active_sensors,
-            'inactive_sensors': inactive_sensors,
-            'sensors_by_type': {
-                sensor_type: len(type_sensors) 
-                for sensor_type, type_sensors in grouped_by_type.items()
-            }
+            'inactive_sensors': total_sensors - active_sensors,
+            'sensors_by_type': sensors_by_type
         }
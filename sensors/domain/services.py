@@ -1,5 +1,6 @@
 """Domain services for Sensors context."""
-from typing import List
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
 from sensors.domain.entities import Sensor, SensorType
 
 
@@ -55,3 +56,60 @@ class SensorService:
     def get_sensors_by_status(self, sensors: List[Sensor], is_active: bool) -> List[Sensor]:
         """Filter sensors by status."""
         return [sensor for sensor in sensors if sensor.is_active == is_active]
+    
+    def filter_sensors(self, sensors: List[Sensor], is_active: Optional[bool] = None,
+                       sensor_type: Optional[str] = None) -> List[Sensor]:
+        """Filter sensors by any combination of status and type."""
+        if sensor_type is not None:
+            sensor_type = SensorType(sensor_type)
+        return [
+            sensor for sensor in sensors
+            if (is_active is None or sensor.is_active == is_active)
+            and (sensor_type is None or sensor.sensor_type == sensor_type)
+        ]
+    
+    @staticmethod
+    def split_by_day(start: float, end: float) -> List[Tuple[str, float]]:
+        """Split the interval [start, end) in epoch seconds into (UTC date, seconds) pieces."""
+        pieces = []
+        while start < end:
+            day = datetime.fromtimestamp(start, timezone.utc).date()
+            next_day = datetime(day.year, day.month, day.day, tzinfo=timezone.utc) + timedelta(days=1)
+            piece_end = min(end, next_day.timestamp())
+            pieces.append((day.isoformat(), piece_end - start))
+            start = piece_end
+        return pieces
+    
+    @staticmethod
+    def apply_state_changes(current: Dict[str, Tuple[bool, float]],
+                            changes: List[Tuple[str, str, bool, float]]
+                            ) -> Tuple[Dict[Tuple[str, str], List[float]], int, int]:
+        """Apply (sensor_id, user_id, is_active, at) observations to the open runs in current.
+        
+        current maps sensor IDs to the (is_active, since) of their open run and
+        is updated in place; observations are applied in time order. A change
+        of state closes the open run, adding its on-time and the toggle that
+        ended it to the daily rollups. Returns ({(sensor_id, day): [on_seconds,
+        toggles]} to add to the rollups, runs closed, observations ignored
+        because they are older than the open run).
+        """
+        rollups: Dict[Tuple[str, str], List[float]] = {}
+        closed = 0
+        stale = 0
+        for sensor_id, _, is_active, at in sorted(changes, key=lambda change: change[3]):
+            state = current.get(sensor_id)
+            if state is not None:
+                was_active, since = state
+                if at < since:
+                    stale += 1
+                    continue
+                if was_active == is_active:
+                    continue
+                if was_active:
+                    for day, seconds in SensorService.split_by_day(since, at):
+                        rollups.setdefault((sensor_id, day), [0.0, 0])[0] += seconds
+                toggle_day = datetime.fromtimestamp(at, timezone.utc).date().isoformat()
+                rollups.setdefault((sensor_id, toggle_day), [0.0, 0])[1] += 1
+                closed += 1
+            current[sensor_id] = (is_active, at)
+        return rollups, closed, stale
@@ -0,0 +1,118 @@
+"""Batched writer of sensor state observations."""
+
+import logging
+import queue
+import threading
+import time
+from datetime import timezone
+from typing import List, Optional
+from sensors.domain.entities import Sensor
+from sensors.infrastructure.state_history_repository import SensorHistorySupabaseRepository
+
+logger = logging.getLogger(__name__)
+
+
+class SensorHistoryRecorder:
+    """Queues sensor states from status writes and appends them to the repository in batches.
+
+    record() never blocks the request: observations go to a bounded queue
+    and are dropped when it is full. A background thread drains it every
+    flush_seconds, or as soon as batch_size observations are waiting.
+    Observations of sensors another worker is appending go back to the
+    queue for the next batch.
+    """
+
+    def __init__(self, repository: SensorHistorySupabaseRepository, flush_seconds: float = 1.0,
+                 batch_size: int = 1000, queue_size: int = 100000):
+        self.repository = repository
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.recorded = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.runs_closed = 0
+        self.stale = 0
+        self.deferred = 0
+        self.errors = 0
+
+    def record(self, sensors: List[Sensor]):
+        """Queue the state of sensors just returned by a status write."""
+        if self._thread is None:
+            self._start()
+        for sensor in sensors:
+            updated_at = sensor.updated_at
+            if updated_at is not None and updated_at.tzinfo is None:
+                # The repository writes naive UTC timestamps
+                updated_at = updated_at.replace(tzinfo=timezone.utc)
+            at = updated_at.timestamp() if updated_at else time.time()
+            if self._enqueue((sensor.id, sensor.user_id, sensor.is_active, at)):
+                self.recorded += 1
+
+    def _enqueue(self, observation: tuple) -> bool:
+        try:
+            self._queue.put_nowait(observation)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='sensor-history', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def flush(self):
+        """Write every queued observation now, in the calling thread."""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch: List[tuple]):
+        try:
+            closed, stale, deferred = self.repository.append(batch)
+        except Exception as e:
+            self.errors += 1
+            logger.error("❌ Sensor history write of %d observations failed: %s", len(batch), e)
+            return
+        self.flushed += len(batch) - len(deferred)
+        self.runs_closed += closed
+        self.stale += stale
+        self.deferred += len(deferred)
+        for observation in deferred:
+            self._enqueue(observation)
+
+    def stats(self) -> dict:
+        """Get recorder counters."""
+        return {
+            'queued': self._queue.qsize(),
+            'recorded': self.recorded,
+            'dropped': self.dropped,
+            'flushed': self.flushed,
+            'runs_closed': self.runs_closed,
+            'stale': self.stale,
+            'deferred': self.deferred,
+            'errors': self.errors
+        }
@@ -0,0 +1,147 @@
+"""Per-user cache of sensor state."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+from sensors.domain.entities import Sensor
+
+
+class SensorStateCache:
+    """LRU cache of every sensor of a user, kept current by write-through.
+
+    Status updates made by this worker are applied to the cached sensors as
+    soon as the database returns them, so repeated list reads are served
+    from memory. The TTL bounds how long writes made elsewhere (other
+    workers, the mobile app writing to Supabase directly) go unnoticed.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, max_users: int = 10000, enabled: bool = True):
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        self.enabled = enabled
+        # user_id -> (loaded_at, {sensor_id: Sensor})
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._owners: Dict[str, str] = {}
+        # user_id -> [loads in flight, written during them]
+        self._loads: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.writes = 0
+
+    def _fresh_sensors(self, user_id: str) -> Optional[Dict[str, Sensor]]:
+        """Get the cached sensors of a user unless stale. Caller holds the lock."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > self.ttl_seconds:
+            self._evict(user_id)
+            return None
+        self._entries.move_to_end(user_id)
+        return entry[1]
+
+    def _evict(self, user_id: str):
+        """Drop a user's entry. Caller holds the lock."""
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            for sensor_id in entry[1]:
+                self._owners.pop(sensor_id, None)
+
+    def _end_load(self, user_id: str, load: list):
+        """Stop tracking writes for a finished load. Caller holds the lock."""
+        load[0] -= 1
+        if load[0] == 0:
+            del self._loads[user_id]
+
+    def get_user_sensors(self, user_id: str, loader: Callable[[], List[Sensor]]) -> List[Sensor]:
+        """Get every sensor of a user, loading them with loader() when not cached."""
+        if not self.enabled:
+            return loader()
+
+        with self._lock:
+            sensors = self._fresh_sensors(user_id)
+            if sensors is not None:
+                self.hits += 1
+                return list(sensors.values())
+            load = self._loads.setdefault(user_id, [0, False])
+            load[0] += 1
+
+        try:
+            loaded = loader()
+        except Exception:
+            with self._lock:
+                self._end_load(user_id, load)
+            raise
+
+        with self._lock:
+            self._end_load(user_id, load)
+            self.loads += 1
+            # A write that raced with the load may be missing from it
+            if not load[1]:
+                self._evict(user_id)
+                self._entries[user_id] = (time.monotonic(), {sensor.id: sensor for sensor in loaded})
+                for sensor in loaded:
+                    self._owners[sensor.id] = user_id
+                while len(self._entries) > self.max_users:
+                    self._evict(next(iter(self._entries)))
+        return loaded
+
+    def get_cached(self, user_id: str) -> Optional[List[Sensor]]:
+        """Get every sensor of a user if they are cached, without loading them."""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            sensors = self._fresh_sensors(user_id)
+            if sensors is None:
+                return None
+            self.hits += 1
+            return list(sensors.values())
+
+    def get_sensor(self, sensor_id: str) -> Optional[Sensor]:
+        """Get a sensor if its user's sensors are cached."""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            user_id = self._owners.get(sensor_id)
+            if user_id is None:
+                return None
+            sensors = self._fresh_sensors(user_id)
+            if sensors is None:
+                return None
+            self.hits += 1
+            return sensors.get(sensor_id)
+
+    def write_through(self, sensors: List[Sensor]):
+        """Apply sensors returned by a database write to the cached users."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            for sensor in sensors:
+                self.writes += 1
+                load = self._loads.get(sensor.user_id)
+                if load is not None:
+                    load[1] = True
+                entry = self._entries.get(sensor.user_id)
+                if entry is not None:
+                    entry[1][sensor.id] = sensor
+                    self._owners[sensor.id] = sensor.user_id
+
+    def invalidate(self, user_id: str):
+        """Drop the cached sensors of a user."""
+        with self._lock:
+            self._evict(user_id)
+
+    def stats(self) -> dict:
+        """Get cache counters."""
+        return {
+            'enabled': self.enabled,
+            'users': len(self._entries),
+            'sensors': len(self._owners),
+            'hits': self.hits,
+            'loads': self.loads,
+            'writes': self.writes
+        }
@@ -0,0 +1,119 @@
+"""Run-length sensor state history with daily rollups in Supabase."""
+
+import time
+from typing import Dict, List, Optional, Tuple
+from sensors.domain.services import SensorService
+from shared.supabase.client import get_supabase_client
+from shared.supabase.timestamps import to_epoch, to_timestamp
+
+
+class SensorHistorySupabaseRepository:
+    """Sensor state history in Supabase, shared by every worker of every instance.
+
+    sensor_state_current holds the open run of each sensor, the span during
+    which it kept one state, so writes that do not change the state add
+    nothing. Closing a run adds its on-time and the toggle that ended it to
+    sensor_state_daily, which answers history queries without keeping the
+    runs themselves.
+
+    Before applying observations a worker claims the sensors' current rows
+    with a conditional update, as scheduled actions are claimed, so only one
+    worker at a time adds to a sensor's rollups; a claim left by a crashed
+    worker expires after claim_seconds.
+    """
+
+    def __init__(self, claim_seconds: float = 30.0):
+        self.client = get_supabase_client()
+        self.current_table = 'sensor_state_current'
+        self.daily_table = 'sensor_state_daily'
+        self.claim_seconds = claim_seconds
+        self.sensor_service = SensorService()
+
+    def append(self, changes: List[Tuple[str, str, bool, float]]) -> Tuple[int, int, List[tuple]]:
+        """Apply (sensor_id, user_id, is_active, at) observations.
+
+        Returns (runs closed, observations ignored because they are older
+        than the current run, observations of sensors claimed by another
+        worker, to be retried).
+        """
+        now = time.time()
+        claim_until = to_timestamp(now + self.claim_seconds)
+        sensor_ids = list({change[0] for change in changes})
+
+        response = (self.client.table(self.current_table).update({'claimed_until': claim_until})
+                    .in_('sensor_id', sensor_ids)
+                    .or_(f'claimed_until.is.null,claimed_until.lt.{to_timestamp(now)}')
+                    .execute())
+        current = {row['sensor_id']: (row['is_active'], to_epoch(row['since'])) for row in response.data}
+
+        # A sensor's first observation opens its first run
+        first: Dict[str, tuple] = {}
+        for change in sorted(changes, key=lambda change: change[3]):
+            if change[0] not in current:
+                first.setdefault(change[0], change)
+        if first:
+            response = self.client.table(self.current_table).upsert([{
+                'sensor_id': sensor_id,
+                'user_id': user_id,
+                'is_active': is_active,
+                'since': to_timestamp(at),
+                'claimed_until': claim_until
+            } for sensor_id, user_id, is_active, at in first.values()],
+                on_conflict='sensor_id', ignore_duplicates=True).execute()
+            # Rows another worker created meanwhile are not returned
+            for row in response.data:
+                current[row['sensor_id']] = (row['is_active'], to_epoch(row['since']))
+
+        claimed = [change for change in changes if change[0] in current]
+        deferred = [change for change in changes if change[0] not in current]
+        if not claimed:
+            return 0, 0, deferred
+
+        user_ids = {change[0]: change[1] for change in claimed}
+        rollups, closed, stale = self.sensor_service.apply_state_changes(current, claimed)
+        if rollups:
+            self._add_to_rollups(rollups)
+
+        self.client.table(self.current_table).upsert([{
+            'sensor_id': sensor_id,
+            'user_id': user_ids[sensor_id],
+            'is_active': is_active,
+            'since': to_timestamp(since),
+            'claimed_until': None
+        } for sensor_id, (is_active, since) in current.items()], on_conflict='sensor_id').execute()
+        return closed, stale, deferred
+
+    def _add_to_rollups(self, rollups: Dict[Tuple[str, str], List[float]]):
+        """Add on-time and toggles to the daily rollups of sensors claimed by this worker."""
+        response = (self.client.table(self.daily_table).select('sensor_id, day, on_seconds, toggles')
+                    .in_('sensor_id', list({sensor_id for sensor_id, _ in rollups}))
+                    .in_('day', list({day for _, day in rollups}))
+                    .execute())
+        existing = {(row['sensor_id'], row['day']): row for row in response.data}
+
+        rows = []
+        for (sensor_id, day), (on_seconds, toggles) in rollups.items():
+            row = existing.get((sensor_id, day), {})
+            rows.append({
+                'sensor_id': sensor_id,
+                'day': day,
+                'on_seconds': row.get('on_seconds', 0.0) + on_seconds,
+                'toggles': row.get('toggles', 0) + toggles
+            })
+        self.client.table(self.daily_table).upsert(rows, on_conflict='sensor_id,day').execute()
+
+    def get_daily(self, sensor_id: str, start_day: str, end_day: str) -> Dict[str, Tuple[float, int]]:
+        """Get {day: (on_seconds, toggles)} of closed runs for start_day <= day <= end_day."""
+        response = (self.client.table(self.daily_table).select('day, on_seconds, toggles')
+                    .eq('sensor_id', sensor_id).gte('day', start_day).lte('day', end_day)
+                    .execute())
+        return {row['day']: (row['on_seconds'], row['toggles']) for row in response.data}
+
+    def get_current(self, sensor_id: str) -> Optional[Tuple[bool, float]]:
+        """Get (is_active, since) of a sensor's open run."""
+        response = (self.client.table(self.current_table).select('is_active, since')
+                    .eq('sensor_id', sensor_id).execute())
+        if response.data:
+            row = response.data[0]
+            return row['is_active'], to_epoch(row['since'])
+        return None
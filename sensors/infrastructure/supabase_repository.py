@@ -1,10 +1,13 @@
 """Sensor repository with Supabase implementation."""
 
+import logging
 from typing import List, Optional
 from datetime import datetime
 from shared.supabase.client import get_supabase_client
 from sensors.domain.entities import Sensor, SensorType
 
+logger = logging.getLogger(__name__)
+
 
 class SensorSupabaseRepository:
     """Sensor repository using Supabase."""
@@ -23,9 +26,15 @@ class SensorSupabaseRepository:
         
         return None
     
-    def get_by_user_id(self, user_id: str) -> List[Sensor]:
-        """Get all sensors for a user."""
-        response = self.client.table(self.table_name).select('*').eq('user_id', user_id).execute()
+    def get_by_user_id(self, user_id: str, is_active: Optional[bool] = None,
+                       sensor_type: Optional[str] = None) -> List[Sensor]:
+        """Get a user's sensors, optionally filtered by status and type."""
+        query = self.client.table(self.table_name).select('*').eq('user_id', user_id)
+        if is_active is not None:
+            query = query.eq('isActive', is_active)
+        if sensor_type is not None:
+            query = query.eq('sensor_type', sensor_type)
+        response = query.execute()
         
         sensors = []
         if response.data:
@@ -36,14 +45,21 @@ class SensorSupabaseRepository:
         
         return sensors
     
-    def update_status(self, sensor_id: str, is_active: bool) -> Optional[Sensor]:
-        """Update sensor status."""
+    def update_status(self, sensor_id: str, is_active: bool,
+                      expected_updated_at: Optional[str] = None) -> Optional[Sensor]:
+        """Update sensor status, only if updated_at still matches when given.
+        
+        Returns None when no row matched.
+        """
         update_data = {
             'isActive': is_active,
             'updated_at': datetime.utcnow().isoformat()
         }
         
-        response = self.client.table(self.table_name).update(update_data).eq('id', sensor_id).execute()
+        query = self.client.table(self.table_name).update(update_data).eq('id', sensor_id)
+        if expected_updated_at is not None:
+            query = query.eq('updated_at', expected_updated_at)
+        response = query.execute()
         
         if response.data:
             sensor_data = response.data[0]
@@ -51,14 +67,23 @@ class SensorSupabaseRepository:
         
         return None
     
-    def exists(self, sensor_id: str) -> bool:
-        """Check if sensor exists."""
-        response = self.client.table(self.table_name).select('id').eq('id', sensor_id).execute()
-        return len(response.data) > 0
-    
-    def get_active_sensors_by_user(self, user_id: str) -> List[Sensor]:
-        """Get all active sensors for a user."""
-        response = self.client.table(self.table_name).select('*').eq('user_id', user_id).eq('isActive', True).execute()
+    def update_status_where(self, is_active: bool, sensor_ids: Optional[List[str]] = None,
+                            user_id: Optional[str] = None,
+                            sensor_type: Optional[str] = None) -> List[Sensor]:
+        """Update the status of every sensor matching the filters in one query."""
+        update_data = {
+            'isActive': is_active,
+            'updated_at': datetime.utcnow().isoformat()
+        }
+        
+        query = self.client.table(self.table_name).update(update_data)
+        if sensor_ids is not None:
+            query = query.in_('id', sensor_ids)
+        if user_id is not None:
+            query = query.eq('user_id', user_id)
+        if sensor_type is not None:
+            query = query.eq('sensor_type', sensor_type)
+        response = query.execute()
         
         sensors = []
         if response.data:
@@ -69,18 +94,25 @@ class SensorSupabaseRepository:
         
         return sensors
     
-    def get_sensors_by_type(self, user_id: str, sensor_type: str) -> List[Sensor]:
-        """Get sensors by type for a user."""
-        response = self.client.table(self.table_name).select('*').eq('user_id', user_id).eq('sensor_type', sensor_type).execute()
-        
-        sensors = []
-        if response.data:
-            for sensor_data in response.data:
-                sensor = self._map_to_entity(sensor_data)
-                if sensor:
-                    sensors.append(sensor)
+    def exists(self, sensor_id: str) -> bool:
+        """Check if sensor exists."""
+        response = self.client.table(self.table_name).select('id').eq('id', sensor_id).execute()
+        return len(response.data) > 0
+    
+    def count_by_user(self, user_id: str, sensor_types: List[str],
+                      is_active: Optional[bool] = None) -> int:
+        """Count a user's sensors of the given types without fetching any rows."""
+        query = self.client.table(self.table_name).select('id', count='exact').eq('user_id', user_id)
+        if len(sensor_types) == 1:
+            query = query.eq('sensor_type', sensor_types[0])
+        else:
+            query = query.in_('sensor_type', sensor_types)
+        if is_active is not None:
+            query = query.eq('isActive', is_active)
         
-        return sensors
+        # limit=0 still returns the exact count in the Content-Range header
+        response = query.limit(0).execute()
+        return response.count or 0
     
     def _map_to_entity(self, sensor_data: dict) -> Optional[Sensor]:
         """Map database data to Sensor entity."""
@@ -106,5 +138,6 @@ class SensorSupabaseRepository:
                 updated_at=updated_at
             )
         except (KeyError, ValueError) as e:
-            print(f"Error mapping sensor data: {e}")
+            logger.warning("Error mapping sensor data: %s", e,
+                           extra={'fields': {'sensor_id': sensor_data.get('id')}})
             return None
@@ -1,9 +1,16 @@
 """Interface services for Sensors context."""
+from datetime import datetime, timezone
 from flask import Blueprint, request, jsonify
 from sensors.application.services import SensorApplicationService
+from shared.infrastructure.lazy import lazy_singleton
 
 sensor_api = Blueprint("sensor_api", __name__)
-sensor_service = SensorApplicationService()
+
+
+@lazy_singleton
+def get_sensor_service() -> SensorApplicationService:
+    """Get the sensor application service, built on first use."""
+    return SensorApplicationService()
 
 
 @sensor_api.route('/sensors/user/<user_id>', methods=['GET'])
@@ -64,13 +71,10 @@ def get_sensors_by_user(user_id):
         active_only = request.args.get('active_only', '').lower() == 'true'
         sensor_type = request.args.get('sensor_type')
         
-        # Get sensors based on filters
-        if sensor_type:
-            sensors = sensor_service.get_sensors_by_type(user_id, sensor_type)
-        elif active_only:
-            sensors = sensor_service.get_active_sensors_by_user(user_id)
-        else:
-            sensors = sensor_service.get_sensors_by_user(user_id)
+        # Filters combine: active_only applies together with sensor_type
+        sensors = get_sensor_service().get_sensors_by_user(
+            user_id, active_only=active_only, sensor_type=sensor_type or None
+        )
         
         return jsonify({
             'success': True,
@@ -133,7 +137,7 @@ def get_sensor(sensor_id):
         description: Internal server error
     """
     try:
-        sensor = sensor_service.get_sensor(sensor_id)
+        sensor = get_sensor_service().get_sensor(sensor_id)
         
         if not sensor:
             return jsonify({
@@ -177,6 +181,10 @@ def update_sensor_status(sensor_id):
               type: boolean
               description: New status for the sensor
               example: true
+            updated_at:
+              type: string
+              description: updated_at last read by the client; the update is rejected with 409 if the sensor changed since
+              example: "2025-06-19T10:30:00+00:00"
     responses:
       200:
         description: Sensor status updated successfully
@@ -208,6 +216,8 @@ def update_sensor_status(sensor_id):
         description: Invalid request data
       404:
         description: Sensor not found
+      409:
+        description: Sensor was modified since the given updated_at
       500:
         description: Internal server error
     """
@@ -235,7 +245,9 @@ def update_sensor_status(sensor_id):
             }), 400
         
         # Update sensor status
-        updated_sensor = sensor_service.update_sensor_status(sensor_id, is_active)
+        updated_sensor = get_sensor_service().update_sensor_status(
+            sensor_id, is_active, data.get('updated_at')
+        )
         
         action = "activated" if is_active else "deactivated"
         
@@ -246,10 +258,122 @@ def update_sensor_status(sensor_id):
         }), 200
         
     except ValueError as e:
+        if 'not found' in str(e):
+            status_code = 404
+        elif 'modified since' in str(e):
+            status_code = 409
+        else:
+            status_code = 400
         return jsonify({
             'success': False,
             'error': str(e)
-        }), 404 if 'not found' in str(e) else 400
+        }), status_code
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error'
+        }), 500
+
+
+@sensor_api.route('/sensors/status', methods=['PATCH'])
+def update_sensors_status():
+    """Update the status of many sensors at once (scenes, e.g. "leave home").
+    ---
+    tags:
+      - Sensors
+    parameters:
+      - in: body
+        name: status_data
+        required: true
+        description: New status plus sensor_ids and/or user_id; sensor_type narrows the selection
+        schema:
+          type: object
+          required:
+            - isActive
+          properties:
+            isActive:
+              type: boolean
+              description: New status for the selected sensors
+              example: false
+            sensor_ids:
+              type: array
+              items:
+                type: string
+              example: ["sensor_001", "sensor_002"]
+            user_id:
+              type: string
+              example: "user_123"
+            sensor_type:
+              type: string
+              enum: [led_tv, smart_light, air_conditioner, coffee_maker]
+    responses:
+      200:
+        description: Sensors updated; not_found lists requested sensor_ids that were not updated
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+            message:
+              type: string
+            data:
+              type: array
+              items:
+                type: object
+            not_found:
+              type: array
+              items:
+                type: string
+      400:
+        description: Invalid request data
+      500:
+        description: Internal server error
+    """
+    try:
+        data = request.get_json()
+        
+        if data is None:
+            return jsonify({
+                'success': False,
+                'error': 'Request body is required'
+            }), 400
+        
+        is_active = data.get('isActive')
+        if not isinstance(is_active, bool):
+            return jsonify({
+                'success': False,
+                'error': 'isActive must be a boolean value'
+            }), 400
+        
+        sensor_ids = data.get('sensor_ids')
+        if sensor_ids is not None and not isinstance(sensor_ids, list):
+            return jsonify({
+                'success': False,
+                'error': 'sensor_ids must be a list'
+            }), 400
+        
+        updated_sensors = get_sensor_service().update_sensors_status(
+            is_active,
+            sensor_ids=sensor_ids,
+            user_id=data.get('user_id'),
+            sensor_type=data.get('sensor_type')
+        )
+        
+        updated_ids = {sensor.id for sensor in updated_sensors}
+        action = "activated" if is_active else "deactivated"
+        
+        return jsonify({
+            'success': True,
+            'message': f'{len(updated_sensors)} sensors {action} successfully',
+            'data': [sensor.to_dict() for sensor in updated_sensors],
+            'not_found': [sensor_id for sensor_id in sensor_ids or [] if sensor_id not in updated_ids]
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -294,7 +418,7 @@ def get_sensor_statistics(user_id):
         description: Internal server error
     """
     try:
-        statistics = sensor_service.get_sensor_statistics(user_id)
+        statistics = get_sensor_service().get_sensor_statistics(user_id)
         
         return jsonify({
             'success': True,
@@ -311,3 +435,86 @@ def get_sensor_statistics(user_id):
             'success': False,
             'error': 'Internal server error'
         }), 500
+
+
+@sensor_api.route('/sensors/<sensor_id>/history', methods=['GET'])
+def get_sensor_history(sensor_id):
+    """Get how long a sensor was on and how often it toggled, per day.
+    ---
+    tags:
+      - Sensors
+    parameters:
+      - in: path
+        name: sensor_id
+        required: true
+        type: string
+        description: The ID of the sensor
+      - in: query
+        name: from
+        type: string
+        description: First UTC date (YYYY-MM-DD), defaults to today
+      - in: query
+        name: to
+        type: string
+        description: Last UTC date (YYYY-MM-DD), inclusive, defaults to from
+    responses:
+      200:
+        description: Sensor history
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+            data:
+              type: object
+              properties:
+                sensor_id:
+                  type: string
+                from:
+                  type: string
+                to:
+                  type: string
+                is_active:
+                  type: boolean
+                on_seconds:
+                  type: number
+                toggles:
+                  type: integer
+                days:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      date:
+                        type: string
+                      on_seconds:
+                        type: number
+                      toggles:
+                        type: integer
+      400:
+        description: Invalid request
+      404:
+        description: Sensor not found
+      500:
+        description: Internal server error
+    """
+    try:
+        start_date = request.args.get('from') or datetime.now(timezone.utc).date().isoformat()
+        end_date = request.args.get('to') or start_date
+        history = get_sensor_service().get_sensor_history(sensor_id, start_date, end_date)
+        
+        return jsonify({
+            'success': True,
+            'data': history
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404 if 'not found' in str(e) else 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error'
+        }), 500
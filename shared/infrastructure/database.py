@@ -1,6 +1,9 @@
 """Database initialization for GeoEntry Edge API with Supabase."""
+import logging
 from shared.supabase.client import get_supabase_client
 
+logger = logging.getLogger(__name__)
+
 def init_db() -> bool:
     """Initialize connection to Supabase."""
     # With Supabase, tables are already created via migrations
@@ -10,8 +13,8 @@ def init_db() -> bool:
     # Test connection by making a simple query
     try:
         response = client.table('profiles').select('id').limit(1).execute()
-        print("✅ Supabase connection successful")
+        logger.info("✅ Supabase connection successful")
         return True
     except Exception as e:
-        print(f"❌ Supabase connection failed: {e}")
+        logger.error("❌ Supabase connection failed: %s", e)
         return False
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""Lazily constructed singletons for GeoEntry Edge API."""
+
+import functools
+import threading
+from typing import Callable, List, TypeVar
+
+T = TypeVar('T')
+
+# Functions dropping one lazily built instance each, run by reset_singletons()
+_resets: List[Callable[[], None]] = []
+
+
+def register_reset(reset: Callable[[], None]) -> Callable[[], None]:
+    """Run reset whenever reset_singletons() is called."""
+    _resets.append(reset)
+    return reset
+
+
+def reset_singletons():
+    """Drop every lazily built instance, so the next use builds it from the current configuration."""
+    for reset in _resets:
+        reset()
+
+
+def lazy_singleton(factory: Callable[[], T]) -> Callable[[], T]:
+    """Turn a zero-argument factory into a getter that builds its instance once, on first call.
+
+    A dropped instance with a stop() method, such as a background runner, is stopped.
+    """
+    instances = []
+    lock = threading.Lock()
+
+    @functools.wraps(factory)
+    def get() -> T:
+        if not instances:
+            with lock:
+                if not instances:
+                    instances.append(factory())
+        return instances[0]
+
+    @register_reset
+    def reset():
+        with lock:
+            dropped = instances[:]
+            instances.clear()
+        for instance in dropped:
+            if hasattr(instance, 'stop'):
+                instance.stop()
+
+    get.reset = reset
+    return get
@@ -0,0 +1,57 @@
+"""Single-leader election among the workers of one host."""
+
+import os
+import threading
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+
+class LeaderLock:
+    """Exclusive lock on a local file held by at most one process.
+
+    The operating system releases the lock when the holder exits, so another
+    worker calling try_acquire() takes over after a crash. Without fcntl every
+    process is its own leader.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file: Optional[object] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_leader(self) -> bool:
+        return self._file is not None
+
+    def try_acquire(self) -> bool:
+        """Become leader if no other process is; returns whether this one is."""
+        with self._lock:
+            if self._file is not None:
+                return True
+
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            lock_file = open(self.path, 'a+b')
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    lock_file.close()
+                    return False
+            self._file = lock_file
+            return True
+
+    def release(self):
+        """Give up leadership."""
+        with self._lock:
+            if self._file is None:
+                return
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
@@ -0,0 +1,74 @@
+"""Frozen OpenAPI spec for GeoEntry Edge API."""
+
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Callable, Optional
+from flask import Response, jsonify, request
+
+
+class FrozenSpec:
+    """Serves a pre-generated OpenAPI spec instead of parsing docstrings per request.
+
+    The spec is read from `path`, or produced once by `generate` and written
+    there when the file is missing, then kept in memory as bytes. Responses
+    carry an ETag and a long Cache-Control max-age, so clients revalidate
+    with a 304 at most.
+    """
+
+    def __init__(self, path: str, generate: Optional[Callable[[], bytes]] = None,
+                 max_age_seconds: int = 86400, persist: bool = True):
+        self.path = path
+        self.generate = generate
+        self.max_age_seconds = max_age_seconds
+        self.persist = persist
+        self._body: Optional[bytes] = None
+        self._etag: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> Optional[bytes]:
+        """Get the spec bytes, reading or generating them on first use."""
+        if self._body is not None:
+            return self._body
+
+        with self._lock:
+            if self._body is None:
+                body = None
+                if self.persist and os.path.exists(self.path):
+                    with open(self.path, 'rb') as spec_file:
+                        body = spec_file.read()
+                elif self.generate is not None:
+                    body = self.freeze() if self.persist else self.generate()
+                if body is not None:
+                    self._etag = hashlib.sha256(body).hexdigest()
+                    self._body = body
+        return self._body
+
+    def freeze(self) -> bytes:
+        """Generate the spec and atomically write it to the spec file."""
+        if self.generate is None:
+            raise RuntimeError("No OpenAPI spec generator configured (is Swagger UI disabled?)")
+        body = self.generate()
+        descriptor, temporary_path = tempfile.mkstemp(
+            dir=os.path.dirname(self.path) or '.', prefix=os.path.basename(self.path) + '.'
+        )
+        try:
+            with os.fdopen(descriptor, 'wb') as spec_file:
+                spec_file.write(body)
+            os.replace(temporary_path, self.path)
+        except Exception:
+            os.unlink(temporary_path)
+            raise
+        return body
+
+    def view(self):
+        """Flask view serving the spec, answering 304 to a matching If-None-Match."""
+        body = self.load()
+        if body is None:
+            return jsonify({"error": "API spec not available"}), 404
+
+        response = Response(body, mimetype='application/json')
+        response.set_etag(self._etag)
+        response.headers['Cache-Control'] = f'public, max-age={self.max_age_seconds}'
+        return response.make_conditional(request)
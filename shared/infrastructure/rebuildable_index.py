@@ -0,0 +1,91 @@
+"""Base class for in-memory indexes rebuilt from the database while serving writes."""
+
+import threading
+import time
+from typing import Callable, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+class RebuildableIndex(Generic[T]):
+    """In-memory index whose full rebuild runs without blocking readers or writers.
+
+    rebuild() loads every item into a fresh, empty index off-lock. Writes
+    made meanwhile through upsert() and remove() apply to the live index and
+    are also recorded; before the fresh index is swapped in, they are
+    replayed onto it, so a write racing with the load is never lost.
+
+    Subclasses list the attributes holding their state in STATE_FIELDS and
+    implement _empty(), _key(), _accepts(), _add() and _discard(); _add and
+    _discard are called with the lock held.
+    """
+
+    STATE_FIELDS: Tuple[str, ...] = ()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Writes seen while a rebuild is loading, replayed onto the new index
+        self._pending_writes: Optional[List[Tuple[str, Optional[T]]]] = None
+        self.rebuilt_at: Optional[float] = None
+
+    def _empty(self) -> 'RebuildableIndex[T]':
+        """Get an empty index with the same configuration."""
+        raise NotImplementedError
+
+    def _key(self, item: T) -> str:
+        """Get the ID of an item."""
+        raise NotImplementedError
+
+    def _accepts(self, item: T) -> bool:
+        """Check if an item belongs in the index (e.g. is active)."""
+        raise NotImplementedError
+
+    def _add(self, item: T):
+        """Index an accepted item. Caller holds the lock."""
+        raise NotImplementedError
+
+    def _discard(self, key: str):
+        """Unindex an item if present. Caller holds the lock."""
+        raise NotImplementedError
+
+    def rebuild(self, loader: Callable[[], Iterable[T]]):
+        """Replace the whole index with the items returned by loader()."""
+        with self._lock:
+            self._pending_writes = []
+
+        try:
+            fresh = self._empty()
+            for item in loader():
+                if fresh._accepts(item):
+                    fresh._add(item)
+        except Exception:
+            with self._lock:
+                self._pending_writes = None
+            raise
+
+        with self._lock:
+            for key, item in self._pending_writes:
+                fresh._discard(key)
+                if item is not None and fresh._accepts(item):
+                    fresh._add(item)
+            for field in self.STATE_FIELDS:
+                setattr(self, field, getattr(fresh, field))
+            self._pending_writes = None
+            self.rebuilt_at = time.monotonic()
+
+    def upsert(self, item: T):
+        """Add, replace or drop an item after a write."""
+        key = self._key(item)
+        with self._lock:
+            self._discard(key)
+            if self._accepts(item):
+                self._add(item)
+            if self._pending_writes is not None:
+                self._pending_writes.append((key, item))
+
+    def remove(self, key: str):
+        """Drop a deleted item."""
+        with self._lock:
+            self._discard(key)
+            if self._pending_writes is not None:
+                self._pending_writes.append((key, None))
@@ -0,0 +1,93 @@
+"""Non-blocking structured JSON logging for GeoEntry Edge API."""
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line.
+
+    Structured fields passed as `extra={'fields': {...}}` are merged into
+    the object; values that are not JSON types are written with str().
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created))
+                  + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler that never blocks: records are dropped when the queue is full.
+
+    Only the message arguments and exception text are resolved in the
+    logging thread; JSON formatting and the write happen in the listener.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# Background listener of the process, started once by configure_logging()
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+_configure_lock = threading.Lock()
+
+def configure_logging(level: str = 'INFO', queue_size: int = 10000) -> DroppingQueueHandler:
+    """Route all logging through a bounded queue to a JSON writer thread on stdout."""
+    global _listener, _queue_handler
+    with _configure_lock:
+        if _queue_handler is not None:
+            return _queue_handler
+
+        log_queue = queue.Queue(maxsize=queue_size)
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(JsonFormatter())
+        _queue_handler = DroppingQueueHandler(log_queue)
+
+        root = logging.getLogger()
+        root.handlers = [_queue_handler]
+        root.setLevel(level.upper())
+
+        _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        # Flush what is queued when the worker exits
+        atexit.register(_listener.stop)
+        return _queue_handler
+
+
+def get_dropped_log_records() -> int:
+    """Get how many records were dropped because the log queue was full."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
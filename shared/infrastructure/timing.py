@@ -0,0 +1,111 @@
+"""Request-scoped stage timing and sampling profiler for GeoEntry Edge API."""
+
+import cProfile
+import logging
+import os
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict
+from flask import Flask, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block of the current request under a stage name.
+
+    Stages nest: time spent in an inner stage is only counted there, so
+    stage timings add up to at most the request total. Outside a request
+    this does nothing.
+    """
+    stack = g.get('stage_stack') if has_request_context() else None
+    if stack is None:
+        yield
+        return
+
+    # Frame: [started, time spent in nested stages]
+    frame = [time.perf_counter(), 0.0]
+    stack.append(frame)
+    try:
+        yield
+    finally:
+        stack.pop()
+        elapsed = time.perf_counter() - frame[0]
+        timings: Dict[str, float] = g.stage_timings
+        timings[name] = timings.get(name, 0.0) + elapsed - frame[1]
+        if stack:
+            stack[-1][1] += elapsed
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider timing response serialization under the 'serialize' stage."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        with stage('serialize'):
+            return super().dumps(obj, **kwargs)
+
+
+def server_timing_header(timings: Dict[str, float], total: float) -> str:
+    """Format stage timings as a Server-Timing header value, in milliseconds."""
+    metrics = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in timings.items()]
+    metrics.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(metrics)
+
+
+def init_request_timing(app: Flask, profile_sample_rate: float = 0.0,
+                        profile_directory: str = ''):
+    """Time request stages and profile a sampled fraction of requests.
+
+    Every response gets a Server-Timing header and a JSON log line with
+    the stage breakdown. With profile_sample_rate > 0, that fraction of
+    requests is run under cProfile and dumped to profile_directory.
+    """
+    app.json = TimedJSONProvider(app)
+
+    @app.before_request
+    def start_request_timing():
+        g.stage_stack = []
+        g.stage_timings = {}
+        g.request_started = time.perf_counter()
+
+        if profile_sample_rate > 0 and random.random() < profile_sample_rate:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is active in this process
+                return
+            g.profiler = profiler
+
+    @app.after_request
+    def finish_request_timing(response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+
+        total = time.perf_counter() - started
+        timings = g.stage_timings
+        response.headers['Server-Timing'] = server_timing_header(timings, total)
+        logger.info('request_timing', extra={'fields': {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'stages_ms': {name: round(seconds * 1000, 2) for name, seconds in timings.items()}
+        }})
+        return response
+
+    @app.teardown_request
+    def dump_request_profile(error=None):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+        profiler.disable()
+        os.makedirs(profile_directory, exist_ok=True)
+        file_name = f"{time.strftime('%Y%m%dT%H%M%S')}-{request.endpoint or 'unknown'}-{uuid.uuid4().hex[:8]}.prof"
+        profiler.dump_stats(os.path.join(profile_directory, file_name))
@@ -0,0 +1,92 @@
+"""Startup warm-up and readiness tracking for GeoEntry Edge API."""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    """Runs named warm-up tasks in parallel and reports readiness.
+
+    The service is ready once every task has succeeded. A failed run can be
+    retried with start(); tasks must therefore be safe to run again.
+    """
+
+    def __init__(self, tasks: Dict[str, Callable[[], object]], max_workers: int = 4):
+        self.tasks = tasks
+        self.max_workers = max_workers
+        self.ready = False
+        self.started_at: Optional[float] = None
+        self.duration: Optional[float] = None
+        self.results: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._running = False
+
+    def start(self) -> bool:
+        """Run the warm-up in a background thread unless it is running or done."""
+        with self._lock:
+            if self.ready or self._running:
+                return False
+            self._running = True
+
+        threading.Thread(target=self._run, daemon=True).start()
+        return True
+
+    def run(self) -> bool:
+        """Run the warm-up in the calling thread and return whether it succeeded."""
+        with self._lock:
+            if self.ready:
+                return True
+            if self._running:
+                return False
+            self._running = True
+        return self._run()
+
+    def _run(self) -> bool:
+        """Run every task in parallel. Caller has set _running."""
+        self.started_at = time.monotonic()
+        results = {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers,
+                                    thread_name_prefix='warmup') as executor:
+                futures = {name: executor.submit(self._timed, task) for name, task in self.tasks.items()}
+                for name, future in futures.items():
+                    results[name] = future.result()
+        finally:
+            self.duration = time.monotonic() - self.started_at
+            self.results = results
+            with self._lock:
+                self.ready = all(result['ok'] for result in results.values())
+                self._running = False
+
+        if self.ready:
+            logger.info("✅ Warm-up finished in %.2fs", self.duration,
+                        extra={'fields': {'tasks': self.results}})
+        else:
+            failed = [name for name, result in results.items() if not result['ok']]
+            logger.error("❌ Warm-up failed for: %s", ', '.join(failed),
+                         extra={'fields': {'tasks': self.results}})
+        return self.ready
+
+    @staticmethod
+    def _timed(task: Callable[[], object]) -> dict:
+        """Run a task and capture its outcome and duration."""
+        start = time.monotonic()
+        try:
+            result = task()
+            return {'ok': True, 'seconds': round(time.monotonic() - start, 3), 'result': result}
+        except Exception as e:
+            return {'ok': False, 'seconds': round(time.monotonic() - start, 3), 'error': str(e)}
+
+    def status(self) -> dict:
+        """Get readiness and per-task outcomes."""
+        return {
+            'ready': self.ready,
+            'running': self._running,
+            'duration_seconds': round(self.duration, 3) if self.duration is not None else None,
+            'tasks': self.results
+        }
@@ -1,14 +1,37 @@
 """Supabase client configuration for GeoEntry Edge API."""
 
-from supabase import create_client, Client
+import threading
+from typing import TYPE_CHECKING
 from config import get_config
+from shared.infrastructure.lazy import register_reset
+from shared.supabase.instrumented_client import InstrumentedClient
 
-# Get configuration
-config = get_config()
+if TYPE_CHECKING:
+    from supabase import Client
 
-# Initialize Supabase client
-supabase: Client = create_client(config.SUPABASE_URL, config.SUPABASE_KEY)
+# Client created on first use, so importing the app makes no network setup
+_supabase = None
+_supabase_lock = threading.Lock()
 
-def get_supabase_client() -> Client:
+def get_supabase_client() -> "Client":
     """Get the Supabase client instance."""
-    return supabase
+    global _supabase
+    if _supabase is None:
+        with _supabase_lock:
+            if _supabase is None:
+                # Deferred: the supabase package is slow to import
+                from supabase import create_client
+                config = get_config()
+                _supabase = InstrumentedClient(
+                    create_client(config.SUPABASE_URL, config.SUPABASE_KEY),
+                    slow_threshold_ms=config.SLOW_QUERY_THRESHOLD_MS
+                )
+    return _supabase
+
+
+@register_reset
+def reset_supabase_client():
+    """Drop the Supabase client so the next use builds it from the current configuration."""
+    global _supabase
+    with _supabase_lock:
+        _supabase = None
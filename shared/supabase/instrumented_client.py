@@ -0,0 +1,96 @@
+"""Supabase client wrapper that times PostgREST queries."""
+
+import logging
+import time
+from typing import Any, List, Tuple
+from shared.infrastructure.timing import stage
+
+logger = logging.getLogger(__name__)
+
+# Builder calls whose arguments are row payloads rather than filters
+PAYLOAD_CALLS = {'insert', 'update', 'upsert'}
+
+
+class InstrumentedQuery:
+    """Proxy for a PostgREST request builder that times execute().
+
+    Builder calls are forwarded and their results re-wrapped, so a query
+    chain keeps the table name and the list of calls that built it; queries
+    slower than slow_threshold_ms, and queries that fail, are logged with them.
+    """
+
+    def __init__(self, builder: Any, table: str, calls: List[Tuple[str, tuple]],
+                 slow_threshold_ms: float = 200.0):
+        self._builder = builder
+        self.table = table
+        self.calls = calls
+        self.slow_threshold_ms = slow_threshold_ms
+
+    def _wrap(self, name: str, args: tuple, result: Any) -> Any:
+        """Wrap a builder returned by the chain, passing other results through."""
+        if hasattr(result, 'execute'):
+            return InstrumentedQuery(result, self.table, self.calls + [(name, args)],
+                                     self.slow_threshold_ms)
+        return result
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._builder, name)
+        if not callable(attribute):
+            # Properties such as not_ return builders too
+            return self._wrap(name, (), attribute)
+
+        def call(*args, **kwargs):
+            return self._wrap(name, args, attribute(*args, **kwargs))
+        return call
+
+    def execute(self):
+        """Run the query, timed under the 'db' request stage."""
+        started = time.perf_counter()
+        response = error = None
+        try:
+            with stage('db'):
+                response = self._builder.execute()
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if error is not None:
+                self._log_query('failed_query', elapsed_ms, error=error)
+            elif elapsed_ms >= self.slow_threshold_ms:
+                self._log_query('slow_query', elapsed_ms, response)
+
+    def _log_query(self, message: str, elapsed_ms: float, response: Any = None,
+                   error: Exception = None):
+        """Log a query with its table, filters and row count or error."""
+        fields = {
+            'table': self.table,
+            'duration_ms': round(elapsed_ms, 2),
+            'calls': [
+                [name] if name in PAYLOAD_CALLS else [name, *args]
+                for name, args in self.calls
+            ]
+        }
+        if error is not None:
+            fields['error'] = f'{type(error).__name__}: {error}'
+        else:
+            data = getattr(response, 'data', None)
+            fields['rows'] = len(data) if isinstance(data, list) else None
+            fields['count'] = getattr(response, 'count', None)
+        logger.warning(message, extra={'fields': fields})
+
+
+class InstrumentedClient:
+    """Proxy for the Supabase client whose table queries are timed."""
+
+    def __init__(self, client: Any, slow_threshold_ms: float = 200.0):
+        self._client = client
+        self.slow_threshold_ms = slow_threshold_ms
+
+    def table(self, name: str) -> InstrumentedQuery:
+        """Start a query on a table."""
+        return InstrumentedQuery(self._client.table(name), name, [], self.slow_threshold_ms)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
@@ -0,0 +1,70 @@
+-- Tables and columns used by the Edge API on top of the base GeoEntry schema
+-- (devices, locations, profiles, proximity_events, sensors).
+
+-- Polygon geofences, as Google encoded polylines of (lat, lon) vertices
+ALTER TABLE public.locations ADD COLUMN IF NOT EXISTS polygon text;
+
+-- One salted API key hash per device; plaintext keys are never stored
+CREATE TABLE IF NOT EXISTS public.device_api_keys (
+    device_id uuid PRIMARY KEY REFERENCES public.devices (id) ON DELETE CASCADE,
+    salt text NOT NULL,
+    key_hash text NOT NULL,
+    created_at timestamptz DEFAULT now()
+);
+
+-- Last time and position each device was seen, flushed in batches
+CREATE TABLE IF NOT EXISTS public.device_presence (
+    device_id uuid PRIMARY KEY REFERENCES public.devices (id) ON DELETE CASCADE,
+    last_seen_at timestamptz NOT NULL,
+    latitude double precision,
+    longitude double precision
+);
+
+-- Sensor changes triggered by proximity events
+CREATE TABLE IF NOT EXISTS public.automation_rules (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id uuid NOT NULL REFERENCES public.profiles (id) ON DELETE CASCADE,
+    location_id uuid NOT NULL REFERENCES public.locations (id) ON DELETE CASCADE,
+    event_type text NOT NULL,
+    target_is_active boolean NOT NULL,
+    sensor_type public.device_type_enum,
+    sensor_ids text[],
+    enabled boolean NOT NULL DEFAULT true,
+    delay_seconds integer NOT NULL DEFAULT 0,
+    created_at timestamptz DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS automation_rules_enabled_idx ON public.automation_rules (id) WHERE enabled;
+
+-- Delayed and timed sensor actions, claimed before running
+CREATE TABLE IF NOT EXISTS public.scheduled_actions (
+    id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    user_id uuid NOT NULL REFERENCES public.profiles (id) ON DELETE CASCADE,
+    target_is_active boolean NOT NULL,
+    sensor_type public.device_type_enum,
+    sensor_ids jsonb,
+    run_at timestamptz NOT NULL,
+    status text NOT NULL DEFAULT 'pending',
+    attempts integer NOT NULL DEFAULT 0,
+    last_error text,
+    claimed_until timestamptz,
+    created_at timestamptz DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS scheduled_actions_pending_idx ON public.scheduled_actions (run_at) WHERE status = 'pending';
+
+-- Open run of each sensor: its state and since when it has kept it
+CREATE TABLE IF NOT EXISTS public.sensor_state_current (
+    sensor_id uuid PRIMARY KEY REFERENCES public.sensors (id) ON DELETE CASCADE,
+    user_id uuid NOT NULL,
+    is_active boolean NOT NULL,
+    since timestamptz NOT NULL,
+    claimed_until timestamptz
+);
+
+-- Per-day on-time and toggles of each sensor's closed runs (UTC days)
+CREATE TABLE IF NOT EXISTS public.sensor_state_daily (
+    sensor_id uuid NOT NULL REFERENCES public.sensors (id) ON DELETE CASCADE,
+    day date NOT NULL,
+    on_seconds double precision NOT NULL DEFAULT 0,
+    toggles integer NOT NULL DEFAULT 0,
+    PRIMARY KEY (sensor_id, day)
+);
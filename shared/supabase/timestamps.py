@@ -0,0 +1,16 @@
+"""Conversion between epoch seconds and Supabase timestamptz values."""
+
+from datetime import datetime, timezone
+
+
+def to_timestamp(epoch: float) -> str:
+    """Format epoch seconds as an ISO timestamp in UTC."""
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+
+def to_epoch(value: str) -> float:
+    """Parse an ISO timestamp returned by Supabase into epoch seconds; naive ones are UTC."""
+    timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
@@ -0,0 +1,25 @@
+"""Shared test setup: services are built against fake repositories, never Supabase."""
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Read by config at import: no background warm-up or scheduler against the real backend
+os.environ.setdefault('WARMUP_ENABLED', 'false')
+os.environ.setdefault('SCHEDULER_ENABLED', 'false')
+
+import shared.supabase.client as supabase_client  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def no_supabase(monkeypatch):
+    """Give repositories a placeholder client; tests replace them with fakes.
+
+    create_app() drops the client, so the one it builds next is a placeholder too.
+    """
+    monkeypatch.setattr(supabase_client, '_supabase', object())
+    placeholder = types.ModuleType('supabase')
+    placeholder.create_client = lambda url, key: object()
+    monkeypatch.setitem(sys.modules, 'supabase', placeholder)
@@ -0,0 +1,59 @@
+"""Tests for application creation."""
+import app as app_module
+from app import create_app
+from automations.interfaces.services import get_action_scheduler
+from config import DevelopmentConfig, use_config
+from locations.interfaces.services import get_location_service
+from shared.infrastructure.lazy import lazy_singleton, reset_singletons
+from shared.supabase.client import get_supabase_client
+
+
+def test_importing_the_app_does_not_create_it():
+    assert not hasattr(app_module, 'app')
+
+
+def test_each_app_gets_services_built_from_its_configuration():
+    create_app()
+    first = get_location_service()
+    create_app()
+
+    assert get_location_service() is not first
+
+
+def test_each_app_gets_a_supabase_client_built_from_its_configuration():
+    first = get_supabase_client()
+    create_app()
+
+    assert get_supabase_client() is not first
+
+
+def test_dropped_singletons_are_stopped():
+    class Runner:
+        stopped = False
+
+        def stop(self):
+            self.stopped = True
+
+    get_runner = lazy_singleton(Runner)
+    runner = get_runner()
+    reset_singletons()
+
+    assert runner.stopped
+    assert get_runner() is not runner
+
+
+def test_app_starts_the_scheduler_without_warmup(tmp_path):
+    class SchedulerConfig(DevelopmentConfig):
+        WARMUP_ENABLED = False
+        SCHEDULER_ENABLED = True
+        SCHEDULER_LOCK_PATH = str(tmp_path / 'scheduler.lock')
+
+    try:
+        create_app(SchedulerConfig())
+        scheduler = get_action_scheduler()
+        assert scheduler._thread is not None and scheduler._thread.is_alive()
+    finally:
+        use_config(None)
+        reset_singletons()
+
+    assert not scheduler._thread.is_alive()
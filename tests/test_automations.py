@@ -0,0 +1,108 @@
+"""Tests for automation rule matching."""
+import pytest
+
+from automations.application.services import AutomationApplicationService
+from automations.domain.entities import AutomationRule
+from automations.infrastructure.rule_index import AutomationRuleIndex
+from devices.domain.entities import Device
+from locations.domain.entities import Location
+from proximity_events.domain.entities import ProximityEvent
+
+
+class FakeRuleRepository:
+    def __init__(self, rules):
+        self.rules = rules
+
+    def get_all_enabled(self):
+        return list(self.rules)
+
+
+class FakeSensorService:
+    bulk_max_ids = 500
+
+    def __init__(self):
+        self.updates = []
+
+    def update_sensors_status(self, is_active, sensor_ids=None, user_id=None, sensor_type=None):
+        self.updates.append((user_id, is_active, sensor_type, sensor_ids))
+        return ['sensor']
+
+
+class FakeDeviceService:
+    def __init__(self, devices):
+        self.devices = {device.device_id: device for device in devices}
+
+    def get_device(self, device_id):
+        return self.devices.get(device_id)
+
+
+class FakeLocationService:
+    def __init__(self, locations):
+        self.locations = {location.location_id: location for location in locations}
+
+    def get_location(self, location_id):
+        return self.locations.get(location_id)
+
+
+@pytest.fixture
+def automation():
+    rule = AutomationRule(rule_id='rule-1', user_id='alice', location_id='alice-home',
+                          event_type='EXIT', target_is_active=False, sensor_type='smart_light')
+    service = AutomationApplicationService(
+        FakeSensorService(),
+        FakeLocationService([
+            Location('alice-home', 'Casa', -12.0, -77.0, 100, 'alice'),
+            Location('bob-home', 'Casa', -12.1, -77.1, 100, 'bob'),
+        ]),
+        FakeDeviceService([
+            Device('alice-band', 'Band', 'wearable', 'alice'),
+            Device('bob-band', 'Band', 'wearable', 'bob'),
+        ])
+    )
+    service.repository = FakeRuleRepository([rule])
+    yield service
+    service.executor.shutdown()
+
+
+def event(device_id, location_id, user_id=None):
+    return ProximityEvent(event_id='event-1', device_id=device_id, home_location_id=location_id,
+                          home_location_name='Casa', event_type='EXIT', distance=150.0,
+                          latitude=-12.0, longitude=-77.0, user_id=user_id)
+
+
+def test_rule_runs_for_owner_device(automation):
+    assert automation.process_event(event('alice-band', 'alice-home')) == 1
+    assert automation.sensor_service.updates == [('alice', False, 'smart_light', None)]
+
+
+def test_rule_skipped_for_another_users_device(automation):
+    assert automation.process_event(event('bob-band', 'alice-home')) == 0
+    assert automation.sensor_service.updates == []
+    assert automation.stats()['rules_rejected'] == 1
+
+
+def test_rule_skipped_when_event_names_another_user(automation):
+    assert automation.process_event(event('alice-band', 'alice-home', user_id='bob')) == 0
+    assert automation.sensor_service.updates == []
+
+
+def test_rule_skipped_for_unknown_device(automation):
+    assert automation.process_event(event('ghost', 'alice-home')) == 0
+    assert automation.sensor_service.updates == []
+
+
+def test_rule_index_keeps_writes_made_during_a_rebuild():
+    index = AutomationRuleIndex()
+    stale = AutomationRule('r1', 'user-1', 'loc-1', 'EXIT', False)
+    added = AutomationRule('r2', 'user-1', 'loc-1', 'EXIT', True)
+
+    def loader():
+        # Writes racing with the load: r1 is deleted, r2 is created
+        index.remove('r1')
+        index.upsert(added)
+        return [stale]
+
+    index.rebuild(loader)
+
+    assert [rule.rule_id for rule in index.match('loc-1', 'EXIT')] == ['r2']
+    assert index.rebuilt_at is not None
@@ -0,0 +1,256 @@
+"""Tests for device registration."""
+import pytest
+
+from devices.application.services import DeviceApplicationService
+
+
+class FakeDeviceRepository:
+    """Stores devices in memory; create_many returns only the rows the caller lets it see."""
+
+    def __init__(self, hidden_ids=()):
+        self.devices = {}
+        self.hidden_ids = set(hidden_ids)
+
+    def get_existing_ids(self, device_ids, chunk_size=500):
+        return [device_id for device_id in device_ids if device_id in self.devices]
+
+    def create_many(self, devices):
+        for device in devices:
+            self.devices[device.device_id] = device
+        return [device for device in devices if device.device_id not in self.hidden_ids]
+
+    def create(self, device):
+        if device.device_id in self.devices:
+            raise Exception(f"duplicate key {device.device_id}")
+        self.devices[device.device_id] = device
+        return device
+
+
+@pytest.fixture
+def device_service():
+    service = DeviceApplicationService()
+    service.repository = FakeDeviceRepository(hidden_ids={'band-2'})
+    return service
+
+
+def item(device_id):
+    return {'device_id': device_id, 'name': 'Band', 'type': 'wearable', 'profile_id': 'user_123'}
+
+
+def test_create_devices_reports_rows_the_insert_did_not_return(device_service):
+    results = device_service.create_devices([item('band-1'), item('band-2'), item('band-1')])
+
+    assert [result['status'] for result in results] == ['created', 'unknown', 'duplicate']
+
+
+def test_bulk_route_answers_207_when_rows_are_not_returned(device_service, monkeypatch):
+    from app import create_app
+    app = create_app()
+    import devices.interfaces.services as device_interfaces
+    monkeypatch.setattr(device_interfaces, 'get_device_service', lambda: device_service)
+
+    response = app.test_client().post('/devices/bulk', json={'devices': [item('band-1'), item('band-2')]})
+
+    assert response.status_code == 207
+    assert response.json['created'] == 1
+    assert app.test_client().post('/devices/bulk', json={}).status_code == 400
+
+
+def test_devices_deleted_elsewhere_stop_existing_after_the_cache_ttl(device_service, monkeypatch):
+    device_service.repository.exists = lambda device_id: device_id in device_service.repository.devices
+    device_service.repository.get_all_ids = lambda: ['band-1']
+    now = [1000.0]
+    monkeypatch.setattr('devices.application.services.time.monotonic', lambda: now[0])
+
+    device_service.warm_device_ids()
+    assert device_service.device_exists('band-1')
+
+    # Deleted through another worker: this worker's cache is not told
+    now[0] += device_service.known_device_ttl + 1
+    assert not device_service.device_exists('band-1')
+
+
+class FakePresenceRepository:
+    def __init__(self):
+        self.rows = {}
+        self.fail = False
+
+    def upsert_many(self, rows, chunk_size=500):
+        if self.fail:
+            raise Exception("violates foreign key constraint")
+        for row in rows:
+            self.rows[row[0]] = row
+
+    def get_seen_since(self, since=None):
+        return []
+
+    def delete(self, device_id):
+        self.rows.pop(device_id, None)
+
+
+@pytest.fixture
+def presence_service(device_service, monkeypatch):
+    from devices.infrastructure.presence_tracker import DevicePresenceTracker
+    device_service.presence = DevicePresenceTracker(FakePresenceRepository(),
+                                                    existing_ids=device_service.repository.get_existing_ids)
+    # No background flush thread; tests flush by hand
+    monkeypatch.setattr(device_service.presence, '_start', lambda: None)
+    device_service.repository.get_all_ids = lambda: sorted(device_service.repository.devices)
+    device_service.repository.delete = lambda device_id: device_service.repository.devices.pop(device_id, None) is not None
+    device_service.api_key_repository.delete = lambda device_id: None
+    device_service.create_devices([item('band-1'), item('band-3'), item('band-4')])
+    return device_service
+
+
+def test_fleet_view_is_served_from_memory(presence_service):
+    presence_service.repository.get_all_ids = lambda: pytest.fail("scanned the device table")
+    presence_service.record_seen('band-1')
+
+    fleet = presence_service.get_stale_devices(stale_after_seconds=60)
+
+    assert (fleet['online'], fleet['stale'], fleet['offline']) == (1, 0, 2)
+    assert [device['device_id'] for device in fleet['devices']] == ['band-3', 'band-4']
+
+
+def test_devices_deleted_elsewhere_leave_the_fleet_view(presence_service):
+    presence_service.repository.exists = lambda device_id: device_id in presence_service.repository.devices
+    presence_service.record_seen('band-3')
+    # Deleted through another worker; this worker's confirmation has expired
+    presence_service.repository.devices.pop('band-3')
+    presence_service.known_device_ids['band-3'] -= presence_service.known_device_ttl + 1
+
+    assert not presence_service.device_exists('band-3')
+    fleet = presence_service.get_stale_devices(stale_after_seconds=60)
+    assert (fleet['online'], fleet['offline']) == (0, 2)
+    assert 'band-3' not in presence_service.presence.snapshot()
+
+
+def test_deleting_a_device_evicts_its_presence(presence_service):
+    presence_service.record_seen('band-1')
+    presence_service.presence.flush()
+
+    assert presence_service.delete_device('band-1')
+    assert 'band-1' not in presence_service.presence.snapshot()
+    assert presence_service.presence.repository.rows == {}
+    assert presence_service.get_stale_devices(stale_after_seconds=0)['stale'] == 0
+
+
+def test_failed_presence_flush_only_retries_existing_devices(presence_service):
+    presence_service.record_seen('band-1')
+    presence_service.record_seen('band-3')
+    # Deleted through another worker before the flush
+    presence_service.repository.devices.pop('band-3')
+    presence_service.presence.repository.fail = True
+
+    assert presence_service.presence.flush() == 0
+    presence_service.presence.repository.fail = False
+    assert presence_service.presence.flush() == 1
+    assert list(presence_service.presence.repository.rows) == ['band-1']
+
+
+class FakeApiKeyRepository:
+    def __init__(self):
+        self.keys = {}
+
+    def save(self, device_id, salt, key_hash):
+        self.keys[device_id] = (salt, key_hash)
+
+    def get_by_device_id(self, device_id):
+        return self.keys.get(device_id)
+
+    def delete(self, device_id):
+        self.keys.pop(device_id, None)
+
+
+@pytest.fixture
+def token_service(device_service):
+    device_service.api_key_repository = FakeApiKeyRepository()
+    device_service.token_secret = 'test-secret'
+    device_service.admin_api_key = 'admin-key'
+    device_service.auth_required = True
+    device_service.repository.exists = lambda device_id: device_id in device_service.repository.devices
+    device_service.repository.delete = lambda device_id: device_service.repository.devices.pop(device_id, None) is not None
+    device_service.presence = None
+    device_service.create_devices([item('band-1'), item('band-3')])
+    return device_service
+
+
+def test_tokens_are_bound_to_their_device_and_key(token_service):
+    api_key = token_service.issue_api_key('band-1', admin_key='admin-key')
+    token, _ = token_service.issue_token('band-1', api_key)
+
+    assert token_service.authenticate('band-1', token=token) is None
+    assert token_service.authenticate('band-3', token=token) == "Invalid or expired device token"
+    payload, signature = token.split('.')
+    forged = ('B' if signature[0] == 'A' else 'A') + signature[1:]
+    assert token_service.verify_token(f"{payload}.{forged}") is None
+    token_service.token_secret = 'other-secret'
+    assert token_service.verify_token(token) is None
+
+
+def test_expired_tokens_are_rejected(token_service, monkeypatch):
+    api_key = token_service.issue_api_key('band-1', admin_key='admin-key')
+    token, expires_at = token_service.issue_token('band-1', api_key)
+
+    monkeypatch.setattr('devices.application.services.time.time', lambda: expires_at)
+    assert token_service.verify_token(token) is None
+
+
+def test_tokens_are_verified_without_the_database(token_service):
+    api_key = token_service.issue_api_key('band-1', admin_key='admin-key')
+    token, _ = token_service.issue_token('band-1', api_key)
+    token_service.api_key_hashes.clear()
+    token_service.api_key_repository.get_by_device_id = lambda device_id: pytest.fail("read the database")
+
+    assert token_service.verify_token(token) == 'band-1'
+
+
+def test_rotating_or_deleting_the_key_revokes_its_tokens(token_service):
+    token_service.token_revocation_check = True
+    with pytest.raises(PermissionError):
+        token_service.issue_api_key('band-1')
+    first_key = token_service.issue_api_key('band-1', admin_key='admin-key')
+    old_token, _ = token_service.issue_token('band-1', first_key)
+
+    second_key = token_service.issue_api_key('band-1', token=old_token)
+    with pytest.raises(PermissionError):
+        token_service.issue_api_key('band-1', token=old_token)
+    assert token_service.verify_token(old_token) is None
+    assert not token_service.verify_api_key('band-1', first_key)
+    with pytest.raises(PermissionError):
+        token_service.issue_api_key('band-1', api_key=first_key)
+
+    new_token, _ = token_service.issue_token('band-1', second_key)
+    assert token_service.delete_device('band-1')
+    assert token_service.verify_token(new_token) is None
+
+
+def test_invalid_credentials_are_rejected_even_when_auth_is_optional(token_service):
+    token_service.auth_required = False
+    token_service.issue_api_key('band-1', admin_key='admin-key')
+
+    assert token_service.authenticate('band-1', api_key='wrong') == "Invalid device ID or API key"
+    assert token_service.authenticate('band-1', token='forged.token') == "Invalid or expired device token"
+    assert token_service.authenticate('band-1') is None
+
+
+def test_authentication_does_not_record_presence(presence_service, monkeypatch):
+    from flask import Flask
+    import devices.interfaces.services as device_interfaces
+    monkeypatch.setattr(device_interfaces, 'get_device_service', lambda: presence_service)
+
+    with Flask(__name__).test_request_context(headers={'X-Device-ID': 'band-1'}):
+        assert device_interfaces.device_auth_error('band-1') is None
+
+    assert presence_service.presence.stats()['touches'] == 0
+
+
+def test_stopping_the_presence_tracker_flushes_and_ends_its_thread():
+    from devices.infrastructure.presence_tracker import DevicePresenceTracker
+    tracker = DevicePresenceTracker(FakePresenceRepository(), flush_seconds=60.0)
+    tracker.touch('band-1', 1.0, 2.0)
+
+    tracker.stop()
+
+    assert not tracker._thread.is_alive()
+    assert list(tracker.repository.rows) == ['band-1']
@@ -0,0 +1,61 @@
+"""Accuracy of the distance kernels against geopy."""
+import random
+
+import pytest
+from geopy.distance import great_circle
+
+from benchmark_distance import random_case
+from locations.domain.compiled import CompiledGeofences
+from locations.domain.services import (
+    LocationService, DISTANCE_MODE_EXACT, DISTANCE_MODE_TIERED, FAST_PATH_MAX_RELATIVE_ERROR
+)
+
+SAMPLES = 20000
+
+
+@pytest.fixture(scope='module')
+def cases():
+    rng = random.Random(42)
+    return [random_case(rng) for _ in range(SAMPLES)]
+
+
+def reference_distance(location, device_lat, device_lon):
+    return great_circle((location.latitude, location.longitude), (device_lat, device_lon)).meters
+
+
+def test_fast_path_stays_within_its_error_bound(cases):
+    service = LocationService(DISTANCE_MODE_TIERED)
+    fast = 0
+    for location, device_lat, device_lon in cases:
+        [(distance, clearance)] = service.measure_compiled(CompiledGeofences([location]), device_lat, device_lon)
+        # The exact fallback reports the clearance as is; the fast path subtracts its bound
+        error_bound = abs(distance - location.radius) - clearance
+        if error_bound > 0:
+            fast += 1
+            assert abs(distance - reference_distance(location, device_lat, device_lon)) <= error_bound
+
+    # Most cases must take the fast path for the check to mean anything
+    assert fast > SAMPLES // 2
+
+
+@pytest.mark.parametrize('distance_mode', [DISTANCE_MODE_EXACT, DISTANCE_MODE_TIERED])
+@pytest.mark.parametrize('band', [0.0, 5.0])
+def test_compiled_kernel_agrees_with_geopy(cases, distance_mode, band):
+    service = LocationService(distance_mode)
+    for location, device_lat, device_lon in cases:
+        reference = reference_distance(location, device_lat, device_lon)
+        [(distance, clearance)] = service.measure_compiled(
+            CompiledGeofences([location]), device_lat, device_lon, band
+        )
+
+        assert abs(distance - reference) <= reference * FAST_PATH_MAX_RELATIVE_ERROR + 1e-3
+        # The clearance is a lower bound, so nothing within it may flip membership
+        assert clearance <= abs(reference - location.radius) + 1e-6
+        assert (distance <= location.radius) == (reference <= location.radius)
+
+
+def test_exact_mode_matches_geopy_to_rounding(cases):
+    service = LocationService(DISTANCE_MODE_EXACT)
+    for location, device_lat, device_lon in cases[:1000]:
+        [(distance, _)] = service.measure_compiled(CompiledGeofences([location]), device_lat, device_lon)
+        assert distance == pytest.approx(reference_distance(location, device_lat, device_lon), rel=1e-9, abs=1e-6)
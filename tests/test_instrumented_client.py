@@ -0,0 +1,74 @@
+"""Tests for query timing and logging."""
+import logging
+
+import pytest
+
+from shared.supabase.instrumented_client import InstrumentedClient
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+        self.count = None
+
+
+class FakeBuilder:
+    def __init__(self, error=None):
+        self.error = error
+
+    def select(self, *args):
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def execute(self):
+        if self.error is not None:
+            raise self.error
+        return FakeResponse([{'id': 1}])
+
+
+class FakeClient:
+    def __init__(self, builder):
+        self.builder = builder
+
+    def table(self, name):
+        return self.builder
+
+
+def logged_queries(caplog):
+    return [(record.getMessage(), record.fields) for record in caplog.records
+            if record.name == 'shared.supabase.instrumented_client']
+
+
+def test_slow_queries_are_logged_with_their_filters(caplog):
+    client = InstrumentedClient(FakeClient(FakeBuilder()), slow_threshold_ms=0.0)
+
+    with caplog.at_level(logging.WARNING):
+        client.table('devices').select('*').eq('id', 'band-1').execute()
+
+    [(message, fields)] = logged_queries(caplog)
+    assert message == 'slow_query'
+    assert fields['table'] == 'devices'
+    assert fields['calls'] == [['select', '*'], ['eq', 'id', 'band-1']]
+    assert fields['rows'] == 1
+
+
+def test_failed_queries_are_logged_and_reraised(caplog):
+    client = InstrumentedClient(FakeClient(FakeBuilder(ConnectionError('reset'))), slow_threshold_ms=1e9)
+
+    with caplog.at_level(logging.WARNING), pytest.raises(ConnectionError):
+        client.table('devices').select('*').execute()
+
+    [(message, fields)] = logged_queries(caplog)
+    assert message == 'failed_query'
+    assert fields['error'] == 'ConnectionError: reset'
+
+
+def test_fast_queries_are_not_logged(caplog):
+    client = InstrumentedClient(FakeClient(FakeBuilder()), slow_threshold_ms=1e9)
+
+    with caplog.at_level(logging.WARNING):
+        client.table('devices').select('*').execute()
+
+    assert logged_queries(caplog) == []
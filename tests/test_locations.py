@@ -0,0 +1,105 @@
+"""Tests for proximity checks against active locations."""
+import pytest
+
+from config import Config, check_config
+from locations.application.services import LocationApplicationService
+from locations.domain.entities import Location
+from locations.domain.geometry import METERS_PER_DEGREE, validate_polygon
+from locations.domain.smoothing import GpsKalmanFilter
+from locations.infrastructure.global_geofence_index import GlobalGeofenceIndex
+from locations.infrastructure.shared_geofence_store import SharedGeofenceStore
+
+
+class FakeLocationRepository:
+    def __init__(self, locations):
+        self.locations = locations
+        self.full_scans = 0
+
+    def get_active_locations(self, profile_id, bounding_box=None):
+        locations = [location for location in self.locations if location.profile_id == profile_id]
+        if bounding_box is None:
+            return locations
+        min_lat, min_lon, max_lat, max_lon = bounding_box
+        return [location for location in locations
+                if min_lat <= location.latitude <= max_lat and min_lon <= location.longitude <= max_lon]
+
+    def get_all_active_locations(self):
+        self.full_scans += 1
+        return list(self.locations)
+
+
+@pytest.fixture
+def pushdown_service():
+    service = LocationApplicationService()
+    service.compiled_cache_enabled = False
+    service.bbox_pushdown = True
+    # Both geofences have a 500 m reach; "near" has its boundary 10 m north of the origin
+    service.repository = FakeLocationRepository([
+        Location('far', 'Far', 1.0, 1.0, 500, 'profile-bbox'),
+        Location('near', 'Near', 510 / METERS_PER_DEGREE, 0.0, 500, 'profile-bbox'),
+    ])
+    return service
+
+
+def test_pushdown_keeps_geofences_within_cache_margin(pushdown_service):
+    version = pushdown_service.geofence_versions.get('profile-bbox')
+    # The first fetch learns the reach; the second uses the bounding box
+    pushdown_service._get_candidate_locations('profile-bbox', version, 0.0, 0.0)
+    candidates = pushdown_service._get_candidate_locations('profile-bbox', version, 0.0, 0.0)
+
+    assert [location.location_id for location in candidates] == ['near']
+
+
+def test_pushdown_does_not_cache_next_to_a_dropped_boundary(pushdown_service):
+    pushdown_service.check_proximity(0.0, 0.0, 'profile-bbox')
+    results = pushdown_service.check_proximity(0.0, 0.0, 'profile-bbox')
+
+    assert [result['location_id'] for result in results] == ['near']
+    assert pushdown_service.proximity_cache.stores == 0
+
+
+def test_pushdown_is_refused_with_the_compiled_cache():
+    config = Config()
+    config.LOCATION_BBOX_PUSHDOWN = True
+
+    with pytest.raises(ValueError, match='LOCATION_BBOX_PUSHDOWN'):
+        check_config(config)
+    config.GEOFENCE_COMPILED_CACHE_ENABLED = False
+    check_config(config)
+
+
+def test_warmup_feeds_every_geofence_cache_from_one_scan(tmp_path):
+    service = LocationApplicationService()
+    service.global_index = GlobalGeofenceIndex()
+    service.shared_geofences = SharedGeofenceStore(str(tmp_path / 'geofences.bin'))
+    service.repository = FakeLocationRepository([
+        Location('home', 'Home', 0.0, 0.0, 100, 'profile-a'),
+        Location('office', 'Office', 1.0, 1.0, 100, 'profile-b'),
+    ])
+
+    assert service.warm_geofences() == 2
+
+    assert service.repository.full_scans == 1
+    assert [location.location_id for location in service.global_index.lookup(0.0, 0.0)] == ['home']
+    assert service.shared_geofences.publishes == 1
+    assert service.shared_geofences.load('profile-b').location_ids == ['office']
+
+
+def test_polygons_crossing_the_antimeridian_are_refused():
+    with pytest.raises(ValueError, match='antimeridian'):
+        validate_polygon([[-17.0, 179.5], [-17.0, -179.5], [-18.0, -179.5], [-18.0, 179.5]])
+
+    # Spanning more than 180 degrees in total is fine when no edge wraps
+    band = [[0.0, -100.0], [0.0, -10.0], [0.0, 85.0], [10.0, 85.0], [10.0, -10.0], [10.0, -100.0]]
+    assert len(validate_polygon(band)) == 6
+
+
+def test_smoothing_takes_the_short_way_across_the_antimeridian():
+    smoother = GpsKalmanFilter()
+    smoother.update(-17.0, 179.9998, accuracy=10.0, timestamp=0.0)
+
+    latitude, longitude = smoother.update(-17.0, -179.9998, accuracy=10.0, timestamp=1.0)
+
+    # Between the two fixes, 44 m apart, not on the other side of the earth
+    assert latitude == -17.0
+    assert abs(longitude) == pytest.approx(180.0, abs=1e-4)
@@ -0,0 +1,202 @@
+"""Tests for the scheduled action runner."""
+import copy
+import itertools
+
+import pytest
+
+from automations.application.scheduler import ActionScheduler
+from automations.domain.entities import ScheduledAction
+from shared.infrastructure.leader_lock import LeaderLock
+
+
+class FakeScheduledActionRepository:
+    """In-memory scheduled_actions table with the repository's claim semantics."""
+
+    def __init__(self):
+        self.rows = {}
+        self.ids = itertools.count(1)
+
+    def add_many(self, actions):
+        for action in actions:
+            action.action_id = next(self.ids)
+            self.rows[action.action_id] = (copy.copy(action), None)
+        return actions
+
+    def _pending(self):
+        return {action_id: (action, claimed_until) for action_id, (action, claimed_until) in self.rows.items()
+                if action.status == 'pending'}
+
+    def get_by_user_id(self, user_id, limit=100):
+        actions = sorted((action for action, _ in self.rows.values() if action.user_id == user_id),
+                         key=lambda action: action.run_at)
+        return actions[:limit]
+
+    def due_between(self, start, end):
+        return [(action_id, action.run_at) for action_id, (action, _) in self._pending().items()
+                if start <= action.run_at < end]
+
+    def overdue(self, now, limit):
+        due = [(action.run_at, action_id) for action_id, (action, claimed_until) in self._pending().items()
+               if action.run_at <= now and (claimed_until is None or claimed_until < now)]
+        return [(action_id, run_at) for run_at, action_id in sorted(due)[:limit]]
+
+    def claim(self, action_ids, now, claim_until):
+        claimed = []
+        for action_id in action_ids:
+            action, claimed_until = self._pending().get(action_id, (None, None))
+            if action is None or action.run_at > now or (claimed_until is not None and claimed_until >= now):
+                continue
+            self.rows[action_id] = (action, claim_until)
+            claimed.append(copy.copy(action))
+        return claimed
+
+    def count(self):
+        return len(self._pending())
+
+    def delete_many(self, action_ids):
+        return sum(1 for action_id in action_ids if self.rows.pop(action_id, None) is not None)
+
+    def reschedule(self, action_ids, run_at, attempts, error):
+        for action_id in action_ids:
+            action, _ = self.rows[action_id]
+            action.run_at, action.attempts, action.last_error = run_at, attempts, error
+            self.rows[action_id] = (action, None)
+
+    def mark_failed(self, action_ids, attempts, error):
+        for action_id in action_ids:
+            action, _ = self.rows[action_id]
+            action.status, action.attempts, action.last_error = 'failed', attempts, error
+            self.rows[action_id] = (action, None)
+
+
+class FakeSensorService:
+    def __init__(self, failures=0):
+        self.updates = []
+        self.failures = failures
+
+    def update_sensors_status(self, is_active, sensor_ids=None, user_id=None, sensor_type=None):
+        if self.failures:
+            self.failures -= 1
+            raise Exception("backend unavailable")
+        self.updates.append((user_id, is_active, sensor_type, sensor_ids))
+        return []
+
+
+@pytest.fixture
+def repository():
+    return FakeScheduledActionRepository()
+
+
+def make_scheduler(repository, tmp_path, sensor_service=None, **options):
+    scheduler = ActionScheduler(repository, LeaderLock(str(tmp_path / 'scheduler.lock')),
+                                sensor_service or FakeSensorService(), **options)
+    assert scheduler.leader_lock.try_acquire()
+    return scheduler
+
+
+def action(run_at, user_id='user_123', is_active=False, sensor_ids=None):
+    return ScheduledAction(user_id=user_id, target_is_active=is_active, run_at=run_at,
+                           sensor_type='smart_light', sensor_ids=sensor_ids)
+
+
+def tick(scheduler, now):
+    scheduler._refill(now)
+    while scheduler._run_due(now) == scheduler.batch_size:
+        pass
+
+
+def test_due_actions_are_merged_and_deleted(repository, tmp_path):
+    scheduler = make_scheduler(repository, tmp_path)
+    scheduler.schedule([action(100.0, sensor_ids=['a']), action(100.0, sensor_ids=['b']), action(500.0)])
+
+    tick(scheduler, 100.0)
+
+    assert scheduler.sensor_service.updates == [('user_123', False, 'smart_light', ['a', 'b'])]
+    assert repository.count() == 1
+
+
+def test_horizon_is_refilled_as_time_advances(repository, tmp_path):
+    scheduler = make_scheduler(repository, tmp_path, horizon_seconds=60.0)
+    repository.add_many([action(30.0), action(90.0), action(150.0)])
+
+    scheduler._refill(0.0)
+    assert sorted(run_at for run_at, _ in scheduler._heap) == [30.0]
+
+    tick(scheduler, 95.0)
+    assert len(scheduler.sensor_service.updates) == 1
+    assert repository.count() == 1
+    assert sorted(run_at for run_at, _ in scheduler._heap) == [150.0]
+
+
+def test_actions_scheduled_elsewhere_inside_the_loaded_window_still_run(repository, tmp_path):
+    scheduler = make_scheduler(repository, tmp_path, horizon_seconds=60.0)
+    scheduler._refill(0.0)
+    # Written by another instance after this one loaded [0, 60)
+    repository.add_many([action(20.0)])
+
+    tick(scheduler, 10.0)
+    assert scheduler.sensor_service.updates == []
+    tick(scheduler, 20.0)
+    assert len(scheduler.sensor_service.updates) == 1
+
+
+def test_an_action_runs_on_one_instance_only(repository, tmp_path):
+    first = make_scheduler(repository, tmp_path / 'host-1')
+    second = make_scheduler(repository, tmp_path / 'host-2')
+    first.schedule([action(100.0)])
+    first._refill(0.0)
+    second._refill(0.0)
+
+    first._run_due(100.0)
+    second._run_due(100.0)
+
+    assert len(first.sensor_service.updates) + len(second.sensor_service.updates) == 1
+
+
+def test_expired_claims_are_picked_up_again(repository, tmp_path):
+    scheduler = make_scheduler(repository, tmp_path, claim_seconds=60.0)
+    repository.add_many([action(100.0)])
+    # Claimed by a worker that died before running it
+    repository.claim([1], 100.0, 160.0)
+
+    tick(scheduler, 120.0)
+    assert scheduler.sensor_service.updates == []
+    tick(scheduler, 161.0)
+    assert len(scheduler.sensor_service.updates) == 1
+
+
+def test_failed_actions_are_retried_then_dead_lettered(repository, tmp_path, monkeypatch):
+    sensor_service = FakeSensorService(failures=10)
+    scheduler = make_scheduler(repository, tmp_path, sensor_service, retry_seconds=30.0, max_attempts=3)
+    scheduler.schedule([action(100.0)])
+    now = [100.0]
+    monkeypatch.setattr('automations.application.scheduler.time.time', lambda: now[0])
+
+    for now[0] in (100.0, 130.0, 160.0, 190.0):
+        tick(scheduler, now[0])
+
+    failed = repository.get_by_user_id('user_123')[0]
+    assert (failed.status, failed.attempts, failed.last_error) == ('failed', 3, 'backend unavailable')
+    assert repository.count() == 0
+    assert scheduler.stats()['dead_lettered'] == 1
+    assert scheduler._heap == []
+
+
+def test_cancelled_actions_do_not_run(repository, tmp_path):
+    scheduler = make_scheduler(repository, tmp_path)
+    scheduled = scheduler.schedule([action(50.0)])
+    scheduler._refill(0.0)
+
+    assert scheduler.cancel(scheduled[0].action_id)
+    tick(scheduler, 50.0)
+
+    assert scheduler.sensor_service.updates == []
+
+
+def test_leadership_fails_over_when_the_leader_stops(repository, tmp_path):
+    leader = make_scheduler(repository, tmp_path)
+    follower = ActionScheduler(repository, LeaderLock(str(tmp_path / 'scheduler.lock')), FakeSensorService())
+
+    assert not follower.leader_lock.try_acquire()
+    leader.stop()
+    assert follower.leader_lock.try_acquire()
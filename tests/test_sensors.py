@@ -0,0 +1,125 @@
+"""Tests for the sensor state cache and state history."""
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from sensors.application.services import SensorApplicationService
+from sensors.domain.entities import Sensor, SensorType
+from sensors.domain.services import SensorService
+from sensors.infrastructure.history_recorder import SensorHistoryRecorder
+from sensors.infrastructure.sensor_cache import SensorStateCache
+
+
+def sensor(sensor_id, is_active=False, user_id='user_123'):
+    return Sensor(sensor_id, 'Light', SensorType.SMART_LIGHT, is_active, user_id)
+
+
+def epoch(day, hour):
+    return datetime(2026, 3, day, hour, tzinfo=timezone.utc).timestamp()
+
+
+def test_cache_serves_loaded_sensors_and_applies_writes():
+    cache = SensorStateCache()
+    cache.get_user_sensors('user_123', lambda: [sensor('light-1')])
+
+    cache.write_through([sensor('light-1', is_active=True)])
+
+    [cached] = cache.get_user_sensors('user_123', lambda: pytest.fail("should be cached"))
+    assert cached.is_active
+
+
+def test_cache_does_not_keep_a_load_that_raced_with_a_write():
+    cache = SensorStateCache()
+
+    def stale_load():
+        # The write lands after the database answered the load
+        cache.write_through([sensor('light-1', is_active=True)])
+        return [sensor('light-1', is_active=False)]
+
+    cache.get_user_sensors('user_123', stale_load)
+
+    assert cache.get_cached('user_123') is None
+    [loaded] = cache.get_user_sensors('user_123', lambda: [sensor('light-1', is_active=True)])
+    assert loaded.is_active
+    assert cache.get_cached('user_123') is not None
+
+
+class FakeHistoryRepository:
+    """Sensor history kept in dicts; sensors in busy are claimed by another worker."""
+
+    def __init__(self, busy=()):
+        self.current = {}
+        self.daily = {}
+        self.busy = set(busy)
+
+    def append(self, changes):
+        claimed = [change for change in changes if change[0] not in self.busy]
+        deferred = [change for change in changes if change[0] in self.busy]
+        rollups, closed, stale = SensorService.apply_state_changes(self.current, claimed)
+        for key, (on_seconds, toggles) in rollups.items():
+            day = self.daily.setdefault(key, [0.0, 0])
+            day[0] += on_seconds
+            day[1] += toggles
+        return closed, stale, deferred
+
+    def get_daily(self, sensor_id, start_day, end_day):
+        return {day: tuple(values) for (key, day), values in self.daily.items()
+                if key == sensor_id and start_day <= day <= end_day}
+
+    def get_current(self, sensor_id):
+        return self.current.get(sensor_id)
+
+
+def test_runs_crossing_midnight_are_split_between_days():
+    current = {}
+    rollups, closed, stale = SensorService.apply_state_changes(current, [
+        ('light-1', 'user_123', True, epoch(1, 23)),
+        ('light-1', 'user_123', False, epoch(2, 1)),
+        ('light-1', 'user_123', False, epoch(2, 2)),
+        ('light-1', 'user_123', True, epoch(2, 3)),
+        ('light-1', 'user_123', False, epoch(2, 4))
+    ])
+
+    assert rollups == {
+        ('light-1', '2026-03-01'): [3600.0, 0],
+        ('light-1', '2026-03-02'): [7200.0, 3]
+    }
+    assert (closed, stale) == (3, 0)
+    assert current == {'light-1': (False, epoch(2, 4))}
+
+
+def test_observations_older_than_the_current_run_are_ignored():
+    current = {'light-1': (True, epoch(2, 3))}
+
+    assert SensorService.apply_state_changes(current, [('light-1', 'user_123', False, epoch(2, 1))]) == ({}, 0, 1)
+    assert current == {'light-1': (True, epoch(2, 3))}
+
+
+def test_recorder_retries_sensors_claimed_by_another_worker():
+    repository = FakeHistoryRepository(busy={'light-2'})
+    recorder = SensorHistoryRecorder(repository)
+    recorder._thread = object()  # no background flushing
+    recorder.record([sensor('light-1', is_active=True), sensor('light-2', is_active=True)])
+
+    recorder.flush()
+    assert set(repository.current) == {'light-1'}
+    assert recorder.stats()['queued'] == 1
+
+    repository.busy.clear()
+    recorder.flush()
+    assert set(repository.current) == {'light-1', 'light-2'}
+
+
+def test_history_adds_the_open_run_across_days(monkeypatch):
+    repository = FakeHistoryRepository()
+    service = SensorApplicationService()
+    service.history = SimpleNamespace(repository=repository)
+    service.get_sensor = lambda sensor_id: sensor(sensor_id)
+    repository.append([('light-1', 'user_123', True, epoch(1, 22))])
+    monkeypatch.setattr('sensors.application.services.time.time', lambda: epoch(3, 6))
+
+    history = service.get_sensor_history('light-1', '2026-03-02', '2026-03-03')
+
+    assert [day['on_seconds'] for day in history['days']] == [86400.0, 21600.0]
+    assert (history['is_active'], history['toggles']) == (True, 0)